@@ -0,0 +1,106 @@
+import boto3
+import pytest
+from moto import mock_aws
+
+from src.libs.client_registry import clear_clients
+from src.repository.exchange_rate_cache import clear_exchange_rate_caches
+from src.repository.exchange_rate_repository import ExchangeRateRepository
+
+
+@pytest.fixture
+def aws_credentials(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_SESSION_TOKEN", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+
+
+class FakeExchangeRateRepository:
+    """
+    Serves stored rates from memory and records the dates each batch read asked for.
+    """
+
+    def __init__(self, items=None, rates=None):
+        # Entries by date; `rates` (e.g. {"EUR/USD": Decimal("0.5")}) is served for any other date
+        self.items = items or {}
+        self.rates = rates
+        self.requested_dates = []
+        self.scans = 0
+
+    def get_exchange_rates_by_dates(self, dates):
+        self.requested_dates.append(sorted(dates))
+        return {
+            date: self.items.get(date) or {"Date": date, "Rates": self.rates}
+            for date in dates
+            if date in self.items or self.rates is not None
+        }
+
+    def scan_exchange_rates(self):
+        self.scans += 1
+        return list(self.items.values())
+
+    def get_exchange_rate_by_currency(self, date, currency):
+        raise AssertionError("Point reads should not be issued when rates are prefetched")
+
+
+# Builds in-memory rate repositories: fake_rate_repository(items=None, rates=None)
+@pytest.fixture
+def fake_rate_repository():
+    return FakeExchangeRateRepository
+
+
+class FakeLambdaContext:
+    """
+    A Lambda context whose remaining time is set by the test.
+    """
+
+    invoked_function_arn = "arn:aws:lambda:eu-west-1:123456789012:function:syncLedgers"
+
+    def __init__(self, remaining_ms):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_ms
+
+
+# Builds Lambda contexts: lambda_context(remaining_ms)
+@pytest.fixture
+def lambda_context():
+    return FakeLambdaContext
+
+
+# Keeps the /tmp rate cache of each test separate
+@pytest.fixture(autouse=True)
+def exchange_rate_cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("EXCHANGE_RATE_CACHE_DIR", str(tmp_path / "exchange_rate_cache"))
+    yield
+    clear_exchange_rate_caches()
+
+
+# In-memory DynamoDB (moto) for tests that don't need the Docker container
+@pytest.fixture
+def local_exchange_rate_repository(aws_credentials):
+    clear_clients()
+    with mock_aws():
+        client = boto3.client("dynamodb", region_name="us-east-1")
+        client.create_table(
+            TableName="ExchangeRates",
+            KeySchema=[{"AttributeName": "Date", "KeyType": "HASH"}],
+            AttributeDefinitions=[
+                {"AttributeName": "Date", "AttributeType": "S"},
+                {"AttributeName": "BaseCurrency", "AttributeType": "S"},
+            ],
+            GlobalSecondaryIndexes=[
+                {
+                    "IndexName": "BaseCurrency-Date-index",
+                    "KeySchema": [
+                        {"AttributeName": "BaseCurrency", "KeyType": "HASH"},
+                        {"AttributeName": "Date", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {"ProjectionType": "ALL"},
+                }
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        yield ExchangeRateRepository(table_name="ExchangeRates")
+    clear_clients()
@@ -0,0 +1,22 @@
+from src.libs import client_registry
+
+
+def test_http_sessions_are_reused_per_name():
+    client_registry.clear_clients()
+
+    notion_session = client_registry.get_http_session("notion", pool_maxsize=8)
+
+    assert client_registry.get_http_session("notion") is notion_session
+    assert client_registry.get_http_session("exchange_rate") is not notion_session
+    assert notion_session.get_adapter("https://api.notion.com")._pool_maxsize == 8
+
+
+def test_dynamodb_tables_are_cached_by_region_and_name(aws_credentials):
+    client_registry.clear_clients()
+
+    table = client_registry.get_dynamodb_table("ExchangeRates", "us-east-1")
+
+    assert client_registry.get_dynamodb_table("ExchangeRates", "us-east-1") is table
+    assert client_registry.get_dynamodb_table("ExchangeRates", "eu-west-1") is not table
+    assert client_registry.get_dynamodb_resource("us-east-1") is client_registry.get_dynamodb_resource()
+    client_registry.clear_clients()
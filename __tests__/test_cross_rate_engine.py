@@ -0,0 +1,66 @@
+from decimal import Decimal
+
+import pytest
+
+from src.libs.cross_rate_engine import CrossRateEngine
+from src.repository.exchange_rate_index import ExchangeRateIndex
+
+
+@pytest.fixture
+def engine():
+    rate_index = ExchangeRateIndex.from_items(
+        [
+            {
+                "Date": "2024-11-08",
+                "Rates": {"EUR/USD": Decimal("0.5"), "MXN/USD": Decimal("20"), "COP/USD": Decimal("4000")},
+            },
+            {"Date": "2024-11-11", "Rates": {"EUR/USD": Decimal("0.8")}},
+        ],
+        max_staleness_days=3,
+    )
+    return CrossRateEngine(rate_index)
+
+
+def test_matrix_holds_every_cross_rate(engine):
+    matrix = engine.matrix("2024-11-08")
+
+    assert matrix.currencies == ("USD", "COP", "EUR", "MXN")
+    assert matrix.rate("EUR", "MXN") == 40.0
+    assert matrix.rate("MXN", "EUR") == 0.025
+    assert matrix.rate("COP", "USD") == 0.00025
+    assert matrix.rate("EUR", "JPY") is None
+
+
+def test_convert_between_arbitrary_pairs(engine):
+    assert engine.convert(10, "EUR", "MXN", "2024-11-08") == 400.0
+    assert engine.convert(4000, "COP", "EUR", "2024-11-08") == 0.5
+    assert engine.convert(5, "USD $", "USD", "2024-12-25") == 5
+
+    with pytest.raises(ValueError):
+        engine.convert(10, "MXN", "EUR", "2024-11-11")
+
+
+def test_matrix_is_cached_per_snapshot_date(engine):
+    # Weekend dates resolve to Friday's snapshot and reuse its matrix
+    assert engine.matrix("2024-11-10") is engine.matrix("2024-11-08")
+    assert engine.matrix("2024-11-15") is None
+
+    engine.rate_index.add("2024-11-08", {"EUR/USD": Decimal("0.25")})
+
+    assert engine.convert(1, "USD", "EUR", "2024-11-09") == 0.25
+
+
+def test_convert_batch_and_columns(engine):
+    amounts = [10, 20, 40, 5]
+    currencies = ["EUR", "EUR", "MXN", "USD"]
+    dates = ["2024-11-08", "2024-11-11", "2024-11-08", "2024-12-25"]
+
+    result = engine.convert_batch(amounts, currencies, "USD", dates)
+
+    assert result.values.tolist() == [20.0, 25.0, 2.0, 5.0]
+
+    columns = engine.convert_columns(amounts, currencies, dates, ["EUR", "MXN"])
+
+    assert columns["EUR"].values.tolist()[:3] == [10.0, 20.0, 1.0]
+    assert columns["EUR"].unresolved.tolist() == [False, False, False, True]
+    assert columns["MXN"].resolved.tolist() == [True, False, True, False]
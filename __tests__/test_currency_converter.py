@@ -0,0 +1,42 @@
+import numpy as np
+
+from src.libs.currency_converter import convert_to_usd
+
+
+def test_convert_to_usd_resolves_each_group_once():
+    rates = {("EUR", "2024-11-10"): 0.5, ("MXN", "2024-11-10"): 20.0}
+    lookups = []
+
+    def resolver(currency, date):
+        lookups.append((currency, date))
+        return rates.get((currency, date))
+
+    result = convert_to_usd(
+        [10, 20, 40, 5, 7, None],
+        ["EUR", "EUR", "MXN", "USD $", "JPY", "EUR"],
+        ["2024-11-10"] * 6,
+        resolver,
+    )
+
+    np.testing.assert_allclose(result.values[:4], [20.0, 40.0, 2.0, 5.0])
+    assert result.resolved.tolist() == [True, True, True, True, False, False]
+    assert result.unresolved.tolist() == [False, False, False, False, True, True]
+    assert sorted(lookups) == [
+        ("EUR", "2024-11-10"),
+        ("JPY", "2024-11-10"),
+        ("MXN", "2024-11-10"),
+    ]
+
+
+def test_convert_to_usd_handles_large_columns():
+    size = 200_000
+    currencies = np.where(np.arange(size) % 2 == 0, "EUR", "MXN").tolist()
+    dates = [f"2024-11-{day % 28 + 1:02d}" for day in range(size)]
+
+    result = convert_to_usd(
+        np.ones(size), currencies, dates, lambda currency, date: 0.5 if currency == "EUR" else 20.0
+    )
+
+    assert result.resolved.all()
+    assert result.values[0] == 2.0
+    assert result.values[1] == 0.05
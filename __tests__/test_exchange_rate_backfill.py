@@ -0,0 +1,94 @@
+import os
+from decimal import Decimal
+
+import pytest
+import requests
+
+from src.entity.exchange_rate_entity import ExchangeRateEntity
+from src.libs import exchange_rate_backfill
+from src.libs.exchange_rate_backfill import (
+    CurrencyApiHistoricalRateSource,
+    ExchangeRateBackfill,
+    FileHistoricalRateSource,
+    HistoricalRateSource,
+    date_range,
+)
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "historical_rates.json")
+
+
+class ConstantRateSource(HistoricalRateSource):
+    def fetch_rates(self, rate_date):
+        return {"EUR/USD": 0.9}
+
+
+def test_file_source_maps_selected_currencies():
+    source = FileHistoricalRateSource(FIXTURE)
+
+    assert source.fetch_rates("2024-01-02") == {
+        "COP/USD": 3890.5,
+        "EUR/USD": 0.912,
+        "MXN/USD": 16.95,
+    }
+    assert source.fetch_rates("2024-01-03") is None
+
+
+def test_backfill_writes_range_and_reports_missing_dates(local_exchange_rate_repository):
+    local_exchange_rate_repository.post_exchange_rate(
+        ExchangeRateEntity(date="2024-01-01", rates={"EUR/USD": 1.0})
+    )
+    backfill = ExchangeRateBackfill(
+        local_exchange_rate_repository, FileHistoricalRateSource(FIXTURE), max_workers=2
+    )
+
+    result = backfill.run("2024-01-01", "2024-01-04")
+
+    assert result.written == 2
+    assert result.skipped_dates == ["2024-01-01"]
+    assert result.missing_dates == ["2024-01-03"]
+    assert local_exchange_rate_repository.get_exchange_rate_by_currency(
+        "2024-01-01", "EUR"
+    ) == Decimal("1")
+    assert local_exchange_rate_repository.get_exchange_rate_by_currency(
+        "2024-01-04", "MXN"
+    ) == Decimal("17.08")
+
+
+def test_backfill_writes_years_in_concurrent_chunks(local_exchange_rate_repository):
+    dates = date_range("2020-01-01", "2022-12-31")
+
+    result = ExchangeRateBackfill(
+        local_exchange_rate_repository, ConstantRateSource(), max_workers=4
+    ).run(dates[0], dates[-1])
+
+    assert result.written == len(dates) == 1096
+    assert len(local_exchange_rate_repository.get_exchange_rates_by_dates(dates)) == 1096
+
+
+def test_historical_rate_source_is_abstract():
+    with pytest.raises(TypeError):
+        HistoricalRateSource()
+
+
+class FlakySession:
+    def get(self, url, timeout):
+        if "2024-01-02" in url:
+            raise requests.ConnectionError("connection reset")
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'{"usd": {"eur": 0.9}}'
+        return response
+
+
+def test_backfill_reports_dates_failing_with_network_errors_as_missing(
+    local_exchange_rate_repository, monkeypatch
+):
+    monkeypatch.setattr(exchange_rate_backfill, "get_http_session", lambda name: FlakySession())
+    source = CurrencyApiHistoricalRateSource(selected_currencies=["EUR"])
+
+    result = ExchangeRateBackfill(local_exchange_rate_repository, source, max_workers=2).run(
+        "2024-01-01", "2024-01-03"
+    )
+
+    assert result.written == 2
+    assert result.missing_dates == ["2024-01-02"]
@@ -0,0 +1,126 @@
+from datetime import datetime
+
+import pytest
+
+from src.entity.exchange_rate_entity import ExchangeRateEntity
+from src.repository.exchange_rate_cache import (
+    MISSING,
+    CachedExchangeRateRepository,
+    ExchangeRateCache,
+    build_exchange_rate_repository,
+    get_exchange_rate_cache,
+)
+from src.repository.exchange_rate_repository import ExchangeRateRepository
+
+
+class DynamoDBCallCounter:
+    def __init__(self, repository):
+        self.operations = []
+        repository.dynamodb.meta.client.meta.events.register(
+            "before-call.dynamodb", self
+        )
+
+    def __call__(self, model, **kwargs):
+        self.operations.append(model.name)
+
+
+@pytest.fixture
+def cached_repository(local_exchange_rate_repository):
+    local_exchange_rate_repository.post_exchange_rates(
+        [
+            ExchangeRateEntity(date="2024-01-01", rates={"EUR/USD": 0.9, "MXN/USD": 17.0}),
+            ExchangeRateEntity(date="2024-01-02", rates={"EUR/USD": 0.91, "MXN/USD": 17.1}),
+        ]
+    )
+    return CachedExchangeRateRepository("ExchangeRates")
+
+
+def test_warm_reads_of_past_dates_skip_dynamodb(cached_repository):
+    dates = ["2024-01-01", "2024-01-02", "2024-01-03"]
+    first = cached_repository.get_exchange_rates_by_dates(dates)
+    counter = DynamoDBCallCounter(cached_repository)
+
+    # A new repository in the same process shares the module-level cache
+    warm = CachedExchangeRateRepository("ExchangeRates")
+    second = warm.get_exchange_rates_by_dates(dates)
+
+    assert sorted(first) == sorted(second) == ["2024-01-01", "2024-01-02"]
+    assert float(second["2024-01-01"]["Rates"]["EUR/USD"]) == 0.9
+    assert warm.get_exchange_rate_by_date("2024-01-03") is None
+    assert float(warm.get_exchange_rate_by_currency("2024-01-02", "MXN")) == 17.1
+    assert counter.operations == []
+
+
+def test_disk_tier_serves_dates_after_memory_is_lost(cached_repository):
+    cached_repository.get_exchange_rates_by_dates(["2024-01-01", "2024-01-03"])
+    counter = DynamoDBCallCounter(cached_repository)
+
+    # A fresh process in the same execution environment only has the /tmp file
+    cache = ExchangeRateCache("ExchangeRates")
+    repository = CachedExchangeRateRepository("ExchangeRates", cache=cache)
+
+    items = repository.get_exchange_rates_by_dates(["2024-01-01", "2024-01-03"])
+
+    assert dict(items["2024-01-01"]["Rates"]) == {"EUR/USD": 0.9, "MXN/USD": 17.0}
+    assert "2024-01-03" not in items
+    assert counter.operations == []
+
+
+def test_writes_invalidate_cached_dates(cached_repository):
+    assert float(cached_repository.get_exchange_rate_by_currency("2024-01-01", "EUR")) == 0.9
+
+    cached_repository.post_exchange_rate(
+        ExchangeRateEntity(date="2024-01-01", rates={"EUR/USD": 0.95})
+    )
+    assert float(cached_repository.get_exchange_rate_by_currency("2024-01-01", "EUR")) == 0.95
+
+    cached_repository.delete_exchange_rate("2024-01-01", "EUR")
+    assert cached_repository.get_exchange_rate_by_currency("2024-01-01", "EUR") is None
+
+    cached_repository.upsert_exchange_rate("2024-01-03", "EUR", 0.93)
+    assert float(cached_repository.get_exchange_rate_by_currency("2024-01-03", "EUR")) == 0.93
+
+
+def test_today_and_missing_dates_expire(tmp_path):
+    cache = ExchangeRateCache("Rates", directory=str(tmp_path), today_ttl=60, missing_ttl=600)
+    today = datetime.now().date().isoformat()
+
+    cache.put(today, {"Date": today, "Rates": {"EUR/USD": 0.9}}, now=1000)
+    cache.put("2024-01-01", {"Date": "2024-01-01", "Rates": {"EUR/USD": 0.9}}, now=1000)
+    cache.put("2024-01-06", MISSING, now=1000)
+
+    assert cache.get(today, now=1059) is not None
+    assert cache.get(today, now=1061) is None
+    assert cache.get("2024-01-06", now=1599) is MISSING
+    assert cache.get("2024-01-06", now=1601) is None
+    assert cache.get("2024-01-01", now=10**12) is not None
+
+
+def test_memory_tier_evicts_least_recently_used(tmp_path):
+    cache = ExchangeRateCache("Rates", max_entries=2, disk=False)
+
+    for day in (1, 2, 3):
+        cache.put(f"2024-01-0{day}", {"Date": f"2024-01-0{day}", "Rates": {}})
+
+    assert cache.get("2024-01-01") is None
+    assert cache.get("2024-01-03") is not None
+
+
+def test_items_outside_the_packed_layout_stay_in_memory(tmp_path):
+    cache = ExchangeRateCache("Rates", directory=str(tmp_path))
+    item = {"Date": "2024-01-01", "BaseCurrency": "USD", "Rates": {"XYZ/USD": 2.0}}
+    cache.put("2024-01-01", item)
+
+    assert cache.get("2024-01-01") is item
+    assert ExchangeRateCache("Rates", directory=str(tmp_path)).get("2024-01-01") is None
+
+
+def test_build_repository_honours_cache_mode(monkeypatch):
+    monkeypatch.setenv("EXCHANGE_RATE_CACHE", "off")
+    assert type(build_exchange_rate_repository("ExchangeRates")) is ExchangeRateRepository
+
+    monkeypatch.setenv("EXCHANGE_RATE_CACHE", "memory")
+    repository = build_exchange_rate_repository("Other")
+    assert isinstance(repository, CachedExchangeRateRepository)
+    assert repository.cache is get_exchange_rate_cache("Other")
+    assert repository.cache.disk is None
@@ -1,7 +1,11 @@
 import pytest
 from datetime import datetime
 from decimal import Decimal
-from src.entity.exchange_rate_entity import ExchangeRateEntity
+from src.entity.exchange_rate_entity import (
+    CURRENCY_CODES,
+    PACKED_ENCODING,
+    ExchangeRateEntity,
+)
 
 
 @pytest.fixture
@@ -78,3 +82,39 @@ def test_entity_creation_from_dict():
     assert entity.date == "2024-11-10"
     assert entity.base_currency == "USD"
     assert entity.rates == data["Rates"]
+
+
+def test_entity_packed_round_trip():
+    """
+    Test that the packed format keeps every rate, including unknown currencies.
+    """
+    # Arrange
+    rates = {"COP/USD": 3890.5, "EUR/USD": 0.94, "MXN/USD": 18.7, "XYZ/USD": 2.5}
+    entity = ExchangeRateEntity(date="2024-11-10", rates=rates)
+
+    # Act
+    packed_dict = entity.to_packed_dict()
+    decoded = ExchangeRateEntity.from_dict(packed_dict)
+
+    # Assert
+    assert packed_dict["Encoding"] == PACKED_ENCODING
+    assert len(packed_dict["RatesPacked"]) == 8 * len(CURRENCY_CODES)
+    assert packed_dict["Rates"] == {"XYZ/USD": Decimal("2.5")}
+    assert decoded.rates == rates
+    assert decoded.rates["EUR/USD"] == 0.94
+    assert "JPY/USD" not in decoded.rates
+
+
+def test_packed_rates_overlay_takes_precedence():
+    """
+    Test that single-currency updates stored in the Rates map override packed values.
+    """
+    # Arrange
+    packed_dict = ExchangeRateEntity(rates={"EUR/USD": 0.94}).to_packed_dict()
+    packed_dict["Rates"] = {"EUR/USD": Decimal("0.95"), "JPY/USD": Decimal("150")}
+
+    # Act
+    rates = ExchangeRateEntity.from_dict(packed_dict).rates
+
+    # Assert
+    assert dict(rates) == {"EUR/USD": Decimal("0.95"), "JPY/USD": Decimal("150")}
@@ -0,0 +1,84 @@
+import threading
+from datetime import date as date_type
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+
+from src.entity.exchange_rate_entity import ExchangeRateEntity
+from src.repository.exchange_rate_index import ExchangeRateIndex
+
+
+@pytest.fixture
+def rate_index():
+    return ExchangeRateIndex.from_items(
+        [
+            {"Date": "2024-11-08", "Rates": {"EUR/USD": 0.93, "MXN/USD": 20.1}},
+            {"Date": "2024-11-04", "Rates": {"EUR/USD": 0.91}},
+            {"Date": "2024-11-11", "Rates": {"EUR/USD": 0.94}},
+        ],
+        max_staleness_days=3,
+    )
+
+
+def test_exact_lookup(rate_index):
+    assert rate_index.get_rate("EUR", "2024-11-08") == 0.93
+    assert rate_index.snapshot("2024-11-08") == {"EUR/USD": 0.93, "MXN/USD": 20.1}
+
+
+def test_nearest_previous_date_within_staleness(rate_index):
+    # Weekend dates resolve to Friday's rate
+    assert rate_index.resolve("EUR", "2024-11-10") == (0.93, "2024-11-08")
+    assert rate_index.resolve("MXN", "2024-11-11") == (20.1, "2024-11-08")
+    assert rate_index.get_rate("MXN", "2024-11-12") is None
+    assert rate_index.get_rate("EUR", "2024-11-10", max_staleness_days=0) is None
+
+
+def test_dates_before_first_entry_and_unknown_currencies(rate_index):
+    assert rate_index.get_rate("EUR", "2024-11-01") is None
+    assert rate_index.get_rate("JPY", "2024-11-08") is None
+
+
+def test_add_replaces_existing_date(rate_index):
+    rate_index.add("2024-11-08", {"EUR/USD": 0.95})
+
+    assert rate_index.get_rate("EUR", "2024-11-09") == 0.95
+
+
+def test_build_rate_index_from_repository(local_exchange_rate_repository):
+    for date, rate in [("2024-11-08", 0.93), ("2024-11-11", 0.94)]:
+        local_exchange_rate_repository.post_exchange_rate(
+            ExchangeRateEntity(date=date, rates={"EUR/USD": rate})
+        )
+
+    rate_index = local_exchange_rate_repository.build_rate_index(max_staleness_days=3)
+
+    assert rate_index.fully_loaded
+    assert rate_index.get_rate("EUR", "2024-11-10") == Decimal("0.93")
+
+
+def test_lookups_stay_consistent_while_dates_are_added():
+    rate_index = ExchangeRateIndex(max_staleness_days=10000)
+    days = [date_type(2020, 1, 1) + timedelta(days=offset) for offset in range(2000)]
+    rate_index.add(days[-1].isoformat(), {"EUR/USD": float(days[-1].toordinal())})
+    mismatches = []
+
+    def read():
+        for day in reversed(days):
+            rate, found_date = rate_index.resolve("EUR", day.isoformat())
+            found_snapshot_date, snapshot = rate_index.resolve_snapshot(day.isoformat())
+            if rate is not None and rate != date_type.fromisoformat(found_date).toordinal():
+                mismatches.append((day, rate, found_date))
+            if snapshot is not None and snapshot["EUR/USD"] != date_type.fromisoformat(
+                found_snapshot_date
+            ).toordinal():
+                mismatches.append((day, snapshot, found_snapshot_date))
+
+    # Dates are inserted in front of existing ones, shifting both lists
+    reader = threading.Thread(target=read)
+    reader.start()
+    for day in reversed(days[:-1]):
+        rate_index.add(day.isoformat(), {"EUR/USD": float(day.toordinal())})
+    reader.join()
+
+    assert mismatches == []
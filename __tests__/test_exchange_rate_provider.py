@@ -0,0 +1,205 @@
+import threading
+import time
+
+import pytest
+
+import create_exchange_rate_entry_handler as handler_module
+from src.libs.exchange_rate_provider import (
+    CurrencyApiProvider,
+    ExchangeRate,
+    FrankfurterProvider,
+    OpenErApiProvider,
+    RateProvider,
+    RateSnapshot,
+    get_rate_providers,
+)
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    def __init__(self, routes):
+        # URL -> (delay in seconds, status code, payload)
+        self.routes = routes
+        self.requested = []
+        self.timeouts = []
+        self.lock = threading.Lock()
+
+    def get(self, url, timeout=None):
+        with self.lock:
+            self.requested.append(url)
+            self.timeouts.append(timeout)
+        delay, status_code, payload = self.routes[url]
+        time.sleep(delay)
+        return FakeResponse(status_code, payload)
+
+
+OPEN_ER_URL = "https://open.er-api.com/v6/latest/USD"
+CURRENCY_API_URL = "https://cdn.jsdelivr.net/npm/@fawazahmed0/currency-api@latest/v1/currencies/usd.json"
+
+OPEN_ER_PAYLOAD = {
+    "result": "success",
+    "time_next_update_unix": 4102444800,
+    "rates": {"USD": 1, "COP": 4000.0, "EUR": 0.93, "MXN": 20.1},
+}
+CURRENCY_API_PAYLOAD = {"date": "2024-11-10", "usd": {"cop": 4100.0, "eur": 0.94, "mxn": 20.2}}
+FRANKFURTER_URL = "https://api.frankfurter.app/latest?from=USD"
+FRANKFURTER_PAYLOAD = {"base": "USD", "rates": {"EUR": 0.95, "MXN": 20.3}}
+
+
+def exchange_rate(routes, **kwargs):
+    rate = ExchangeRate(
+        providers=[OpenErApiProvider(), CurrencyApiProvider()],
+        hedge_delay=kwargs.pop("hedge_delay", 0.05),
+        deadline=kwargs.pop("deadline", 2),
+        **kwargs,
+    )
+    rate.session = FakeSession(routes)
+    return rate
+
+
+@pytest.fixture(autouse=True)
+def default_currencies(monkeypatch):
+    for variable in ("EXCHANGE_RATE_CURRENCIES", "EXCHANGE_RATE_STORAGE_FORMAT", "EXCHANGE_RATE_API_URL"):
+        monkeypatch.delenv(variable, raising=False)
+
+
+def test_first_provider_answers_without_hedging():
+    rate = exchange_rate(
+        {OPEN_ER_URL: (0, 200, OPEN_ER_PAYLOAD), CURRENCY_API_URL: (0, 200, CURRENCY_API_PAYLOAD)}
+    )
+
+    snapshot = rate.fetch_snapshot()
+
+    assert snapshot.source == "open_er_api"
+    assert snapshot.next_update_unix == 4102444800
+    assert rate.session.requested == [OPEN_ER_URL]
+    assert rate.session.timeouts == [(3.05, 5.0)]
+    assert rate.select_rates(snapshot.rates) == {"COP/USD": 4000.0, "EUR/USD": 0.93, "MXN/USD": 20.1}
+
+
+def test_slow_provider_is_hedged():
+    rate = exchange_rate(
+        {OPEN_ER_URL: (1, 200, OPEN_ER_PAYLOAD), CURRENCY_API_URL: (0, 200, CURRENCY_API_PAYLOAD)}
+    )
+
+    start = time.perf_counter()
+    snapshot = rate.fetch_snapshot()
+
+    assert time.perf_counter() - start < 0.5
+    assert snapshot.source == "currency_api"
+    assert snapshot.rates["EUR"] == 0.94
+
+
+def test_failed_or_invalid_answers_fail_over_immediately():
+    rate = exchange_rate(
+        {
+            OPEN_ER_URL: (0, 200, {"result": "error", "error-type": "unsupported-code"}),
+            CURRENCY_API_URL: (0, 200, CURRENCY_API_PAYLOAD),
+        },
+        hedge_delay=5,
+    )
+
+    assert rate.fetch_snapshot().source == "currency_api"
+
+    rate = exchange_rate(
+        {OPEN_ER_URL: (0, 500, {}), CURRENCY_API_URL: (0, 200, {"usd": {"eur": 0.94}})},
+        hedge_delay=5,
+    )
+
+    with pytest.raises(Exception, match="open_er_api returned status 500.*currency_api returned no usable rates"):
+        rate.fetch_snapshot()
+
+
+def test_failure_launches_the_next_provider_while_others_are_in_flight():
+    rate = ExchangeRate(
+        providers=[OpenErApiProvider(), CurrencyApiProvider(), FrankfurterProvider()],
+        hedge_delay=0.5,
+        deadline=3,
+    )
+    rate.session = FakeSession(
+        {
+            OPEN_ER_URL: (2, 200, OPEN_ER_PAYLOAD),
+            CURRENCY_API_URL: (0, 500, {}),
+            FRANKFURTER_URL: (0, 200, FRANKFURTER_PAYLOAD),
+        }
+    )
+
+    start = time.perf_counter()
+    snapshot = rate.fetch_snapshot()
+
+    # Frankfurter is asked right after currency_api fails, not a hedge delay later
+    assert time.perf_counter() - start < 0.8
+    # It publishes no COP rate, so only the currencies it covers are required
+    assert snapshot.source == "frankfurter"
+    assert rate.select_rates(snapshot.rates) == {"EUR/USD": 0.95, "MXN/USD": 20.3}
+
+
+def test_fetch_gives_up_at_the_deadline():
+    rate = exchange_rate(
+        {OPEN_ER_URL: (1, 200, OPEN_ER_PAYLOAD), CURRENCY_API_URL: (1, 200, CURRENCY_API_PAYLOAD)},
+        deadline=0.2,
+    )
+
+    start = time.perf_counter()
+    with pytest.raises(Exception, match="no answer within"):
+        rate.fetch_snapshot()
+
+    assert time.perf_counter() - start < 0.5
+
+
+def test_fresh_snapshot_is_reused_without_requests():
+    rate = exchange_rate({})
+    rate.last_snapshot = RateSnapshot({"EUR": 0.93}, "open_er_api", next_update_unix=time.time() + 60)
+
+    assert rate.fetch_data() == {"EUR/USD": 0.93}
+    assert rate.session.requested == []
+
+
+def test_providers_are_configurable(monkeypatch):
+    monkeypatch.setenv("EXCHANGE_RATE_PROVIDERS", "currency_api, frankfurter")
+
+    assert [provider.name for provider in get_rate_providers()] == ["currency_api", "frankfurter"]
+
+    monkeypatch.setenv("EXCHANGE_RATE_PROVIDERS", "unknown")
+    with pytest.raises(Exception, match="Unknown exchange rate provider"):
+        get_rate_providers()
+
+
+def test_entry_handler_skips_refresh_within_validity_window(local_exchange_rate_repository, monkeypatch):
+    rate = exchange_rate(
+        {OPEN_ER_URL: (0, 200, OPEN_ER_PAYLOAD), CURRENCY_API_URL: (0, 200, CURRENCY_API_PAYLOAD)}
+    )
+    monkeypatch.setattr(handler_module, "get_repository", lambda table_name: local_exchange_rate_repository)
+    monkeypatch.setattr(handler_module, "get_exchange_rate", lambda: rate)
+
+    first = handler_module.create_exchange_rate_entry_handler({}, None)
+    rate.last_snapshot = None
+    second = handler_module.create_exchange_rate_entry_handler({}, None)
+
+    assert first["body"] == "Exchange rate entry created successfully."
+    assert second["body"] == "Exchange rate entry is up to date."
+    assert rate.session.requested == [OPEN_ER_URL]
+
+    stored = local_exchange_rate_repository.get_exchange_rate_by_date(time.strftime("%Y-%m-%d"))
+    assert stored["NextUpdateUnix"] == 4102444800
+    assert stored["Source"] == "open_er_api"
+
+
+def test_providers_must_implement_url_and_parse():
+    class UrlOnlyProvider(RateProvider):
+        name = "url_only"
+        default_url = "https://example.com"
+
+        def url(self, base_currency):
+            return self.api_url
+
+    with pytest.raises(TypeError):
+        UrlOnlyProvider()
@@ -61,3 +61,188 @@ def test_delete_exchange_rate(exchange_rate_repository):
     # Verify that the JPY rate is deleted
     rate = exchange_rate_repository.get_exchange_rate_by_currency("2021-09-01", "JPY")
     assert rate is None
+
+
+# Test case to fetch many dates in chunked BatchGetItem calls
+def test_get_exchange_rates_by_dates(local_exchange_rate_repository):
+    dates = [f"2021-{month:02d}-{day:02d}" for month in range(1, 6) for day in range(1, 29)]
+    for date in dates:
+        local_exchange_rate_repository.post_exchange_rate(
+            ExchangeRateEntity(date=date, rates={"EUR/USD": 0.9})
+        )
+
+    items = local_exchange_rate_repository.get_exchange_rates_by_dates(
+        dates + ["1999-01-01"]
+    )
+
+    assert len(dates) > 100
+    assert set(items) == set(dates)
+    assert items["2021-03-15"]["Rates"]["EUR/USD"] == Decimal("0.9")
+
+
+# Test case to set and remove single currencies atomically
+def test_upsert_and_remove_single_currency(local_exchange_rate_repository):
+    repository = local_exchange_rate_repository
+
+    assert repository.upsert_exchange_rate("2021-09-02", "EUR", 1.2) is True
+    assert repository.upsert_exchange_rate("2021-09-02", "JPY", 0.009) is True
+    assert repository.get_exchange_rate_by_currencies("2021-09-02", ["EUR", "JPY"]) == {
+        "EUR": Decimal("1.2"),
+        "JPY": Decimal("0.009"),
+    }
+
+    assert repository.remove_exchange_rate("2021-09-02", "JPY") is True
+    assert repository.delete_exchange_rate("2021-09-02", "JPY") is False
+    assert repository.get_exchange_rate_by_currency("2021-09-02", "JPY") is None
+    assert repository.get_exchange_rate_by_date("2021-09-02")["Rates"] == {
+        "EUR/USD": Decimal("1.2")
+    }
+
+
+# Test case to guard an upsert with a condition expression
+def test_upsert_with_condition(local_exchange_rate_repository):
+    from boto3.dynamodb.conditions import Attr
+
+    repository = local_exchange_rate_repository
+    repository.post_exchange_rate(
+        ExchangeRateEntity(date="2021-09-03", rates={"EUR/USD": 1.1})
+    )
+
+    assert repository.upsert_exchange_rate(
+        "2021-09-03", "EUR", 1.3, condition=Attr("BaseCurrency").eq("EUR")
+    ) is False
+    assert repository.upsert_exchange_rate(
+        "2021-09-03", "EUR", 1.3, condition=Attr("BaseCurrency").eq("USD")
+    ) is True
+    assert repository.get_exchange_rate_by_currency("2021-09-03", "EUR") == Decimal("1.3")
+
+
+# Test case to read only the requested currencies
+def test_get_projected_rates(local_exchange_rate_repository):
+    repository = local_exchange_rate_repository
+    repository.post_exchange_rate(
+        ExchangeRateEntity(date="2021-09-04", rates={"EUR/USD": 1.1, "MXN/USD": 20, "COP/USD": 4000})
+    )
+
+    assert repository.get_projected_rates("2021-09-04", ["MXN"]) == {"MXN/USD": Decimal("20")}
+    assert repository.get_projected_rates("1999-01-01", ["MXN"]) is None
+    assert repository.get_exchange_rate_by_currencies("1999-01-01", ["MXN"]) == {}
+
+
+# Test case to read and mutate items stored in the packed format
+def test_packed_storage_format(local_exchange_rate_repository):
+    repository = local_exchange_rate_repository
+    repository.storage_format = "packed"
+    repository.post_exchange_rate(
+        ExchangeRateEntity(date="2021-09-05", rates={"EUR/USD": 1.25, "MXN/USD": 20.5})
+    )
+
+    assert repository.get_exchange_rate_by_currency("2021-09-05", "EUR") == 1.25
+    assert repository.get_exchange_rates_by_dates(["2021-09-05"])["2021-09-05"]["Rates"] == {
+        "EUR/USD": 1.25,
+        "MXN/USD": 20.5,
+    }
+
+    assert repository.upsert_exchange_rate("2021-09-05", "EUR", 1.5) is True
+    assert repository.get_exchange_rate_by_currency("2021-09-05", "EUR") == Decimal("1.5")
+
+    assert repository.delete_exchange_rate("2021-09-05", "MXN") is True
+    assert repository.get_exchange_rate_by_currency("2021-09-05", "MXN") is None
+    assert dict(repository.get_exchange_rate_by_date("2021-09-05")["Rates"]) == {
+        "EUR/USD": Decimal("1.5")
+    }
+
+
+def _count_operations(repository):
+    operations = []
+    repository.dynamodb.meta.client.meta.events.register(
+        "before-call.dynamodb", lambda model, **kwargs: operations.append(model.name)
+    )
+    return operations
+
+
+def test_get_rate_series_is_one_query(local_exchange_rate_repository):
+    local_exchange_rate_repository.post_exchange_rate(
+        ExchangeRateEntity(date="2024-01-01", rates={"EUR/USD": 0.9, "MXN/USD": 17.0})
+    )
+    local_exchange_rate_repository.post_exchange_rate(
+        ExchangeRateEntity(date="2024-01-03", rates={"MXN/USD": 17.2})
+    )
+    ExchangeRateRepository("ExchangeRates", storage_format="packed").post_exchange_rate(
+        ExchangeRateEntity(date="2024-02-01", rates={"EUR/USD": 0.95})
+    )
+    operations = _count_operations(local_exchange_rate_repository)
+
+    series = local_exchange_rate_repository.get_rate_series("EUR", "2023-12-01", "2024-12-31")
+
+    assert [(date, float(rate)) for date, rate in series] == [
+        ("2024-01-01", 0.9),
+        ("2024-02-01", 0.95),
+    ]
+    assert operations == ["Query"]
+    # Rollup items live in the same table but are not daily entries
+    assert sorted(item["Date"] for item in local_exchange_rate_repository.scan_exchange_rates()) == [
+        "2024-01-01",
+        "2024-01-03",
+        "2024-02-01",
+    ]
+
+
+def test_rollups_follow_writes(local_exchange_rate_repository):
+    repository = local_exchange_rate_repository
+    repository.maintain_rollups = True
+    for date, rate in (("2024-01-01", 0.9), ("2024-01-02", 0.92), ("2024-01-03", 0.91), ("2024-02-01", 0.95)):
+        assert repository.post_exchange_rate(ExchangeRateEntity(date=date, rates={"EUR/USD": rate}))
+
+    def monthly():
+        return [
+            (rollup["Period"], rollup["Count"], round(rollup["Average"], 4), rollup["Min"], rollup["Max"])
+            for rollup in repository.get_rate_rollups("EUR", "month", "2024-01", "2024-12")
+        ]
+
+    assert monthly() == [("2024-01", 3, 0.91, 0.9, 0.92), ("2024-02", 1, 0.95, 0.95, 0.95)]
+
+    # Replacing a middle value is applied incrementally, replacing the maximum recomputes
+    repository.post_exchange_rate(ExchangeRateEntity(date="2024-01-03", rates={"EUR/USD": 0.915}))
+    repository.post_exchange_rate(ExchangeRateEntity(date="2024-01-02", rates={"EUR/USD": 0.91}))
+    assert monthly()[0] == ("2024-01", 3, 0.9083, 0.9, 0.915)
+
+    repository.upsert_exchange_rate("2024-02-02", "EUR", 0.97)
+    repository.delete_exchange_rate("2024-01-01", "EUR")
+    assert monthly() == [("2024-01", 2, 0.9125, 0.91, 0.915), ("2024-02", 2, 0.96, 0.95, 0.97)]
+
+    operations = _count_operations(repository)
+    yearly = repository.get_rate_rollups("EUR", "year", "2020", "2024")
+    assert [(rollup["Period"], rollup["Count"]) for rollup in yearly] == [("2024", 4)]
+    assert operations == ["Query"]
+
+
+def test_batch_writes_and_rebuild_recompute_rollups(local_exchange_rate_repository):
+    repository = local_exchange_rate_repository
+    repository.maintain_rollups = True
+    repository.post_exchange_rates(
+        [ExchangeRateEntity(date=f"2024-03-{day:02d}", rates={"EUR/USD": day / 100}) for day in range(1, 11)]
+    )
+
+    [march] = repository.get_rate_rollups("EUR", "month", "2024-03", "2024-03")
+    assert (march["Count"], march["Min"], march["Max"]) == (10, 0.01, 0.1)
+
+    ExchangeRateRepository("ExchangeRates", maintain_rollups=False).post_exchange_rate(
+        ExchangeRateEntity(date="2024-03-11", rates={"EUR/USD": 0.5})
+    )
+    assert repository.rebuild_rollups("2024-03-01", "2024-03-31") == 2
+    [march] = repository.get_rate_rollups("EUR", "month", "2024-03", "2024-03")
+    assert (march["Count"], march["Max"]) == (11, 0.5)
+
+
+def test_rollups_are_off_by_default_and_require_the_series_index(local_exchange_rate_repository, monkeypatch):
+    assert not local_exchange_rate_repository.maintain_rollups
+
+    monkeypatch.setenv("EXCHANGE_RATE_ROLLUPS", "on")
+    repository = ExchangeRateRepository("ExchangeRates", series_index_name="Missing-index")
+    entry = ExchangeRateEntity(date="2024-01-01", rates={"EUR/USD": 0.9})
+
+    with pytest.raises(Exception, match="has no Missing-index index"):
+        repository.post_exchange_rate(entry)
+    assert local_exchange_rate_repository.get_exchange_rate_by_date("2024-01-01") is None
+    assert ExchangeRateRepository("ExchangeRates").post_exchange_rate(entry)
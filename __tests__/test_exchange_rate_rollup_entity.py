@@ -0,0 +1,41 @@
+from decimal import Decimal
+
+from src.entity.exchange_rate_rollup_entity import (
+    ExchangeRateRollupEntity,
+    is_rollup_key,
+    rollup_key,
+    rollup_periods,
+)
+
+
+def test_rollup_keys_sort_after_daily_dates():
+    assert rollup_periods("2024-01-15") == [("month", "2024-01"), ("year", "2024")]
+    assert rollup_key("month", "2024-01") == "M#2024-01"
+    assert is_rollup_key("Y#2024") and not is_rollup_key("2024-01-15")
+    assert rollup_key("month", "2024-01") > "9999-12-31"
+
+
+def test_apply_replaces_a_dates_contribution():
+    rollup = ExchangeRateRollupEntity.from_rates(
+        "month",
+        "2024-01",
+        {"2024-01-01": {"EUR/USD": 0.9}, "2024-01-02": {"EUR/USD": 0.92}, "2024-01-03": {"EUR/USD": 0.91}},
+    )
+
+    assert rollup.apply({"EUR/USD": 0.91}, {"EUR/USD": 0.915, "MXN/USD": 17})
+    assert rollup.summary("EUR/USD")["Count"] == 3
+    assert round(rollup.summary("EUR/USD")["Average"], 4) == 0.9117
+    assert rollup.summary("MXN/USD") == {"Period": "2024-01", "Count": 1, "Average": 17.0, "Min": 17.0, "Max": 17.0}
+
+    # The maximum cannot be taken back out
+    assert not rollup.apply({"EUR/USD": 0.92}, {"EUR/USD": 0.91})
+
+
+def test_rollup_round_trip():
+    rollup = ExchangeRateRollupEntity.from_rates("year", "2024", {"2024-05-01": {"EUR/USD": Decimal("0.9")}})
+    rollup.version = 3
+
+    item = rollup.to_dict()
+    assert item["Date"] == "Y#2024"
+    assert item["Stats"]["EUR/USD"] == {"Count": 1, "Sum": Decimal("0.9"), "Min": Decimal("0.9"), "Max": Decimal("0.9")}
+    assert ExchangeRateRollupEntity.from_dict(item) == rollup
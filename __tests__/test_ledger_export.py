@@ -0,0 +1,147 @@
+from decimal import Decimal
+
+import numpy as np
+import pytest
+
+from src.config.sync_jobs import LEDGER_PROPERTIES
+from src.libs.ledger_export import LedgerExporter, aggregate, read_ledger
+from src.libs.notion_manager_provider import NotionManager
+from src.libs.notion_schema import NotionProperties
+from src.libs.sync_runner import SyncJob
+
+
+def page(page_id, amount, currency, date, category, edited):
+    return {
+        "id": page_id,
+        "Local Amount": amount,
+        "Currencies": currency,
+        "Date": date,
+        "Amount": None,
+        "Category": category,
+        "last_edited_time": edited,
+    }
+
+
+@pytest.fixture
+def exporter(monkeypatch, tmp_path, fake_rate_repository):
+    manager = NotionManager()
+    manager.exchange_rate_repository = fake_rate_repository(
+        {
+            "2024-01-15": {"Date": "2024-01-15", "Rates": {"EUR/USD": Decimal("0.5")}},
+            "2024-02-03": {"Date": "2024-02-03", "Rates": {"MXN/USD": Decimal("20")}},
+        }
+    )
+    manager.max_rate_staleness_days = 0
+    manager.batches = []
+    manager.queries = []
+
+    def fake_iter_data(database_id, properties, filter_body):
+        manager.queries.append(filter_body)
+        return iter(manager.batches.pop(0))
+
+    monkeypatch.setattr(manager, "iter_data", fake_iter_data)
+    return LedgerExporter(manager, str(tmp_path), "npz")
+
+
+@pytest.fixture
+def job():
+    return SyncJob(
+        "expenses", "db", {**LEDGER_PROPERTIES, "Category": NotionProperties.SELECT}, {}
+    )
+
+
+def test_export_partitions_by_month_and_appends_incrementally(exporter, job, tmp_path):
+    manager = exporter.notion_manager
+    manager.batches = [
+        [
+            [
+                page("a", 10, "EUR", "2024-01-15", "Food", "2024-02-01T10:00:00.000Z"),
+                page("b", 40, "MXN", "2024-02-03", "Rent", "2024-02-03T10:00:00.000Z"),
+            ],
+            [page("c", 5, "USD", "2024-02-03", "Food", "2024-02-04T10:00:00.000Z")],
+        ],
+        # "a" moved to February; neither it nor "d" has a stored EUR rate
+        [
+            [
+                page("a", 30, "EUR", "2024-02-03", "Food", "2024-03-01T10:00:00.000Z"),
+                page("d", 7, "EUR", "2024-01-20", "Fun", "2024-03-02T10:00:00.000Z"),
+            ]
+        ],
+    ]
+
+    first = exporter.export(job)
+    assert (first.pages, first.months) == (3, ["2024-01", "2024-02"])
+    assert aggregate(read_ledger(str(tmp_path), "expenses"), "month") == {
+        "2024-01": {"total": 20.0, "count": 1},
+        "2024-02": {"total": 7.0, "count": 2},
+    }
+
+    second = exporter.export(job)
+
+    assert second.months == ["2024-01", "2024-02"]
+    assert manager.queries[1]["filter"] == {
+        "timestamp": "last_edited_time",
+        "last_edited_time": {"on_or_after": "2024-02-04T10:00:00.000Z"},
+    }
+    columns = read_ledger(str(tmp_path), "expenses")
+    assert sorted(columns["id"].tolist()) == ["a", "b", "c", "d"]
+    assert aggregate(columns, "Category") == {
+        "Food": {"total": 5.0, "count": 1},
+        "Rent": {"total": 2.0, "count": 1},
+    }
+    january = read_ledger(str(tmp_path), "expenses", months=["2024-01"])
+    assert january["id"].tolist() == ["d"]
+    assert np.isnan(january["usd_amount"][0])
+    assert second.last_edited_time == "2024-03-02T10:00:00.000Z"
+
+
+def test_parquet_export_round_trips(exporter, job, tmp_path):
+    pytest.importorskip("pyarrow")
+    exporter = LedgerExporter(exporter.notion_manager, str(tmp_path / "parquet"), "parquet")
+    exporter.notion_manager.batches = [
+        [[page("a", 10, "EUR", "2024-01-15", "Food", "2024-02-01T10:00:00.000Z")]]
+    ]
+
+    exporter.export(job)
+
+    columns = read_ledger(str(tmp_path / "parquet"), "expenses")
+    assert columns["usd_amount"].tolist() == [20.0]
+    assert columns["Category"].tolist() == ["Food"]
+
+
+def test_full_export_drops_removed_pages_and_bounds_buffered_rows(exporter, job, tmp_path):
+    exporter = LedgerExporter(exporter.notion_manager, str(tmp_path), "npz", max_buffered_rows=2)
+    manager = exporter.notion_manager
+    written = []
+    write_partition = exporter._write_partition
+    exporter._write_partition = lambda ledger_dir, month, rows, removed_ids, numeric_columns: (
+        written.append((month, sorted(rows), sorted(removed_ids)))
+        or write_partition(ledger_dir, month, rows, removed_ids, numeric_columns)
+    )
+    manager.batches = [
+        [
+            [
+                page("a", 10, "EUR", "2024-01-15", "Food", "2024-02-01T10:00:00.000Z"),
+                page("b", 40, "MXN", "2024-02-03", "Rent", "2024-02-03T10:00:00.000Z"),
+            ],
+            [page("c", 5, "USD", "2024-02-03", "Food", "2024-02-04T10:00:00.000Z")],
+        ],
+        # "b" was archived, so Notion no longer returns it
+        [
+            [
+                page("a", 10, "EUR", "2024-01-15", "Food", "2024-02-01T10:00:00.000Z"),
+                page("c", 5, "USD", "2024-02-03", "Food", "2024-02-04T10:00:00.000Z"),
+            ]
+        ],
+    ]
+
+    first = exporter.export(job)
+    # The first batch fills the buffer and is written before the second is read
+    assert written == [("2024-01", ["a"], []), ("2024-02", ["b"], []), ("2024-02", ["c"], [])]
+    assert first.months == ["2024-01", "2024-02"]
+
+    second = exporter.export(job, full=True)
+
+    assert "filter" not in manager.queries[1]
+    assert second.removed == 1
+    assert sorted(read_ledger(str(tmp_path), "expenses")["id"].tolist()) == ["a", "c"]
@@ -0,0 +1,118 @@
+import json
+
+import pytest
+
+from src.entity.exchange_rate_entity import ExchangeRateEntity
+from src.libs.metrics import (
+    HISTOGRAM_MAX_VALUES,
+    NULL_METRICS,
+    Histogram,
+    emit_metrics,
+    get_metrics,
+    metrics_scope,
+    timed,
+)
+
+
+@pytest.fixture
+def emf_mode(monkeypatch):
+    monkeypatch.setenv("METRICS_MODE", "emf")
+
+
+@timed("work")
+def work(fail=False):
+    if fail:
+        raise ValueError("boom")
+    return "done"
+
+
+def test_no_op_mode_records_and_prints_nothing(monkeypatch, capsys):
+    monkeypatch.delenv("METRICS_MODE", raising=False)
+
+    with metrics_scope("handler") as metrics:
+        assert metrics is NULL_METRICS
+        assert work() == "done"
+
+    assert capsys.readouterr().out == ""
+
+
+def test_handler_emits_one_emf_record(emf_mode, capsys):
+    @emit_metrics("test_handler")
+    def handler(event, context):
+        work()
+        with pytest.raises(ValueError):
+            work(fail=True)
+        get_metrics().record_http("notion.pages", 429, 0.2)
+        get_metrics().record_http("notion.pages", 200, 0.1)
+        return {"statusCode": 200}
+
+    assert handler({}, None) == {"statusCode": 200}
+    assert get_metrics() is NULL_METRICS
+
+    lines = capsys.readouterr().out.strip().splitlines()
+    assert len(lines) == 1
+    record = json.loads(lines[0])
+
+    directive = record["_aws"]["CloudWatchMetrics"][0]
+    assert directive["Namespace"] == "ExpenseTracker"
+    assert directive["Dimensions"] == [["Function"]]
+    assert {"Name": "work.calls", "Unit": "Count"} in directive["Metrics"]
+    assert {"Name": "notion.pages.latency", "Unit": "Milliseconds"} in directive["Metrics"]
+    assert record["Function"] == "test_handler"
+    assert record["work.calls"] == 2
+    assert record["work.errors"] == 1
+    assert record["notion.pages.status_429"] == 1
+    assert record["notion.pages.latency"] == [200.0, 100.0]
+    assert record["Histograms"]["work.duration"]["count"] == 2
+    assert record["invocation.calls"] == 1
+
+
+def test_histogram_folds_into_buckets():
+    histogram = Histogram("Milliseconds")
+    for value in range(1, 1001):
+        histogram.add(value)
+
+    values = histogram.emf_values()
+    summary = histogram.summary()
+
+    assert len(values["Values"]) == len(values["Counts"]) <= HISTOGRAM_MAX_VALUES
+    assert values["Values"][0] == 1.0 and values["Values"][-1] == 1000.0
+    # Every value is counted once, in the bucket it rounds to
+    assert sum(values["Counts"]) == 1000
+    assert dict(zip(values["Values"], values["Counts"])) == {
+        float(bucket): count for bucket, count in summary["buckets"].items()
+    }
+    # 892 to 1000 round to the top bucket
+    assert values["Counts"][0] == 1 and values["Counts"][-1] == 109
+    assert (values["Min"], values["Max"], values["Count"], values["Sum"]) == (1, 1000, 1000, 500500)
+    assert summary["count"] == 1000
+    assert summary["min"] == 1 and summary["max"] == 1000
+    assert sum(summary["buckets"].values()) == 1000
+
+
+def test_histogram_merges_buckets_beyond_the_emf_limit():
+    histogram = Histogram("None")
+    for exponent in range(-60, 60):
+        histogram.add(10 ** (exponent / 10))
+
+    values = histogram.emf_values()
+
+    assert len(values["Values"]) <= HISTOGRAM_MAX_VALUES
+    assert sum(values["Counts"]) == histogram.count == 120
+
+
+def test_repository_calls_record_consumed_capacity(emf_mode, local_exchange_rate_repository, capsys):
+    local_exchange_rate_repository.maintain_rollups = True
+    with metrics_scope("repository"):
+        local_exchange_rate_repository.post_exchange_rate(
+            ExchangeRateEntity(date="2024-11-10", rates={"EUR/USD": 0.93})
+        )
+        local_exchange_rate_repository.get_exchange_rates_by_dates(["2024-11-10"])
+
+    record = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+
+    assert record["repository.post_exchange_rate.calls"] == 1
+    # The entry, then its monthly and yearly rollups
+    assert record["dynamodb.PutItem.status_200"] == 3
+    assert record["dynamodb.PutItem.capacity_units"] > 0
+    assert record["dynamodb.BatchGetItem.capacity_units"] > 0
@@ -0,0 +1,164 @@
+import io
+import json
+from decimal import Decimal
+
+import pytest
+
+from src.libs.notion_export import (
+    FileSink,
+    iter_export_records,
+    iter_json_array,
+    parse_csv_date,
+    parse_csv_number,
+)
+from src.libs.notion_manager_provider import NotionManager, NotionProperties
+from src.libs.notion_page_writer import PageUpdateResult
+from src.repository.exchange_rate_index import ExchangeRateIndex
+
+PROPERTIES = {
+    "id": NotionProperties.ID,
+    "Local Amount": NotionProperties.NUMBER,
+    "Currencies": NotionProperties.SELECT,
+    "Date": NotionProperties.DATE,
+    "Amount": NotionProperties.NUMBER,
+}
+
+
+def page(page_id, amount, currency, date, filled=None):
+    return {
+        "id": page_id,
+        "properties": {
+            "Local Amount": {"type": "number", "number": amount},
+            "Currencies": {"type": "select", "select": {"name": currency}},
+            "Date": {"type": "date", "date": {"start": date, "end": None}},
+            "Amount": {"type": "number", "number": filled},
+        },
+    }
+
+
+PAGES = [
+    page("a", 10, "EUR", "2024-11-10"),
+    page("b", 40, "MXN", "2024-11-11", filled=2.0),
+    page("c", 5, "USD", "2024-11-11"),
+    page("d", 10, "EUR", "2023-01-01"),
+]
+
+
+@pytest.fixture
+def rate_index():
+    return ExchangeRateIndex.from_items(
+        [
+            {"Date": "2024-11-10", "Rates": {"EUR/USD": Decimal("0.5")}},
+            {"Date": "2024-11-11", "Rates": {"MXN/USD": Decimal("20")}},
+        ]
+    )
+
+
+def test_json_array_is_streamed_in_small_chunks():
+    text = json.dumps({"object": "list", "results": PAGES, "next_cursor": None})
+
+    pages = list(iter_json_array(io.StringIO(text), chunk_size=7))
+
+    assert pages == PAGES
+    assert list(iter_json_array(io.StringIO(json.dumps(PAGES)), chunk_size=5)) == PAGES
+    assert list(iter_json_array(io.StringIO('{"results": []}'))) == []
+
+
+def test_export_formats_map_to_the_same_records(tmp_path):
+    (tmp_path / "pages.jsonl").write_text("\n".join(json.dumps(entry) for entry in PAGES))
+    (tmp_path / "pages.csv").write_text(
+        "id,Local Amount,Currencies,Date,Amount\n"
+        'a,"€10.00",EUR,"November 10, 2024",\n'
+        "b,40,MXN,2024/11/11,2\n"
+        "c,$5,USD,November 11 2024 10:00 AM,\n"
+    )
+
+    jsonl = [record for batch in iter_export_records(str(tmp_path / "pages.jsonl"), PROPERTIES, 3) for record in batch]
+    csv_records = [record for batch in iter_export_records(str(tmp_path / "pages.csv"), PROPERTIES) for record in batch]
+
+    assert len(jsonl) == 4
+    assert csv_records[:2] == [
+        {"id": "a", "Local Amount": 10.0, "Currencies": "EUR", "Date": "2024-11-10", "Amount": None},
+        {"id": "b", "Local Amount": 40.0, "Currencies": "MXN", "Date": "2024-11-11", "Amount": 2.0},
+    ]
+    # Unparseable dates are left empty rather than guessed
+    assert csv_records[2]["Date"] is None
+    assert parse_csv_date("November 10, 2024 → November 12, 2024") == "2024-11-10"
+
+
+def test_csv_numbers_are_parsed_strictly():
+    assert parse_csv_number("$1,234.50") == 1234.5
+    assert parse_csv_number("-€10.00") == -10.0
+    assert parse_csv_number("$-5") == -5.0
+    assert parse_csv_number("1234 COP") == 1234.0
+    assert parse_csv_number(".5") == 0.5
+    assert parse_csv_number(" ") is None
+
+    for value in ("1.234,56", "1,23", "12.3.4", "12%", "--5", "-$-5", "5-", "abc", "1 2"):
+        with pytest.raises(Exception, match="Unrecognised number"):
+            parse_csv_number(value)
+
+
+def test_update_pages_from_export_writes_to_a_file(tmp_path, rate_index):
+    export = tmp_path / "export.json"
+    export.write_text(json.dumps({"results": PAGES}))
+    output = tmp_path / "amounts.jsonl"
+
+    report = NotionManager().update_pages_from_export(
+        str(export),
+        PROPERTIES,
+        "Amount",
+        sink=FileSink(str(output)),
+        skip_filled=True,
+        batch_size=2,
+        rate_index=rate_index,
+    )
+
+    written = [json.loads(line) for line in output.read_text().splitlines()]
+    assert written == [
+        {"id": "a", "properties": {"Amount": {"number": 20.0}}},
+        {"id": "c", "properties": {"Amount": {"number": 5.0}}},
+    ]
+    assert (report.pages, report.written, report.failed) == (4, 2, 1)
+    assert report.failures[0]["page_id"] == "d"
+
+
+def test_update_pages_from_export_reports_malformed_csv_rows_and_continues(tmp_path, rate_index):
+    export = tmp_path / "export.csv"
+    export.write_text(
+        "id,Local Amount,Currencies,Date,Amount\n"
+        'a,"€10.00",EUR,"November 10, 2024",\n'
+        'b,"1.234,56",EUR,"November 10, 2024",\n'
+        "c,$5,USD,2024/11/11,\n"
+        "d,$7,USD,2024/11/11,\n"
+        'e,"12%",USD,2024/11/11,\n'
+    )
+    output = tmp_path / "amounts.jsonl"
+
+    report = NotionManager().update_pages_from_export(
+        str(export), PROPERTIES, "Amount", sink=FileSink(str(output)), batch_size=2, rate_index=rate_index
+    )
+
+    written = [json.loads(line)["id"] for line in output.read_text().splitlines()]
+    assert written == ["a", "c", "d"]
+    assert (report.pages, report.written, report.failed) == (5, 3, 2)
+    assert [failure["page_id"] for failure in report.failures] == ["b", "e"]
+    assert "line 3" in report.failures[0]["error"] and "1.234,56" in report.failures[0]["error"]
+
+
+def test_update_pages_from_export_writes_back_to_notion(tmp_path, rate_index, monkeypatch):
+    export = tmp_path / "export.jsonl"
+    export.write_text("\n".join(json.dumps(entry) for entry in PAGES[:3]))
+    manager = NotionManager()
+    updates = {}
+    monkeypatch.setattr(
+        manager.page_writer,
+        "update_page",
+        lambda entry_id, properties: updates.update({entry_id: properties})
+        or PageUpdateResult(entry_id, True, 200),
+    )
+
+    report = manager.update_pages_from_export(str(export), PROPERTIES, "Amount", rate_index=rate_index)
+
+    assert report.written == 3
+    assert updates["b"] == {"Amount": {"number": 2.0}}
@@ -0,0 +1,541 @@
+import io
+import json
+from decimal import Decimal
+
+import pytest
+
+from src.libs import notion_manager_provider
+from src.libs.notion_manager_provider import NotionManager, NotionProperties
+from src.libs.notion_page_writer import PageUpdateResult
+from src.libs.time_budget import TimeBudget
+from src.repository.exchange_rate_index import ExchangeRateIndex
+from src.repository.sync_state_repository import FileSyncStateRepository
+
+
+@pytest.fixture
+def notion_manager(monkeypatch, fake_rate_repository):
+    manager = NotionManager()
+    manager.exchange_rate_repository = fake_rate_repository(
+        {
+            "2024-11-10": {"Date": "2024-11-10", "Rates": {"EUR/USD": Decimal("0.5")}},
+            "2024-11-11": {"Date": "2024-11-11", "Rates": {"MXN/USD": Decimal("20")}},
+        }
+    )
+    return manager
+
+
+def test_update_pages_prefetches_distinct_dates(notion_manager, monkeypatch):
+    pages = [
+        {"id": "a", "Local Amount": 10, "Currencies": "EUR", "Date": "2024-11-10"},
+        {"id": "b", "Local Amount": 20, "Currencies": "EUR", "Date": "2024-11-10"},
+        {"id": "c", "Local Amount": 40, "Currencies": "MXN", "Date": "2024-11-11"},
+        {"id": "d", "Local Amount": 5, "Currencies": "USD", "Date": "2024-11-12"},
+    ]
+    updates = {}
+    monkeypatch.setattr(
+        notion_manager,
+        "iter_query_results",
+        lambda *args, **kwargs: iter([(pages[:2], "c1"), (pages[2:], "c2"), (pages[:1], None)]),
+    )
+    monkeypatch.setattr(
+        notion_manager.page_writer,
+        "update_page",
+        lambda entry_id, properties: updates.update({entry_id: properties})
+        or PageUpdateResult(entry_id, True, 200),
+    )
+
+    results = notion_manager.update_pages("db", {}, {}, "Amount")
+
+    assert notion_manager.exchange_rate_repository.requested_dates == [
+        ["2024-11-10"],
+        ["2024-11-11"],
+    ]
+    assert updates == {
+        "a": {"Amount": {"number": 20.0}},
+        "b": {"Amount": {"number": 40.0}},
+        "c": {"Amount": {"number": 2.0}},
+        "d": {"Amount": {"number": 5}},
+    }
+    assert all(result.success for result in results)
+
+
+def test_update_pages_reports_unconvertible_pages(notion_manager, monkeypatch):
+    pages = [
+        {"id": "a", "Local Amount": 10, "Currencies": "EUR", "Date": "2024-11-10"},
+        {"id": "b", "Local Amount": 10, "Currencies": "EUR", "Date": "2024-12-25"},
+    ]
+    monkeypatch.setattr(
+        notion_manager, "iter_query_results", lambda *args, **kwargs: iter([(pages, None)])
+    )
+    monkeypatch.setattr(
+        notion_manager.page_writer,
+        "update_page",
+        lambda entry_id, properties: PageUpdateResult(entry_id, True, 200),
+    )
+
+    results = notion_manager.update_pages("db", {}, {}, "Amount")
+
+    assert [(result.page_id, result.success) for result in results] == [
+        ("b", False),
+        ("a", True),
+    ]
+
+
+def test_iter_data_follows_cursor(notion_manager, monkeypatch):
+    responses = {
+        None: {"results": [{"id": "a", "properties": {}}], "has_more": True, "next_cursor": "c1"},
+        "c1": {"results": [{"id": "b", "properties": {}}], "has_more": True, "next_cursor": "c2"},
+        "c2": {"results": [{"id": "c", "properties": {}}], "has_more": False, "next_cursor": None},
+    }
+    query_bodies = []
+
+    def fake_query(database_id, query_body, filter_properties=None):
+        query_bodies.append(query_body)
+        return responses[query_body.get("start_cursor")]
+
+    monkeypatch.setattr(notion_manager, "_query_database", fake_query)
+
+    batches = list(
+        notion_manager.iter_data("db", {"id": NotionProperties.ID}, {"filter": {}})
+    )
+
+    assert batches == [
+        [{"id": "a"}],
+        [{"id": "b"}],
+        [{"id": "c"}],
+    ]
+    assert [body.get("start_cursor") for body in query_bodies] == [None, "c1", "c2"]
+    assert all(body["page_size"] == 100 for body in query_bodies)
+
+
+def test_update_pages_falls_back_to_previous_date(notion_manager, monkeypatch):
+    pages = [
+        {"id": "a", "Local Amount": 10, "Currencies": "EUR", "Date": "2024-11-12"},
+        {"id": "b", "Local Amount": 10, "Currencies": "EUR", "Date": "2024-11-14"},
+    ]
+    updates = {}
+    monkeypatch.setattr(
+        notion_manager,
+        "iter_query_results",
+        lambda *args, **kwargs: iter([(pages, "c1"), (pages, None)]),
+    )
+    monkeypatch.setattr(
+        notion_manager.page_writer,
+        "update_page",
+        lambda entry_id, properties: updates.update({entry_id: properties})
+        or PageUpdateResult(entry_id, True, 200),
+    )
+    notion_manager.max_rate_staleness_days = 3
+
+    results = notion_manager.update_pages("db", {}, {}, "Amount")
+
+    # 2024-11-12 falls back two days to 2024-11-10, 2024-11-14 is too stale
+    assert updates == {"a": {"Amount": {"number": 20.0}}}
+    assert [result.success for result in results] == [False, True, False, True]
+    # Only the days the missing dates may fall back to are read, never the table
+    assert notion_manager.exchange_rate_repository.requested_dates == [
+        ["2024-11-12", "2024-11-14"],
+        ["2024-11-09", "2024-11-10", "2024-11-11", "2024-11-13"],
+    ]
+    assert notion_manager.exchange_rate_repository.scans == 0
+
+
+def test_incremental_update_advances_checkpoint_until_first_failed_write(
+    notion_manager, monkeypatch, tmp_path
+):
+    sync_state = FileSyncStateRepository(str(tmp_path / "state.json"))
+    sync_state.put_state("checkpoint#db", {"last_edited_time": "2024-11-01T00:00:00.000Z"})
+    batches = [
+        [
+            {"id": "a", "Local Amount": 1, "Currencies": "USD", "Date": "2024-11-10",
+             "last_edited_time": "2024-11-10T10:00:00.000Z"},
+            {"id": "b", "Local Amount": 1, "Currencies": "USD", "Date": "2024-11-10",
+             "last_edited_time": "2024-11-10T11:00:00.000Z"},
+        ],
+        [
+            {"id": "c", "Local Amount": 1, "Currencies": "USD", "Date": "2024-11-10",
+             "last_edited_time": "2024-11-11T10:00:00.000Z"},
+            {"id": "d", "Local Amount": 1, "Currencies": "USD", "Date": "2024-11-10",
+             "last_edited_time": "2024-11-11T11:00:00.000Z"},
+        ],
+    ]
+    queries = []
+
+    def fake_iter_query_results(database_id, properties, filter_body, start_cursor=None, **kwargs):
+        queries.append((properties, filter_body))
+        return iter([(batches[0], "c1"), (batches[1], None)])
+
+    monkeypatch.setattr(notion_manager, "iter_query_results", fake_iter_query_results)
+    monkeypatch.setattr(
+        notion_manager.page_writer,
+        "update_page",
+        lambda entry_id, properties: PageUpdateResult(entry_id, entry_id != "d", 200),
+    )
+
+    notion_manager.update_pages(
+        "db", {"id": NotionProperties.ID}, {"filter": {"property": "Amount"}}, "Amount",
+        sync_state=sync_state,
+    )
+
+    properties, filter_body = queries[0]
+    assert properties["last_edited_time"] == NotionProperties.LAST_EDITED_TIME
+    assert filter_body["filter"]["and"][1] == {
+        "timestamp": "last_edited_time",
+        "last_edited_time": {"on_or_after": "2024-11-01T00:00:00.000Z"},
+    }
+    assert filter_body["sorts"] == [{"timestamp": "last_edited_time", "direction": "ascending"}]
+    assert sync_state.get_state("checkpoint#db") == {
+        "last_edited_time": "2024-11-11T10:00:00.000Z"
+    }
+
+
+def test_incremental_update_keeps_unconverted_pages_ahead_of_the_checkpoint(
+    notion_manager, monkeypatch, tmp_path
+):
+    sync_state = FileSyncStateRepository(str(tmp_path / "state.json"))
+    pages = [
+        {"id": "a", "Local Amount": 1, "Currencies": "USD", "Date": "2024-11-10",
+         "last_edited_time": "2024-11-10T09:00:00.000Z"},
+        # No COP rate is stored for this date yet
+        {"id": "b", "Local Amount": 1, "Currencies": "COP", "Date": "2024-11-10",
+         "last_edited_time": "2024-11-10T10:00:00.000Z"},
+        {"id": "c", "Local Amount": 1, "Currencies": "USD", "Date": "2024-11-10",
+         "last_edited_time": "2024-11-10T11:00:00.000Z"},
+    ]
+    monkeypatch.setattr(
+        notion_manager, "iter_query_results", lambda *args, **kwargs: iter([(pages, None)])
+    )
+    monkeypatch.setattr(
+        notion_manager.page_writer,
+        "update_page",
+        lambda entry_id, properties: PageUpdateResult(entry_id, True, 200),
+    )
+
+    results = notion_manager.update_pages(
+        "db", {"id": NotionProperties.ID}, {}, "Amount", sync_state=sync_state
+    )
+
+    assert [result.page_id for result in results if not result.success] == ["b"]
+    assert sync_state.get_state("checkpoint#db") == {
+        "last_edited_time": "2024-11-10T09:00:00.000Z"
+    }
+
+
+def test_update_pages_fills_target_currency_fields(notion_manager, monkeypatch, fake_rate_repository):
+    notion_manager.exchange_rate_repository = fake_rate_repository(
+        {
+            "2024-11-10": {
+                "Date": "2024-11-10",
+                "Rates": {"EUR/USD": Decimal("0.5"), "MXN/USD": Decimal("20")},
+            },
+        }
+    )
+    pages = [
+        {"id": "a", "Local Amount": 10, "Currencies": "EUR", "Date": "2024-11-10"},
+        {"id": "b", "Local Amount": 5, "Currencies": "USD", "Date": "2024-11-10"},
+        {"id": "c", "Local Amount": 5, "Currencies": "USD", "Date": "2024-12-25"},
+    ]
+    updates = {}
+    monkeypatch.setattr(
+        notion_manager, "iter_query_results", lambda *args, **kwargs: iter([(pages, None)])
+    )
+    monkeypatch.setattr(
+        notion_manager.page_writer,
+        "update_page",
+        lambda entry_id, properties: updates.update({entry_id: properties})
+        or PageUpdateResult(entry_id, True, 200),
+    )
+
+    results = notion_manager.update_pages(
+        "db", {}, {}, "Amount", target_fields={"Amount EUR": "EUR", "Amount MXN": "MXN"}
+    )
+
+    assert updates == {
+        "a": {
+            "Amount": {"number": 20.0},
+            "Amount EUR": {"number": 10.0},
+            "Amount MXN": {"number": 400.0},
+        },
+        "b": {
+            "Amount": {"number": 5},
+            "Amount EUR": {"number": 2.5},
+            "Amount MXN": {"number": 100.0},
+        },
+    }
+    assert notion_manager.exchange_rate_repository.requested_dates == [
+        ["2024-11-10", "2024-12-25"],
+        ["2024-12-22", "2024-12-23", "2024-12-24"],
+    ]
+    assert [(result.page_id, result.success) for result in results] == [
+        ("c", False),
+        ("a", True),
+        ("b", True),
+    ]
+
+
+def test_api_url_can_point_at_a_local_stand_in(monkeypatch):
+    monkeypatch.setenv("NOTION_API_URL", "http://127.0.0.1:8080/v1/")
+    manager = NotionManager()
+    requested = []
+
+    class Response:
+        status_code = 200
+        content = b'{"results": [], "has_more": false}'
+
+        def json(self):
+            return {"results": [], "has_more": False}
+
+    monkeypatch.setattr(
+        manager.session, "post", lambda url, **kwargs: requested.append(url) or Response()
+    )
+
+    manager.get_data("db", {"id": NotionProperties.ID}, {})
+
+    assert manager.page_url == "http://127.0.0.1:8080/v1/pages"
+    assert requested == ["http://127.0.0.1:8080/v1/databases/db/query"]
+
+
+def test_queries_request_only_the_read_properties(monkeypatch):
+    monkeypatch.setattr(notion_manager_provider, "_database_property_ids", {})
+    schema = {
+        "properties": {
+            "Name": {"id": "title", "type": "title"},
+            "Notes": {"id": "n%3Ao", "type": "rich_text"},
+            "Local Amount": {"id": "a%5Bm", "type": "number"},
+            "Currencies": {"id": "cur", "type": "select"},
+            "Date": {"id": "dt", "type": "date"},
+        }
+    }
+    retrieved, queried = [], []
+
+    class Response:
+        status_code = 200
+
+        def __init__(self, body, wire_bytes=None):
+            self.body = body
+            self.content = json.dumps(body).encode()
+            self.raw = io.BytesIO(b"x" * (wire_bytes or len(self.content)))
+            self.raw.read()
+
+        def json(self):
+            return self.body
+
+    def fake_get(url, **kwargs):
+        retrieved.append(url)
+        return Response(schema)
+
+    def fake_post(url, **kwargs):
+        queried.append(url)
+        return Response({"results": [{"id": "p", "properties": {}}], "has_more": False}, wire_bytes=10)
+
+    properties = {
+        "id": NotionProperties.ID,
+        "Local Amount": NotionProperties.NUMBER,
+        "Currencies": NotionProperties.SELECT,
+        "Date": NotionProperties.DATE,
+    }
+    for _ in range(2):
+        manager = NotionManager()
+        monkeypatch.setattr(manager.session, "get", fake_get)
+        monkeypatch.setattr(manager.session, "post", fake_post)
+        assert [record["id"] for record in manager.get_data("db", properties, {})] == ["p"]
+
+    # The schema is retrieved once per process; the page ID is not a property
+    assert retrieved == ["https://api.notion.com/v1/databases/db"]
+    assert queried == [
+        "https://api.notion.com/v1/databases/db/query"
+        "?filter_properties=a%5Bm&filter_properties=cur&filter_properties=dt"
+    ] * 2
+    assert manager.query_stats.queries == 1
+    assert manager.query_stats.bytes_received == 10
+    assert manager.query_stats.bytes_decoded > 10
+
+
+def test_queries_fall_back_to_whole_pages_without_schema(notion_manager, monkeypatch):
+    monkeypatch.setattr(notion_manager_provider, "_database_property_ids", {})
+
+    class Response:
+        status_code = 404
+
+    monkeypatch.setattr(notion_manager.session, "get", lambda url, **kwargs: Response())
+
+    assert notion_manager.filter_properties("db", {"Date": NotionProperties.DATE}) is None
+    assert notion_manager.filter_properties("db", {"id": NotionProperties.ID}) is None
+
+
+def test_update_pages_resumes_where_the_deadline_stopped_it(
+    notion_manager, monkeypatch, tmp_path, lambda_context
+):
+    resume_state = FileSyncStateRepository(str(tmp_path / "state.json"))
+
+    def page(page_id):
+        return {"id": page_id, "Local Amount": 1, "Currencies": "USD", "Date": "2024-11-10"}
+
+    queries = []
+    written = []
+    context = lambda_context(3000)
+
+    def fake_iter_query_results(database_id, properties, filter_body, start_cursor=None, **kwargs):
+        queries.append((filter_body, start_cursor))
+        if start_cursor is None:
+            return iter([([page("a"), page("b"), page("c")], "c1"), ([page("z")], None)])
+        return iter([([page("d")], None)])
+
+    def fake_update_page(entry_id, properties):
+        written.append((entry_id, properties["Amount"]["number"]))
+        context.remaining_ms -= 1000
+        return PageUpdateResult(entry_id, True, 200)
+
+    # "c" is corrected in Notion before the next run
+    def fake_retrieve_page(page_id):
+        return {
+            "id": page_id,
+            "properties": {
+                "Local Amount": {"number": 5},
+                "Currencies": {"select": {"name": "USD"}},
+                "Date": {"date": {"start": "2024-11-10"}},
+            },
+        }
+
+    monkeypatch.setattr(notion_manager, "iter_query_results", fake_iter_query_results)
+    monkeypatch.setattr(notion_manager, "retrieve_page", fake_retrieve_page)
+    monkeypatch.setattr(notion_manager.page_writer, "update_page", fake_update_page)
+    monkeypatch.setattr(notion_manager.page_writer, "max_workers", 1)
+    properties = {
+        "id": NotionProperties.ID,
+        "Local Amount": NotionProperties.NUMBER,
+        "Currencies": NotionProperties.SELECT,
+        "Date": NotionProperties.DATE,
+    }
+
+    first = notion_manager.update_pages(
+        "db", properties, {"filter": {"property": "Amount"}}, "Amount",
+        time_budget=TimeBudget(context, reserve_seconds=1), resume_state=resume_state,
+    )
+
+    # Two writes fit before the reserve; "c" and the rest of the query wait
+    assert [result.page_id for result in first] == ["a", "b"]
+    token = resume_state.get_state("resume#db")
+    assert token["cursor"] == "c1"
+    assert token["pending_page_ids"] == ["c"]
+
+    second = notion_manager.update_pages(
+        "db", properties, {"filter": {"property": "Other"}}, "Amount",
+        time_budget=TimeBudget(lambda_context(60000), reserve_seconds=1), resume_state=resume_state,
+    )
+
+    assert [result.page_id for result in second] == ["c", "d"]
+    # "c" is written from its current values, not the ones seen by the first run
+    assert written == [("a", 1), ("b", 1), ("c", 5), ("d", 1)]
+    # The query continues from the cursor with the filter it was started with
+    assert queries == [
+        ({"filter": {"property": "Amount"}}, None),
+        ({"filter": {"property": "Amount"}}, "c1"),
+    ]
+    assert resume_state.get_state("resume#db") is None
+
+
+def test_update_pages_restarts_query_when_cursor_is_rejected(
+    notion_manager, monkeypatch, tmp_path
+):
+    resume_state = FileSyncStateRepository(str(tmp_path / "state.json"))
+    resume_state.put_state(
+        "resume#db", {"filter_body": {}, "cursor": "expired", "pending_page_ids": []}
+    )
+    pages = [{"id": "a", "Local Amount": 1, "Currencies": "USD", "Date": "2024-11-10"}]
+
+    def fake_iter_query_results(database_id, properties, filter_body, start_cursor=None, **kwargs):
+        if start_cursor:
+            raise Exception("Failed to fetch data from database db")
+        yield pages, None
+
+    monkeypatch.setattr(notion_manager, "iter_query_results", fake_iter_query_results)
+    monkeypatch.setattr(
+        notion_manager.page_writer,
+        "update_page",
+        lambda entry_id, properties: PageUpdateResult(entry_id, True, 200),
+    )
+
+    results = notion_manager.update_pages("db", {}, {}, "Amount", resume_state=resume_state)
+
+    assert [result.page_id for result in results] == ["a"]
+    assert resume_state.get_state("resume#db") is None
+
+
+def test_reconcile_pages_rewrites_only_drifted_amounts(notion_manager, monkeypatch, tmp_path):
+    pages = [
+        {"id": "a", "Local Amount": 10, "Currencies": "EUR", "Date": "2024-11-10", "Amount": 20.0},
+        {"id": "b", "Local Amount": 10, "Currencies": "EUR", "Date": "2024-11-10", "Amount": 19.0},
+        {"id": "c", "Local Amount": 10, "Currencies": "EUR", "Date": "2024-11-10", "Amount": 20.004},
+        {"id": "d", "Local Amount": 10, "Currencies": "EUR", "Date": "2024-12-25", "Amount": 20.0},
+    ]
+    queries = []
+    written = []
+
+    def fake_iter_query_results(database_id, properties, filter_body, page_size=100):
+        queries.append((properties, filter_body))
+        return iter([(pages[:2], "c1"), (pages[2:], None)])
+
+    monkeypatch.setattr(notion_manager, "iter_query_results", fake_iter_query_results)
+    monkeypatch.setattr(
+        notion_manager.page_writer,
+        "update_page",
+        lambda entry_id, properties: written.append((entry_id, properties))
+        or PageUpdateResult(entry_id, True, 200),
+    )
+    rate_index = ExchangeRateIndex.from_items(
+        [{"Date": "2024-11-10", "Rates": {"EUR/USD": Decimal("0.5")}}]
+    )
+    report_path = tmp_path / "diffs.jsonl"
+
+    report = notion_manager.reconcile_pages(
+        "db", {"id": NotionProperties.ID}, "Amount",
+        tolerance=0.01, report_path=str(report_path), rate_index=rate_index,
+    )
+
+    properties, filter_body = queries[0]
+    assert properties["Amount"] == NotionProperties.NUMBER
+    assert filter_body == {"filter": {"property": "Amount", "number": {"is_not_empty": True}}}
+    assert written == [("b", {"Amount": {"number": 20.0}})]
+    assert (report.pages, report.checked, report.drifted, report.written, report.failed) == (
+        4, 4, 1, 1, 1
+    )
+    assert report.failures[0]["page_id"] == "d"
+    diff = {"page_id": "b", "field": "Amount", "stored": 19.0, "expected": 20.0}
+    assert report.diffs == [diff]
+    assert [json.loads(line) for line in report_path.read_text().splitlines()] == [diff]
+
+    dry_run = notion_manager.reconcile_pages(
+        "db", {}, "Amount", dry_run=True, rate_index=rate_index
+    )
+    assert (dry_run.drifted, dry_run.written) == (1, 0)
+    assert len(written) == 1
+
+
+def test_iter_query_results_stops_prefetching_when_the_budget_runs_out(
+    notion_manager, monkeypatch, lambda_context
+):
+    responses = {
+        None: {"results": [{"id": "a", "properties": {}}], "has_more": True, "next_cursor": "c1"},
+        "c1": {"results": [{"id": "b", "properties": {}}], "has_more": True, "next_cursor": "c2"},
+    }
+    context = lambda_context(60000)
+    cursors = []
+
+    def fake_query(database_id, query_body, filter_properties=None):
+        cursors.append(query_body.get("start_cursor"))
+        context.remaining_ms = 500
+        return responses[query_body.get("start_cursor")]
+
+    monkeypatch.setattr(notion_manager, "_query_database", fake_query)
+
+    batches = list(
+        notion_manager.iter_query_results(
+            "db", {"id": NotionProperties.ID}, {},
+            time_budget=TimeBudget(context, reserve_seconds=1),
+        )
+    )
+
+    # The second page is not requested; its cursor is handed back instead
+    assert cursors == [None]
+    assert [(len(records), cursor) for records, cursor in batches] == [(1, "c1")]
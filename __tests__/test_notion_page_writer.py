@@ -0,0 +1,127 @@
+from src.libs.notion_page_writer import NotionPageWriter, TokenBucket
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None, text=""):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = text
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = responses
+        self.calls = []
+
+    def patch(self, url, headers, json):
+        self.calls.append(url)
+        page_responses = self.responses[url.rsplit("/", 1)[-1]]
+        return page_responses.pop(0)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_token_bucket_limits_average_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=3.0, capacity=3.0, clock=clock, sleep=clock.sleep)
+
+    for _ in range(9):
+        bucket.acquire()
+
+    # 3 requests burst immediately, the remaining 6 take 2 seconds at 3 req/s
+    assert abs(clock.now - 2.0) < 1e-9
+
+
+def test_pause_holds_back_every_caller():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2.0, capacity=3.0, clock=clock, sleep=clock.sleep)
+
+    bucket.pause_until(1.5)
+    # An earlier pause does not shorten a later one
+    bucket.pause_until(1.0)
+    bucket.acquire()
+    bucket.acquire()
+
+    # The first request waits for the pause, the next one resumes at 2 req/s
+    assert clock.sleeps == [1.5, 0.5]
+
+
+def test_throttled_page_pauses_the_shared_limiter():
+    clock = FakeClock()
+    session = FakeSession(
+        {"throttled": [FakeResponse(429, {"Retry-After": "2"}), FakeResponse(200)]}
+    )
+    writer = NotionPageWriter(
+        headers={}, session=session, rate_per_second=1000, burst=1000, sleep=clock.sleep, clock=clock
+    )
+    pauses = []
+    pause_until = writer.limiter.pause_until
+    writer.limiter.pause_until = lambda until: pauses.append(until) or pause_until(until)
+
+    assert writer.update_page("throttled", {}).success
+
+    # The retry waits in acquire(), where every other worker would wait too
+    assert pauses == [2.0]
+    assert clock.sleeps == [2.0]
+
+
+def test_writer_retries_and_reports_per_page_results():
+    clock = FakeClock()
+    session = FakeSession(
+        {
+            "ok": [FakeResponse(200)],
+            "throttled": [FakeResponse(429, {"Retry-After": "1.5"}), FakeResponse(200)],
+            "flaky": [FakeResponse(502), FakeResponse(503), FakeResponse(200)],
+            "bad": [FakeResponse(400, text="validation_error")],
+        }
+    )
+    # One worker, so the Retry-After pause is not shortened by the other pages' backoff
+    writer = NotionPageWriter(
+        headers={},
+        session=session,
+        max_workers=1,
+        rate_per_second=1000,
+        burst=1000,
+        sleep=clock.sleep,
+        clock=clock,
+    )
+
+    results = writer.update_pages(
+        [(page_id, {}) for page_id in ["ok", "throttled", "flaky", "bad"]]
+    )
+
+    assert [(result.page_id, result.success) for result in results] == [
+        ("ok", True),
+        ("throttled", True),
+        ("flaky", True),
+        ("bad", False),
+    ]
+    assert results[3].status_code == 400
+    assert results[3].error == "validation_error"
+    assert 1.5 in clock.sleeps
+    assert len(session.calls) == 7
+
+
+def test_writer_gives_up_after_max_retries():
+    clock = FakeClock()
+    session = FakeSession({"down": [FakeResponse(500) for _ in range(3)]})
+    writer = NotionPageWriter(
+        headers={}, session=session, max_retries=2, rate_per_second=1000, sleep=clock.sleep
+    )
+
+    result = writer.update_page("down", {})
+
+    assert not result.success
+    assert result.status_code == 500
+    assert len(session.calls) == 3
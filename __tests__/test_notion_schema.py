@@ -0,0 +1,63 @@
+import json
+
+from src.libs.notion_schema import NotionProperties, compile_property_extractor
+
+PROPERTIES = {
+    "id": NotionProperties.ID,
+    "Local Amount": NotionProperties.NUMBER,
+    "Currencies": NotionProperties.SELECT,
+    "Date": NotionProperties.DATE,
+    "last_edited_time": NotionProperties.LAST_EDITED_TIME,
+}
+
+
+def test_extractor_reads_every_property_type():
+    extract = compile_property_extractor(PROPERTIES)
+    page = {
+        "id": "page-1",
+        "last_edited_time": "2024-11-10T10:00:00.000Z",
+        "properties": {
+            "Local Amount": {"number": 125.5},
+            "Currencies": {"select": {"name": "EUR"}},
+            "Date": {"date": {"start": "2024-11-10"}},
+        },
+    }
+
+    record = extract(page)
+
+    assert record == {
+        "id": "page-1",
+        "Local Amount": 125.5,
+        "Currencies": "EUR",
+        "Date": "2024-11-10",
+        "last_edited_time": "2024-11-10T10:00:00.000Z",
+    }
+    assert json.loads(json.dumps(record)) == record
+
+
+def test_extractor_handles_null_and_missing_properties():
+    extract = compile_property_extractor(PROPERTIES)
+    page = {
+        "id": "page-2",
+        "properties": {
+            "Local Amount": {"number": None},
+            "Currencies": {"select": None},
+            "Date": {"date": None},
+        },
+    }
+
+    assert extract(page) == {
+        "id": "page-2",
+        "Local Amount": None,
+        "Currencies": None,
+        "Date": None,
+        "last_edited_time": None,
+    }
+    assert extract({"id": "page-3", "properties": {}})["Date"] is None
+
+
+def test_extractors_are_cached_per_schema():
+    extract = compile_property_extractor(PROPERTIES)
+
+    assert compile_property_extractor(dict(PROPERTIES)) is extract
+    assert compile_property_extractor({"Date": NotionProperties.DATE}) is not extract
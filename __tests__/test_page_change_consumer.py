@@ -0,0 +1,122 @@
+import json
+from decimal import Decimal
+
+import pytest
+
+from src.config.sync_jobs import LEDGER_PROPERTIES, UNFILLED_AMOUNT_FILTER
+from src.libs.notion_manager_provider import NotionManager
+from src.libs.notion_page_writer import PageUpdateResult
+from src.libs.page_change_consumer import InMemoryQueue, PageChangeConsumer, parse_page_change
+from src.libs.sync_runner import SyncJob
+
+
+def ledger_page(page_id, database_id, amount=None, date="2024-11-10"):
+    return {
+        "id": page_id,
+        "parent": {"type": "database_id", "database_id": database_id},
+        "properties": {
+            "Local Amount": {"number": 10},
+            "Currencies": {"select": {"name": "EUR"}},
+            "Date": {"date": {"start": date}},
+            "Amount": {"number": amount},
+        },
+    }
+
+
+@pytest.fixture
+def consumer(monkeypatch, fake_rate_repository):
+    manager = NotionManager()
+    manager.exchange_rate_repository = fake_rate_repository(
+        {"2024-11-10": {"Date": "2024-11-10", "Rates": {"EUR/USD": Decimal("0.5")}}}
+    )
+    manager.max_rate_staleness_days = 0
+    pages = {
+        "p1": ledger_page("p1", "1111-2222"),
+        "p2": ledger_page("p2", "1111-2222", amount=20.0),
+        "p3": ledger_page("p3", "other-database"),
+        "p4": ledger_page("p4", "11112222", date="2024-12-25"),
+        "p5": ledger_page("p5", "1111-2222", amount=21.37),
+    }
+
+    def fake_retrieve_page(page_id):
+        if page_id not in pages:
+            raise Exception(f"Failed to retrieve page {page_id}")
+        return pages[page_id]
+
+    manager.written = []
+    monkeypatch.setattr(manager, "retrieve_page", fake_retrieve_page)
+    monkeypatch.setattr(
+        manager.page_writer,
+        "update_page",
+        lambda entry_id, properties: manager.written.append((entry_id, properties))
+        or PageUpdateResult(entry_id, True, 200),
+    )
+
+    return PageChangeConsumer(manager, [SyncJob("expenses", "11112222", LEDGER_PROPERTIES, {})])
+
+
+def test_parse_page_change_accepts_page_ids_and_webhook_events():
+    assert parse_page_change(json.dumps({"page_id": "p1"})) == "p1"
+    assert parse_page_change(json.dumps({"entity": {"id": "p2", "type": "page"}})) == "p2"
+    with pytest.raises(Exception):
+        parse_page_change(json.dumps({"entity": {"id": "db", "type": "database"}}))
+    with pytest.raises(Exception):
+        parse_page_change("p3")
+
+
+def test_consumer_writes_changed_pages_and_retries_failures(consumer):
+    queue = InMemoryQueue(max_receives=2)
+    for body in (
+        {"page_id": "p1"},
+        {"page_id": "p1"},
+        {"page_id": "p2"},
+        {"entity": {"id": "p3", "type": "page"}},
+        {"page_id": "p4"},
+        {"page_id": "missing"},
+        {},
+    ):
+        queue.send(body)
+
+    responses = queue.drain(lambda event, context: consumer.handle(event))
+
+    # p1 is written once; p2 already holds its amount; p3 is not a synced ledger
+    assert consumer.notion_manager.written == [("p1", {"Amount": {"number": 20.0}})]
+    # The rates of each batch are read at once
+    assert consumer.notion_manager.exchange_rate_repository.requested_dates == [
+        ["2024-11-10", "2024-12-25"],
+        ["2024-12-25"],
+    ]
+    assert [len(response["batchItemFailures"]) for response in responses] == [2, 2]
+    assert sorted(json.loads(message["body"])["page_id"] for message in queue.dead_letters) == [
+        "missing",
+        "p4",
+    ]
+    assert not queue.messages and not queue.in_flight
+
+
+def test_consumer_retries_the_whole_batch_when_conversion_fails(consumer, monkeypatch):
+    def failing_update_pages_by_id(page_ids, jobs, rate_index):
+        raise Exception("DynamoDB unavailable")
+
+    monkeypatch.setattr(consumer.notion_manager, "update_pages_by_id", failing_update_pages_by_id)
+    queue = InMemoryQueue()
+    queue.send({"page_id": "p1"})
+    queue.send("not json {")
+
+    event = queue.receive()
+    response = consumer.handle(event)
+
+    assert response == {"batchItemFailures": [{"itemIdentifier": "message-1"}]}
+
+
+def test_unfilled_jobs_leave_filled_amounts_alone(consumer):
+    consumer.jobs = [SyncJob("expenses", "11112222", LEDGER_PROPERTIES, UNFILLED_AMOUNT_FILTER)]
+    queue = InMemoryQueue()
+    queue.send({"page_id": "p1"})
+    # Entered by hand; the sweep's "Amount is empty" filter would never select it
+    queue.send({"page_id": "p5"})
+
+    responses = queue.drain(lambda event, context: consumer.handle(event))
+
+    assert consumer.notion_manager.written == [("p1", {"Amount": {"number": 20.0}})]
+    assert responses == [{"batchItemFailures": []}]
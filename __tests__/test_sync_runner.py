@@ -0,0 +1,110 @@
+import json
+from decimal import Decimal
+
+from src.config.sync_jobs import LEDGER_PROPERTIES, load_sync_jobs
+from src.libs.notion_manager_provider import NotionManager
+from src.libs.notion_page_writer import PageUpdateResult
+from src.libs.notion_schema import NotionProperties
+from src.libs.sync_runner import SyncJob, SyncRunner, build_sync_response, continue_if_incomplete
+from src.libs.time_budget import TimeBudget
+from src.repository.sync_state_repository import FileSyncStateRepository
+
+
+def test_runner_shares_rate_cache_across_databases(monkeypatch, fake_rate_repository):
+    manager = NotionManager()
+    repository = fake_rate_repository(rates={"EUR/USD": Decimal("0.5")})
+    manager.exchange_rate_repository = repository
+    pages = {
+        db: [{"id": f"{db}-{day}", "Local Amount": 1, "Currencies": "EUR", "Date": f"2024-11-{day:02d}"}
+             for day in range(1, 11)]
+        for db in ("expenses", "income", "household")
+    }
+    monkeypatch.setattr(
+        manager,
+        "iter_query_results",
+        lambda database_id, properties, filter_body, **kwargs: iter([(pages[database_id], None)]),
+    )
+    monkeypatch.setattr(
+        manager.page_writer,
+        "update_page",
+        lambda entry_id, properties: PageUpdateResult(entry_id, not entry_id.endswith("-10"), 200),
+    )
+    jobs = [SyncJob(db, db, LEDGER_PROPERTIES, {}) for db in pages]
+
+    reports = SyncRunner(manager, jobs).run()
+
+    assert sorted(date for dates in repository.requested_dates for date in dates) == [
+        f"2024-11-{day:02d}" for day in range(1, 11)
+    ]
+    assert [(report.name, report.updated, report.failed) for report in reports] == [
+        ("expenses", 9, 1),
+        ("income", 9, 1),
+        ("household", 9, 1),
+    ]
+    response = build_sync_response(reports)
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"])[0]["pages"] == 10
+
+
+def test_load_sync_jobs_from_environment(monkeypatch):
+    monkeypatch.setenv(
+        "NOTION_SYNC_JOBS",
+        json.dumps(
+            [
+                {"name": "household", "database_id": "db-1"},
+                {
+                    "name": "savings",
+                    "database_id": "db-2",
+                    "properties": {"id": "id", "Local": "number", "Day": "date"},
+                    "update_field": "USD",
+                },
+            ]
+        ),
+    )
+
+    household, savings = load_sync_jobs()
+
+    assert household.properties == LEDGER_PROPERTIES
+    assert household.update_field == "Amount"
+    assert savings.properties == {
+        "id": NotionProperties.ID,
+        "Local": NotionProperties.NUMBER,
+        "Day": NotionProperties.DATE,
+    }
+    assert savings.update_field == "USD"
+
+
+def test_runner_reports_jobs_left_for_the_next_invocation(
+    monkeypatch, tmp_path, fake_rate_repository, lambda_context
+):
+    manager = NotionManager()
+    manager.exchange_rate_repository = fake_rate_repository(rates={"EUR/USD": Decimal("0.5")})
+    resume_state = FileSyncStateRepository(str(tmp_path / "state.json"))
+    context = lambda_context(7000)
+    pages = [{"id": f"p{day}", "Local Amount": 1, "Currencies": "EUR", "Date": f"2024-11-{day:02d}"}
+             for day in range(1, 5)]
+
+    def fake_update_page(entry_id, properties):
+        context.remaining_ms -= 1000
+        return PageUpdateResult(entry_id, True, 200)
+
+    monkeypatch.setattr(
+        manager,
+        "iter_query_results",
+        lambda database_id, properties, filter_body, **kwargs: iter([(pages, "next")]),
+    )
+    monkeypatch.setattr(manager.page_writer, "update_page", fake_update_page)
+    monkeypatch.setattr(manager.page_writer, "max_workers", 1)
+
+    reports = SyncRunner(
+        manager,
+        [SyncJob("expenses", "db", LEDGER_PROPERTIES, {})],
+        time_budget=TimeBudget(context, reserve_seconds=5),
+        resume_state=resume_state,
+    ).run()
+
+    assert [(report.updated, report.incomplete) for report in reports] == [(2, True)]
+    assert resume_state.get_state("resume#db")["pending_page_ids"] == ["p3", "p4"]
+    assert json.loads(build_sync_response(reports)["body"])[0]["incomplete"] is True
+    # Self re-invocation is off unless SYNC_SELF_INVOKE is set
+    assert not continue_if_incomplete(reports, {}, context)
@@ -0,0 +1,39 @@
+import boto3
+from moto import mock_aws
+
+from src.libs.client_registry import clear_clients
+from src.repository.sync_state_repository import (
+    FileSyncStateRepository,
+    SyncStateRepository,
+)
+
+
+def test_file_sync_state_round_trip(tmp_path):
+    repository = FileSyncStateRepository(str(tmp_path / "state.json"))
+
+    assert repository.get_state("checkpoint#db") is None
+    repository.put_state("checkpoint#db", {"last_edited_time": "2024-11-10T10:00:00.000Z"})
+    assert FileSyncStateRepository(str(tmp_path / "state.json")).get_state(
+        "checkpoint#db"
+    ) == {"last_edited_time": "2024-11-10T10:00:00.000Z"}
+
+    repository.delete_state("checkpoint#db")
+    assert repository.get_state("checkpoint#db") is None
+
+
+def test_dynamodb_sync_state_round_trip(aws_credentials):
+    clear_clients()
+    with mock_aws():
+        boto3.client("dynamodb", region_name="us-east-1").create_table(
+            TableName="SyncState",
+            KeySchema=[{"AttributeName": "StateKey", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "StateKey", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        repository = SyncStateRepository("SyncState")
+
+        assert repository.put_state("resume#db", {"cursor": "abc", "pending": ["p1"]})
+        assert repository.get_state("resume#db") == {"cursor": "abc", "pending": ["p1"]}
+        assert repository.delete_state("resume#db")
+        assert repository.get_state("resume#db") is None
+    clear_clients()
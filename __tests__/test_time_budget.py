@@ -0,0 +1,58 @@
+import json
+
+from src.libs import time_budget
+from src.libs.time_budget import TimeBudget, invoke_continuation
+
+
+class FakeLambdaClient:
+    def __init__(self):
+        self.invocations = []
+
+    def invoke(self, **kwargs):
+        self.invocations.append(kwargs)
+
+
+def test_budget_keeps_a_reserve_and_stays_exhausted(lambda_context):
+    context = lambda_context(10000)
+    budget = TimeBudget(context, reserve_seconds=4)
+
+    assert budget.remaining() == 6
+    assert budget.allows(5)
+    assert not budget.allows(7)
+
+    context.remaining_ms = 60000
+    assert not budget.allows(1)
+    assert budget.exhausted
+
+
+def test_budget_expects_the_slowest_step_and_is_unlimited_without_context(lambda_context):
+    budget = TimeBudget(lambda_context(2000), reserve_seconds=0)
+    budget.slowest_step = 3
+
+    assert not budget.allows()
+    assert TimeBudget().allows(10**6)
+
+
+def test_continuation_reinvokes_the_function_up_to_the_limit(monkeypatch, lambda_context):
+    client = FakeLambdaClient()
+    regions = []
+    monkeypatch.setattr(
+        time_budget, "get_lambda_client", lambda region: regions.append(region) or client
+    )
+    context = lambda_context(0)
+
+    assert not invoke_continuation({}, context)
+
+    monkeypatch.setenv("SYNC_SELF_INVOKE", "true")
+    monkeypatch.setenv("SYNC_MAX_CONTINUATIONS", "2")
+    assert invoke_continuation({"source": "aws.events"}, context)
+    assert invoke_continuation({"continuation": 1}, context)
+    assert not invoke_continuation({"continuation": 2}, context)
+
+    assert regions == ["eu-west-1", "eu-west-1"]
+    assert [invocation["InvocationType"] for invocation in client.invocations] == ["Event"] * 2
+    assert json.loads(client.invocations[0]["Payload"]) == {
+        "source": "aws.events",
+        "continuation": 1,
+    }
+    assert client.invocations[0]["FunctionName"] == context.invoked_function_arn
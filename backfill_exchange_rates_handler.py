@@ -0,0 +1,49 @@
+import json
+import os
+from datetime import datetime
+
+from src.libs.exchange_rate_backfill import (
+    CurrencyApiHistoricalRateSource,
+    ExchangeRateBackfill,
+    FileHistoricalRateSource,
+)
+from src.libs.metrics import emit_metrics
+from src.repository.exchange_rate_repository import ExchangeRateRepository
+
+
+@emit_metrics("backfill_exchange_rates_handler")
+def backfill_exchange_rates_handler(event, context):
+    table_name = os.getenv("EXCHANGE_RATE_TABLE_NAME", "ExchangeRates")
+
+    start_date = event.get("start_date")
+    end_date = event.get("end_date") or datetime.now().date().isoformat()
+    if not start_date:
+        return {"statusCode": 400, "body": "start_date is required."}
+
+    if event.get("path"):
+        source = FileHistoricalRateSource(event["path"])
+    else:
+        source = CurrencyApiHistoricalRateSource()
+
+    backfill = ExchangeRateBackfill(
+        ExchangeRateRepository(table_name=table_name),
+        source,
+        max_workers=int(event.get("max_workers", 4)),
+        skip_existing=event.get("skip_existing", True),
+    )
+
+    try:
+        result = backfill.run(start_date, end_date)
+
+        return {
+            "statusCode": 200,
+            "body": json.dumps(
+                {
+                    "written": result.written,
+                    "skipped": len(result.skipped_dates),
+                    "missing_dates": result.missing_dates,
+                }
+            ),
+        }
+    except Exception as e:
+        return {"statusCode": 500, "body": f"An error occurred: {str(e)}"}
@@ -0,0 +1,215 @@
+"""
+Cold-start profiling harness for the Lambda handlers.
+
+Every measurement runs in a fresh interpreter so that nothing is cached from
+a previous import, which is what a Lambda cold start looks like.
+
+Usage:
+    python benchmarks/cold_start.py
+    python benchmarks/cold_start.py --invoke --repeat 5
+    python benchmarks/cold_start.py --budget update_expenses_handler=80 --json
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# `handler: <module>.<function>` entries of the deployed functions
+_HANDLER_LINE = re.compile(r"^\s+handler:\s*([\w.]+)\.(\w+)\s*$", re.MULTILINE)
+
+
+def load_handlers(path: str = os.path.join(ROOT, "serverless.yml")) -> dict:
+    """
+    Returns the handler function of each module deployed in serverless.yml,
+    so every function is profiled without keeping a separate list.
+
+    Args:
+        path (str): The serverless configuration.
+
+    Returns:
+        dict: The handler function name keyed by module name.
+    """
+    with open(path, encoding="utf-8") as file:
+        return dict(_HANDLER_LINE.findall(file.read()))
+
+
+HANDLERS = load_handlers()
+
+# Runs inside the child interpreter: imports the handler module and, when
+# requested, times the first and second (warm) invocation.
+INVOKE_SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+module = __import__({module!r})
+import_ms = (time.perf_counter() - start) * 1000
+result = {{"import_ms": import_ms}}
+if {invoke!r}:
+    handler = getattr(module, {handler!r})
+    for key in ("first_invocation_ms", "warm_invocation_ms"):
+        start = time.perf_counter()
+        try:
+            handler({{}}, None)
+            result[key.replace("_ms", "_error")] = None
+        except Exception as e:
+            result[key.replace("_ms", "_error")] = repr(e)
+        result[key] = (time.perf_counter() - start) * 1000
+print(json.dumps(result))
+"""
+
+
+def parse_importtime(stderr: str) -> list:
+    """
+    Parses the output of `python -X importtime`.
+
+    Args:
+        stderr (str): The stderr of the child interpreter.
+
+    Returns:
+        list: Dictionaries with the module name, self and cumulative time in ms.
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+
+        self_us, cumulative_us, module = line[len("import time:") :].split("|")
+        entries.append(
+            {
+                "module": module.strip(),
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+            }
+        )
+
+    return entries
+
+
+def profile_handler(module: str, handler: str, invoke: bool) -> dict:
+    """
+    Imports a handler module in a fresh interpreter and collects timings.
+
+    Args:
+        module (str): The handler module name.
+        handler (str): The handler function name.
+        invoke (bool): Whether to also call the handler twice.
+
+    Returns:
+        dict: The wall-clock timings and the -X importtime breakdown.
+    """
+    snippet = INVOKE_SNIPPET.format(module=module, handler=handler, invoke=invoke)
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", snippet],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["imports"] = parse_importtime(completed.stderr)
+
+    return result
+
+
+def summarize(module: str, runs: list, top: int) -> dict:
+    summary = {
+        "handler": module,
+        "import_ms": statistics.median(run["import_ms"] for run in runs),
+    }
+
+    for key in ("first_invocation_ms", "warm_invocation_ms"):
+        if key in runs[0]:
+            summary[key] = statistics.median(run[key] for run in runs)
+            summary[key.replace("_ms", "_error")] = runs[-1][key.replace("_ms", "_error")]
+
+    # Modules loaded because of this handler, excluding the interpreter's own startup
+    handler_imports = [
+        entry
+        for entry in runs[-1]["imports"]
+        if entry["module"] not in ("site", "encodings") and not entry["module"].startswith("encodings.")
+    ]
+    summary["slowest_imports"] = sorted(
+        handler_imports, key=lambda entry: entry["self_ms"], reverse=True
+    )[:top]
+
+    return summary
+
+
+def parse_budgets(values: list) -> dict:
+    budgets = {}
+    for value in values or []:
+        module, _, milliseconds = value.partition("=")
+        budgets[module] = float(milliseconds)
+
+    return budgets
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--handler", action="append", choices=sorted(HANDLERS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument(
+        "--invoke",
+        action="store_true",
+        help="Also time the first and a warm invocation (uses the configured AWS/Notion environment).",
+    )
+    parser.add_argument(
+        "--budget",
+        action="append",
+        metavar="HANDLER=MS",
+        help="Fail when the median import time of HANDLER exceeds MS milliseconds.",
+    )
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    budgets = parse_budgets(args.budget)
+    summaries = []
+
+    for module in args.handler or HANDLERS:
+        runs = [
+            profile_handler(module, HANDLERS[module], args.invoke)
+            for _ in range(args.repeat)
+        ]
+        summaries.append(summarize(module, runs, args.top))
+
+    over_budget = [
+        summary["handler"]
+        for summary in summaries
+        if summary["handler"] in budgets
+        and summary["import_ms"] > budgets[summary["handler"]]
+    ]
+
+    if args.json:
+        print(json.dumps({"handlers": summaries, "over_budget": over_budget}, indent=2))
+    else:
+        for summary in summaries:
+            print(f"{summary['handler']}: import {summary['import_ms']:.1f} ms", end="")
+            if "first_invocation_ms" in summary:
+                print(
+                    f", first invocation {summary['first_invocation_ms']:.1f} ms"
+                    f", warm invocation {summary['warm_invocation_ms']:.1f} ms",
+                    end="",
+                )
+            budget = budgets.get(summary["handler"])
+            print(f" (budget {budget:.0f} ms)" if budget is not None else "")
+
+            for entry in summary["slowest_imports"]:
+                print(
+                    f"    {entry['self_ms']:8.2f} ms self {entry['cumulative_ms']:8.2f} ms cumulative  {entry['module']}"
+                )
+
+        for handler in over_budget:
+            print(f"Cold-start budget exceeded for {handler}")
+
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Compares the map and packed storage formats of ExchangeRateEntity.
+
+Reports the DynamoDB item size, the read capacity a GetItem of the item
+consumes, and the encode/decode time including boto3's wire
+(de)serialisation, for a full snapshot of every currency.
+
+Usage:
+    python benchmarks/exchange_rate_encoding_benchmark.py --repeat 2000
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from boto3.dynamodb.types import Binary, TypeDeserializer, TypeSerializer  # noqa: E402
+
+from src.entity.exchange_rate_entity import CURRENCY_CODES, ExchangeRateEntity  # noqa: E402
+
+
+def attribute_size(value) -> int:
+    """
+    Approximates the stored size of an attribute value, following the
+    DynamoDB item size rules.
+    """
+    if isinstance(value, str):
+        return len(value.encode())
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, Binary):
+        return len(value.value)
+    if isinstance(value, (int, float, Decimal)):
+        digits = Decimal(str(value)).normalize().as_tuple().digits
+        return math.ceil(len(digits) / 2) + 1
+    if isinstance(value, dict):
+        return 3 + sum(len(name.encode()) + attribute_size(item) + 1 for name, item in value.items())
+
+    raise TypeError(f"Unsupported attribute type: {type(value)}")
+
+
+def item_size(item: dict) -> int:
+    return sum(len(name.encode()) + attribute_size(value) for name, value in item.items())
+
+
+def snapshot(currencies: int) -> ExchangeRateEntity:
+    rates = {
+        f"{code}/USD": round(random.uniform(0.01, 40000), 6)
+        for code in CURRENCY_CODES[:currencies]
+        if code != "USD"
+    }
+    return ExchangeRateEntity(date="2024-11-10", rates=rates)
+
+
+def measure(entity: ExchangeRateEntity, encode, repeat: int) -> dict:
+    serializer = TypeSerializer()
+    deserializer = TypeDeserializer()
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        item = encode(entity)
+        wire = {name: serializer.serialize(value) for name, value in item.items()}
+    encode_seconds = (time.perf_counter() - start) / repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        stored = {name: deserializer.deserialize(value) for name, value in wire.items()}
+        rates = ExchangeRateEntity.from_dict(stored).rates
+        rates["EUR/USD"], rates["MXN/USD"], rates["COP/USD"]
+    decode_seconds = (time.perf_counter() - start) / repeat
+
+    size = item_size(item)
+    return {
+        "size": size,
+        # Strongly consistent GetItem: 1 RCU per 4 KB, eventually consistent reads cost half
+        "rcu": math.ceil(size / 4096),
+        "encode_us": encode_seconds * 1e6,
+        "decode_us": decode_seconds * 1e6,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--currencies", type=int, default=len(CURRENCY_CODES))
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    random.seed(7)
+    entity = snapshot(args.currencies)
+    print(f"{len(entity.rates)} currencies per snapshot")
+
+    for name, encode in [
+        ("map (Rates)", ExchangeRateEntity.to_dict),
+        ("packed (RatesPacked)", ExchangeRateEntity.to_packed_dict),
+    ]:
+        result = measure(entity, encode, args.repeat)
+        print(
+            f"{name:22s} {result['size']:6d} bytes  {result['rcu']} RCU"
+            f"  encode {result['encode_us']:8.1f} us  decode {result['decode_us']:8.1f} us"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
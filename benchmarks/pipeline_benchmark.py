@@ -0,0 +1,495 @@
+"""
+End-to-end benchmark of the update pipeline against local stand-ins.
+
+Runs NotionManager.update_pages over a synthetic ledger and the
+create_exchange_rate_entry_handler, with moto in place of DynamoDB and a
+local HTTP server in place of the Notion and exchange rate APIs. The server
+can add latency to every request and answer a share of page updates with
+429 Too Many Requests. Nothing leaves the machine.
+
+Usage:
+    python benchmarks/pipeline_benchmark.py --pages 1000
+    python benchmarks/pipeline_benchmark.py --pages 100000 --latency-ms 20 --throttle-rate 0.05
+    python benchmarks/pipeline_benchmark.py --pages 10000 --trace-memory --json
+    python benchmarks/pipeline_benchmark.py --budget wall_seconds=30 --budget dynamodb_reads=50
+    python benchmarks/pipeline_benchmark.py --pages 10000 --extra-properties 30 --whole-pages
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.entity.exchange_rate_entity import CURRENCY_CODES  # noqa: E402
+
+LEDGER_CURRENCIES = ["COP", "EUR", "MXN", "USD"]
+DYNAMODB_READS = {"GetItem", "BatchGetItem", "Query", "Scan"}
+TABLE_NAME = "ExchangeRates"
+
+
+def synthetic_rates(seed: int) -> dict:
+    generator = random.Random(seed)
+    return {code: round(generator.uniform(0.1, 4000), 6) for code in CURRENCY_CODES if code != "USD"}
+
+
+def synthetic_notes(index: int, extra_properties: int) -> dict:
+    # Columns the pipeline never reads, like the notes and tags of a real ledger
+    return {
+        f"Note {column}": {
+            "id": f"n{column}",
+            "type": "rich_text",
+            "rich_text": [
+                {
+                    "type": "text",
+                    "text": {"content": f"Entry {index} note {column}", "link": None},
+                    "plain_text": f"Entry {index} note {column}",
+                    "href": None,
+                }
+            ],
+        }
+        for column in range(extra_properties)
+    }
+
+
+def synthetic_ledger(pages: int, days: int, start: date, extra_properties: int = 0) -> list:
+    """
+    Builds Notion pages as returned by a database query, with an empty Amount
+    and `extra_properties` text columns that are never read.
+    """
+    return [
+        {
+            "object": "page",
+            "id": f"page-{index:06d}",
+            "last_edited_time": "2024-11-10T10:00:00.000Z",
+            "properties": {
+                "Local Amount": {"id": "a", "type": "number", "number": round(1 + index % 997 * 1.25, 2)},
+                "Currencies": {
+                    "id": "b",
+                    "type": "select",
+                    "select": {"id": "c", "name": LEDGER_CURRENCIES[index % 4], "color": "red"},
+                },
+                "Date": {
+                    "id": "d",
+                    "type": "date",
+                    "date": {"start": (start + timedelta(days=index % days)).isoformat(), "end": None},
+                },
+                "Amount": {"id": "e", "type": "number", "number": None},
+                **synthetic_notes(index, extra_properties),
+            },
+        }
+        for index in range(pages)
+    ]
+
+
+class FakeServices(ThreadingHTTPServer):
+    """
+    A local stand-in for the Notion API and the exchange rate API.
+
+    Routes:
+        GET   /v1/databases/<id>        the ledger's property schema
+        POST  /v1/databases/<id>/query  pages of the synthetic ledger, following start_cursor
+                                        and projected to filter_properties
+        PATCH /v1/pages/<id>            accepts the update
+        GET   /v6/latest/<base>         the latest rates of every currency
+    """
+
+    daemon_threads = True
+
+    def __init__(self, ledger: list, latency: float = 0.0, throttle_rate: float = 0.0, seed: int = 7):
+        super().__init__(("127.0.0.1", 0), FakeServiceHandler)
+        self.ledger = ledger
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.random = random.Random(seed)
+        self.counts = Counter()
+        self.lock = threading.Lock()
+        self.rates = synthetic_rates(seed)
+        self.schema = {
+            name: {"id": value["id"], "type": value["type"]}
+            for name, value in (ledger[0]["properties"].items() if ledger else ())
+        }
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def count(self, key: str) -> None:
+        with self.lock:
+            self.counts[key] += 1
+
+    def should_throttle(self) -> bool:
+        with self.lock:
+            return self.random.random() < self.throttle_rate
+
+
+class FakeServiceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without this, delayed ACKs add ~40 ms per request
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, status: int, body: dict, headers: dict = None) -> None:
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if "gzip" in (self.headers.get("Accept-Encoding") or ""):
+            payload = gzip.compress(payload, compresslevel=1)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        url = urlsplit(self.path)
+        if not (url.path.startswith("/v1/databases/") and url.path.endswith("/query")):
+            self._send_json(404, {"object": "error", "status": 404})
+            return
+
+        self.server.count("notion_queries")
+        body = self._read_json()
+        start = int(body.get("start_cursor") or 0)
+        end = start + int(body.get("page_size") or 100)
+        has_more = end < len(self.server.ledger)
+
+        results = self.server.ledger[start:end]
+        property_ids = parse_qs(url.query).get("filter_properties")
+        if property_ids:
+            results = [
+                {
+                    **page,
+                    "properties": {
+                        name: value for name, value in page["properties"].items() if value["id"] in property_ids
+                    },
+                }
+                for page in results
+            ]
+
+        self._send_json(
+            200,
+            {
+                "object": "list",
+                "results": results,
+                "has_more": has_more,
+                "next_cursor": str(end) if has_more else None,
+            },
+        )
+
+    def do_PATCH(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        self._read_json()
+        if self.server.should_throttle():
+            self.server.count("notion_throttled")
+            self._send_json(429, {"object": "error", "status": 429}, {"Retry-After": "0"})
+            return
+
+        self.server.count("notion_updates")
+        self._send_json(200, {"object": "page", "id": self.path.rsplit("/", 1)[-1]})
+
+    def do_GET(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        if self.path.startswith("/v1/databases/"):
+            self.server.count("notion_schema_requests")
+            self._send_json(200, {"object": "database", "properties": self.server.schema})
+            return
+
+        self.server.count("rate_requests")
+        self._send_json(
+            200,
+            {
+                "result": "success",
+                "base_code": self.path.rsplit("/", 1)[-1],
+                "time_next_update_unix": int(time.time()) + 3600,
+                "rates": {"USD": 1, **self.server.rates},
+            },
+        )
+
+
+class DynamoDBCallCounter:
+    def __init__(self) -> None:
+        self.counts = Counter()
+
+    def __call__(self, model, **kwargs) -> None:
+        self.counts[model.name] += 1
+
+    @property
+    def reads(self) -> int:
+        return sum(count for name, count in self.counts.items() if name in DYNAMODB_READS)
+
+
+def seed_exchange_rates(days: int, start: date) -> int:
+    """
+    Creates the exchange rate table and stores one snapshot per weekday, so
+    weekend dates exercise the nearest-previous-date fallback.
+    """
+    import boto3
+
+    from src.entity.exchange_rate_entity import ExchangeRateEntity
+    from src.libs.exchange_rate_provider import get_selected_currencies, map_exchange_api_response
+    from src.repository.exchange_rate_repository import ExchangeRateRepository
+
+    boto3.client("dynamodb", region_name="us-east-1").create_table(
+        TableName=TABLE_NAME,
+        KeySchema=[{"AttributeName": "Date", "KeyType": "HASH"}],
+        AttributeDefinitions=[
+            {"AttributeName": "Date", "AttributeType": "S"},
+            {"AttributeName": "BaseCurrency", "AttributeType": "S"},
+        ],
+        GlobalSecondaryIndexes=[
+            {
+                "IndexName": "BaseCurrency-Date-index",
+                "KeySchema": [
+                    {"AttributeName": "BaseCurrency", "KeyType": "HASH"},
+                    {"AttributeName": "Date", "KeyType": "RANGE"},
+                ],
+                "Projection": {"ProjectionType": "ALL"},
+            }
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+
+    # Stored like the daily entry job would, honouring the configured storage format
+    selected_currencies = get_selected_currencies()
+    entities = []
+    for day in range(days):
+        rate_date = start + timedelta(days=day)
+        if rate_date.weekday() < 5:
+            entities.append(
+                ExchangeRateEntity(
+                    date=rate_date.isoformat(),
+                    rates=map_exchange_api_response(synthetic_rates(day), "USD", selected_currencies),
+                )
+            )
+
+    return ExchangeRateRepository(TABLE_NAME).post_exchange_rates(entities)
+
+
+def measure(run, trace_memory: bool) -> dict:
+    if trace_memory:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+    outcome = run()
+    wall_seconds = time.perf_counter() - start
+
+    result = {"wall_seconds": wall_seconds, **outcome}
+    if trace_memory:
+        result["peak_traced_mib"] = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+
+    return result
+
+
+def run_update_pages(args, services: FakeServices, counter: DynamoDBCallCounter) -> dict:
+    from src.config.sync_jobs import LEDGER_PROPERTIES, UNFILLED_AMOUNT_FILTER
+    from src.libs.notion_manager_provider import NotionManager
+    from src.libs.notion_page_writer import NotionPageWriter
+
+    manager = NotionManager()
+    # The production limiter (3 requests/s) would dominate every run, so the
+    # benchmark measures the pipeline itself unless --notion-rate is given
+    manager.page_writer = NotionPageWriter(
+        manager.headers,
+        manager.page_url,
+        max_workers=args.writers,
+        rate_per_second=args.notion_rate,
+        burst=args.notion_rate,
+        session=manager.session,
+    )
+
+    if args.whole_pages:
+        # Disables the filter_properties push-down to compare payload sizes
+        manager.filter_properties = lambda database_id, properties: None
+
+    def run():
+        results = manager.update_pages("benchmark-ledger", LEDGER_PROPERTIES, UNFILLED_AMOUNT_FILTER, "Amount")
+        return {
+            "pages": len(results),
+            "failed": sum(not result.success for result in results),
+            "query_bytes_received": manager.query_stats.bytes_received,
+            "query_bytes_decoded": manager.query_stats.bytes_decoded,
+        }
+
+    counter.counts.clear()
+    services.counts.clear()
+    result = measure(run, args.trace_memory)
+    result["pages_per_second"] = result["pages"] / result["wall_seconds"]
+
+    return result
+
+
+def run_create_exchange_rate_entry(args, services: FakeServices, counter: DynamoDBCallCounter) -> dict:
+    from create_exchange_rate_entry_handler import create_exchange_rate_entry_handler
+
+    def run():
+        responses = [create_exchange_rate_entry_handler({}, None) for _ in range(args.entries)]
+        return {
+            "invocations": len(responses),
+            "failed": sum(response["statusCode"] != 200 for response in responses),
+        }
+
+    counter.counts.clear()
+    services.counts.clear()
+    result = measure(run, args.trace_memory)
+    result["invocation_ms"] = result["wall_seconds"] * 1000 / max(args.entries, 1)
+
+    return result
+
+
+def collect_counts(result: dict, services: FakeServices, counter: DynamoDBCallCounter) -> dict:
+    result["http_requests"] = dict(services.counts)
+    result["dynamodb_calls"] = dict(counter.counts)
+    result["dynamodb_reads"] = counter.reads
+    return result
+
+
+def parse_budgets(values: list) -> dict:
+    budgets = {}
+    for value in values or []:
+        metric, _, limit = value.partition("=")
+        budgets[metric] = float(limit)
+
+    return budgets
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=1000, help="Synthetic ledger size (e.g. 1000 to 100000).")
+    parser.add_argument("--days", type=int, default=365, help="Distinct dates spread across the ledger.")
+    parser.add_argument("--entries", type=int, default=5, help="create_exchange_rate_entry_handler invocations.")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latency added to every fake API request.")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of page updates answered with 429.")
+    parser.add_argument("--notion-rate", type=float, default=10_000.0, help="Page writer requests per second.")
+    parser.add_argument("--writers", type=int, default=4, help="Concurrent page writers.")
+    parser.add_argument("--extra-properties", type=int, default=12, help="Unread text columns per page.")
+    parser.add_argument("--whole-pages", action="store_true", help="Query whole pages instead of the read properties.")
+    parser.add_argument("--trace-memory", action="store_true", help="Report peak traced memory (slower).")
+    parser.add_argument(
+        "--budget",
+        action="append",
+        metavar="METRIC=LIMIT",
+        help="Fail when an update_pages metric (wall_seconds, dynamodb_reads, peak_traced_mib,"
+        " query_bytes_received) exceeds LIMIT.",
+    )
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args(argv)
+
+    from moto import mock_aws
+
+    from src.libs.client_registry import clear_clients, get_dynamodb_resource
+
+    start = date(2024, 1, 1)
+    services = FakeServices(
+        synthetic_ledger(args.pages, args.days, start, args.extra_properties),
+        latency=args.latency_ms / 1000,
+        throttle_rate=args.throttle_rate,
+    )
+    threading.Thread(target=services.serve_forever, daemon=True).start()
+
+    os.environ.update(
+        {
+            "AWS_ACCESS_KEY_ID": "testing",
+            "AWS_SECRET_ACCESS_KEY": "testing",
+            "AWS_DEFAULT_REGION": "us-east-1",
+            "NOTION_TOKEN": "benchmark",
+            "NOTION_API_URL": f"{services.url}/v1",
+            "EXCHANGE_RATE_API_URL": f"{services.url}/v6/latest",
+            "EXCHANGE_RATE_PROVIDERS": "open_er_api",
+            "EXCHANGE_RATE_TABLE_NAME": TABLE_NAME,
+            # Every run starts with a cold rate cache
+            "EXCHANGE_RATE_CACHE_DIR": tempfile.mkdtemp(prefix="rate-cache-"),
+        }
+    )
+
+    clear_clients()
+    try:
+        with mock_aws():
+            seeded = seed_exchange_rates(args.days, start)
+
+            counter = DynamoDBCallCounter()
+            get_dynamodb_resource().meta.client.meta.events.register("before-call.dynamodb", counter)
+
+            report = {
+                "pages": args.pages,
+                "seeded_dates": seeded,
+                "update_pages": collect_counts(run_update_pages(args, services, counter), services, counter),
+                "create_exchange_rate_entry": collect_counts(
+                    run_create_exchange_rate_entry(args, services, counter), services, counter
+                ),
+            }
+    finally:
+        clear_clients()
+        services.shutdown()
+
+    # ru_maxrss is in KiB on Linux
+    report["peak_rss_mib"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    budgets = parse_budgets(args.budget)
+    over_budget = [
+        metric
+        for metric, limit in budgets.items()
+        if report["update_pages"].get(metric, 0) > limit
+    ]
+    report["over_budget"] = over_budget
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        update = report["update_pages"]
+        print(
+            f"update_pages: {update['pages']} pages in {update['wall_seconds']:.2f} s"
+            f" ({update['pages_per_second']:,.0f} pages/s), {update['failed']} failed"
+        )
+        entry = report["create_exchange_rate_entry"]
+        print(
+            f"create_exchange_rate_entry: {entry['invocations']} invocations,"
+            f" {entry['invocation_ms']:.1f} ms each, {entry['failed']} failed"
+        )
+        for name in ("update_pages", "create_exchange_rate_entry"):
+            print(f"  {name}")
+            print(f"    http requests  {report[name]['http_requests']}")
+            print(f"    dynamodb calls {report[name]['dynamodb_calls']} ({report[name]['dynamodb_reads']} reads)")
+            if "query_bytes_received" in report[name]:
+                print(
+                    f"    query bytes    {report[name]['query_bytes_received'] / 1024:,.0f} KiB received,"
+                    f" {report[name]['query_bytes_decoded'] / 1024:,.0f} KiB decoded"
+                )
+            if "peak_traced_mib" in report[name]:
+                print(f"    peak traced    {report[name]['peak_traced_mib']:.1f} MiB")
+        print(f"peak RSS {report['peak_rss_mib']:.1f} MiB")
+
+        for metric in over_budget:
+            print(f"Budget exceeded for {metric}: {update[metric]:.2f} > {budgets[metric]:.2f}")
+
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
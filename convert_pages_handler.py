@@ -0,0 +1,11 @@
+from src.config.sync_jobs import load_sync_jobs
+from src.libs.metrics import emit_metrics
+from src.libs.notion_manager_provider import get_notion_manager
+from src.libs.page_change_consumer import PageChangeConsumer
+
+
+@emit_metrics("convert_pages_handler")
+def convert_pages_handler(event, context):
+    consumer = PageChangeConsumer(get_notion_manager(), load_sync_jobs())
+
+    return consumer.handle(event)
@@ -1,20 +1,54 @@
 import os
+import time
+from datetime import datetime
+from functools import lru_cache
 
 from src.entity.exchange_rate_entity import ExchangeRateEntity
 from src.libs.exchange_rate_provider import ExchangeRate
+from src.libs.metrics import emit_metrics
+from src.repository.exchange_rate_cache import build_exchange_rate_repository
 from src.repository.exchange_rate_repository import ExchangeRateRepository
 
 
+@lru_cache(maxsize=None)
+def get_repository(table_name: str) -> ExchangeRateRepository:
+    # Reused across warm invocations together with its DynamoDB table; writes
+    # invalidate the date in the process-wide rate cache
+    return build_exchange_rate_repository(table_name)
+
+
+@lru_cache(maxsize=None)
+def get_exchange_rate() -> ExchangeRate:
+    return ExchangeRate()
+
+
+@emit_metrics("create_exchange_rate_entry_handler")
 def create_exchange_rate_entry_handler(event, context):
     table_name = os.getenv("EXCHANGE_RATE_TABLE_NAME", "ExchangeRates")
 
-    repository = ExchangeRateRepository(table_name=table_name)
-    exchange_rate = ExchangeRate()
+    repository = get_repository(table_name)
+    exchange_rate = get_exchange_rate()
 
     try:
-        rates = exchange_rate.fetch_data()
+        today = datetime.now().date().isoformat()
+
+        # The provider publishes once per validity window, so refreshing a
+        # stored snapshot before its next update would fetch the same rates
+        next_update_unix = repository.get_next_update_unix(today)
+        if next_update_unix is not None and time.time() < next_update_unix:
+            return {
+                "statusCode": 200,
+                "body": "Exchange rate entry is up to date.",
+            }
+
+        snapshot = exchange_rate.fetch_snapshot()
 
-        exchange_rate_entity = ExchangeRateEntity(rates=rates)
+        exchange_rate_entity = ExchangeRateEntity(
+            date=today,
+            rates=exchange_rate.select_rates(snapshot.rates),
+            next_update_unix=snapshot.next_update_unix,
+            source=snapshot.source,
+        )
 
         result = repository.post_exchange_rate(exchange_rate_entity)
 
@@ -0,0 +1,44 @@
+import json
+
+from src.config.sync_jobs import load_sync_jobs
+from src.libs.ledger_export import LedgerExporter
+from src.libs.metrics import emit_metrics
+from src.libs.notion_manager_provider import get_notion_manager
+from src.libs.notion_schema import NotionProperties
+
+
+@emit_metrics("export_ledgers_handler")
+def export_ledgers_handler(event, context):
+    output_dir = event.get("output_dir")
+    if not output_dir:
+        return {"statusCode": 400, "body": "output_dir is required."}
+
+    jobs = load_sync_jobs()
+    if event.get("jobs"):
+        jobs = [job for job in jobs if job.name in event["jobs"]]
+
+    # Extra columns, e.g. {"Category": "select"}
+    extra_properties = {
+        name: NotionProperties(property_type)
+        for name, property_type in (event.get("properties") or {}).items()
+    }
+
+    try:
+        exporter = LedgerExporter(get_notion_manager(), output_dir, event.get("format"))
+        body = []
+        for job in jobs:
+            job.properties = {**job.properties, **extra_properties}
+            report = exporter.export(job, event.get("filter_body"), bool(event.get("full")))
+            body.append(
+                {
+                    "name": report.name,
+                    "pages": report.pages,
+                    "months": report.months,
+                    "removed": report.removed,
+                    "last_edited_time": report.last_edited_time,
+                }
+            )
+
+        return {"statusCode": 200, "body": json.dumps(body)}
+    except Exception as e:
+        return {"statusCode": 500, "body": f"An error occurred: {str(e)}"}
@@ -0,0 +1,49 @@
+import json
+
+from src.config.sync_jobs import LEDGER_PROPERTIES
+from src.libs.metrics import emit_metrics
+from src.libs.notion_export import FileSink
+from src.libs.notion_manager_provider import get_notion_manager
+from src.libs.notion_schema import NotionProperties
+
+
+@emit_metrics("recompute_from_export_handler")
+def recompute_from_export_handler(event, context):
+    path = event.get("path")
+    if not path:
+        return {"statusCode": 400, "body": "path is required."}
+
+    properties = LEDGER_PROPERTIES
+    if "properties" in event:
+        properties = {
+            name: NotionProperties(property_type)
+            for name, property_type in event["properties"].items()
+        }
+
+    notion_manager = get_notion_manager()
+    sink = FileSink(event["output_path"]) if event.get("output_path") else None
+
+    try:
+        report = notion_manager.update_pages_from_export(
+            path,
+            properties,
+            event.get("update_field", "Amount"),
+            sink=sink,
+            target_fields=event.get("target_fields"),
+            skip_filled=event.get("skip_filled", False),
+            batch_size=int(event.get("batch_size", 1000)),
+        )
+
+        return {
+            "statusCode": 200,
+            "body": json.dumps(
+                {
+                    "pages": report.pages,
+                    "written": report.written,
+                    "failed": report.failed,
+                    "failures": report.failures[:20],
+                }
+            ),
+        }
+    except Exception as e:
+        return {"statusCode": 500, "body": f"An error occurred: {str(e)}"}
@@ -0,0 +1,55 @@
+import json
+import os
+
+from src.config.sync_jobs import load_sync_jobs
+from src.libs.metrics import emit_metrics
+from src.libs.notion_manager_provider import get_notion_manager
+
+
+@emit_metrics("reconcile_ledgers_handler")
+def reconcile_ledgers_handler(event, context):
+    event = event or {}
+    jobs = load_sync_jobs()
+    if event.get("jobs"):
+        jobs = [job for job in jobs if job.name in event["jobs"]]
+
+    tolerance = float(event.get("tolerance", os.getenv("RECONCILE_TOLERANCE", "0.01")))
+    report_dir = event.get("report_dir")
+    notion_manager = get_notion_manager()
+
+    try:
+        if report_dir:
+            os.makedirs(report_dir, exist_ok=True)
+        # One scan serves every ledger
+        rate_index = notion_manager.exchange_rate_repository.build_rate_index(
+            max_staleness_days=notion_manager.max_rate_staleness_days
+        )
+
+        body = []
+        for job in jobs:
+            report = notion_manager.reconcile_pages(
+                job.database_id,
+                job.properties,
+                job.update_field,
+                tolerance=tolerance,
+                target_fields=job.target_fields,
+                dry_run=event.get("dry_run", False),
+                report_path=os.path.join(report_dir, f"{job.name}.jsonl") if report_dir else None,
+                rate_index=rate_index,
+            )
+            body.append(
+                {
+                    "name": job.name,
+                    "pages": report.pages,
+                    "checked": report.checked,
+                    "drifted": report.drifted,
+                    "written": report.written,
+                    "failed": report.failed,
+                    "diffs": report.diffs[:20],
+                    "failures": report.failures[:20],
+                }
+            )
+
+        return {"statusCode": 200, "body": json.dumps(body)}
+    except Exception as e:
+        return {"statusCode": 500, "body": f"An error occurred: {str(e)}"}
@@ -0,0 +1,105 @@
+import json
+import os
+
+from src.libs.notion_schema import NotionProperties
+from src.libs.sync_runner import SyncJob
+from src.repository.sync_state_repository import get_sync_state_repository
+
+LEDGER_PROPERTIES = {
+    "id": NotionProperties.ID,
+    "Local Amount": NotionProperties.NUMBER,
+    "Currencies": NotionProperties.SELECT,
+    "Date": NotionProperties.DATE,
+    "Amount": NotionProperties.NUMBER,
+}
+
+UNFILLED_AMOUNT_FILTER = {
+    "filter": {
+        "property": "Amount",
+        "number": {
+            "is_empty": True,
+        },
+    }
+}
+
+
+def expenses_job() -> SyncJob:
+    return SyncJob(
+        name="expenses",
+        database_id=os.getenv("NOTION_DB_ID_EXPENSES"),
+        properties=LEDGER_PROPERTIES,
+        filter_body=UNFILLED_AMOUNT_FILTER,
+        update_field="Amount",
+    )
+
+
+def income_job() -> SyncJob:
+    return SyncJob(
+        name="income",
+        database_id=os.getenv("NOTION_DB_ID_INCOME"),
+        properties=LEDGER_PROPERTIES,
+        filter_body=UNFILLED_AMOUNT_FILTER,
+        update_field="Amount",
+    )
+
+
+def parse_sync_job(definition: dict) -> SyncJob:
+    """
+    Builds a SyncJob from a JSON definition.
+
+    Args:
+        definition (dict): A job with "name", "database_id" and optionally
+            "properties" (property name to NotionProperties value, e.g. "number"),
+            "filter_body", "update_field" and "target_fields" (field name to
+            currency code). Omitted fields use the ledger defaults.
+    """
+    properties = LEDGER_PROPERTIES
+    if "properties" in definition:
+        properties = {
+            name: NotionProperties(property_type)
+            for name, property_type in definition["properties"].items()
+        }
+
+    return SyncJob(
+        name=definition["name"],
+        database_id=definition["database_id"],
+        properties=properties,
+        filter_body=definition.get("filter_body", UNFILLED_AMOUNT_FILTER),
+        update_field=definition.get("update_field", "Amount"),
+        target_fields=definition.get("target_fields", {}),
+    )
+
+
+def load_sync_jobs() -> list:
+    """
+    Returns the jobs defined as a JSON list in NOTION_SYNC_JOBS, or the
+    expenses and income ledgers when it is not set.
+    """
+    definitions = os.getenv("NOTION_SYNC_JOBS")
+    if definitions:
+        return [parse_sync_job(definition) for definition in json.loads(definitions)]
+
+    return [job for job in (expenses_job(), income_job()) if job.database_id]
+
+
+def get_incremental_sync_state():
+    """
+    Returns the sync state store when INCREMENTAL_SYNC is enabled, otherwise None.
+    """
+    if os.getenv("INCREMENTAL_SYNC", "false").lower() == "true":
+        return get_sync_state_repository()
+
+    return None
+
+
+def get_resume_state():
+    """
+    Returns the store for resume tokens, unless RESUMABLE_SYNC is disabled.
+
+    Without SYNC_STATE_TABLE_NAME the tokens are kept in a local file, which
+    only survives within one execution environment.
+    """
+    if os.getenv("RESUMABLE_SYNC", "true").lower() == "true":
+        return get_sync_state_repository()
+
+    return None
@@ -1,7 +1,140 @@
+import math
+import sys
+from array import array
+from collections.abc import Mapping
 from dataclasses import dataclass, field
 from datetime import datetime
 from decimal import Decimal
-from typing import Dict
+from typing import Dict, Optional
+
+PACKED_ENCODING = "f64-v1"
+
+# Fixed currency-code dictionary of the packed encoding: position i of the
+# packed array holds the rate of CURRENCY_CODES[i]. Append new codes only,
+# never reorder or remove, or stored items will decode to the wrong currency.
+CURRENCY_CODES = (
+    "AED", "AFN", "ALL", "AMD", "ANG", "AOA", "ARS", "AUD", "AWG", "AZN", "BAM", "BBD",
+    "BDT", "BGN", "BHD", "BIF", "BMD", "BND", "BOB", "BRL", "BSD", "BTN", "BWP", "BYN",
+    "BZD", "CAD", "CDF", "CHF", "CLP", "CNY", "COP", "CRC", "CUP", "CVE", "CZK", "DJF",
+    "DKK", "DOP", "DZD", "EGP", "ERN", "ETB", "EUR", "FJD", "FKP", "FOK", "GBP", "GEL",
+    "GGP", "GHS", "GIP", "GMD", "GNF", "GTQ", "GYD", "HKD", "HNL", "HRK", "HTG", "HUF",
+    "IDR", "ILS", "IMP", "INR", "IQD", "IRR", "ISK", "JEP", "JMD", "JOD", "JPY", "KES",
+    "KGS", "KHR", "KID", "KMF", "KRW", "KWD", "KYD", "KZT", "LAK", "LBP", "LKR", "LRD",
+    "LSL", "LYD", "MAD", "MDL", "MGA", "MKD", "MMK", "MNT", "MOP", "MRU", "MUR", "MVR",
+    "MWK", "MXN", "MYR", "MZN", "NAD", "NGN", "NIO", "NOK", "NPR", "NZD", "OMR", "PAB",
+    "PEN", "PGK", "PHP", "PKR", "PLN", "PYG", "QAR", "RON", "RSD", "RUB", "RWF", "SAR",
+    "SBD", "SCR", "SDG", "SEK", "SGD", "SHP", "SLE", "SLL", "SOS", "SRD", "SSP", "STN",
+    "SYP", "SZL", "THB", "TJS", "TMT", "TND", "TOP", "TRY", "TTD", "TVD", "TWD", "TZS",
+    "UAH", "UGX", "USD", "UYU", "UZS", "VES", "VND", "VUV", "WST", "XAF", "XCD", "XCG",
+    "XDR", "XOF", "XPF", "YER", "ZAR", "ZMW", "ZWL",
+)
+CURRENCY_POSITIONS = {code: position for position, code in enumerate(CURRENCY_CODES)}
+
+
+def pack_rates(rates: dict, base_currency: str = "USD"):
+    """
+    Packs rates keyed as "CUR/BASE" into little-endian float64 bytes.
+
+    Args:
+        rates (dict): The rates to pack.
+        base_currency (str): The base currency of the rate keys.
+
+    Returns:
+        tuple: The packed bytes and a dictionary of the rates whose currency
+            is not in CURRENCY_CODES.
+    """
+    values = array("d", [math.nan]) * len(CURRENCY_CODES)
+    extra_rates = {}
+
+    for pair, rate in rates.items():
+        currency, _, base = pair.partition("/")
+        position = CURRENCY_POSITIONS.get(currency)
+
+        if position is None or base != base_currency:
+            extra_rates[pair] = rate
+        else:
+            values[position] = float(rate)
+
+    if sys.byteorder == "big":
+        values.byteswap()
+
+    return values.tobytes(), extra_rates
+
+
+class PackedRates(Mapping):
+    """
+    A read-only "CUR/BASE" -> rate mapping over packed float64 bytes.
+
+    Values are read straight from a memoryview of the stored bytes, so
+    decoding an item does not copy or convert the whole array.
+    """
+
+    __slots__ = ("_values", "_base_currency", "_overlay")
+
+    def __init__(self, packed, base_currency: str = "USD", overlay: dict = None) -> None:
+        # boto3 wraps DynamoDB binaries in a Binary object exposing `value`
+        packed = getattr(packed, "value", packed)
+
+        if sys.byteorder == "big":
+            values = array("d")
+            values.frombytes(packed)
+            values.byteswap()
+            self._values = memoryview(values)
+        else:
+            self._values = memoryview(packed).cast("d")
+
+        self._base_currency = base_currency
+        self._overlay = overlay or {}
+
+    def _position(self, pair: str):
+        currency, _, base = pair.partition("/")
+        if base != self._base_currency:
+            return None
+        return CURRENCY_POSITIONS.get(currency)
+
+    def __getitem__(self, pair: str):
+        if pair in self._overlay:
+            return self._overlay[pair]
+
+        position = self._position(pair)
+        if position is None or position >= len(self._values):
+            raise KeyError(pair)
+
+        value = self._values[position]
+        if math.isnan(value):
+            raise KeyError(pair)
+        return value
+
+    def __iter__(self):
+        for position, value in enumerate(self._values):
+            pair = f"{CURRENCY_CODES[position]}/{self._base_currency}"
+            if not math.isnan(value) and pair not in self._overlay:
+                yield pair
+        yield from self._overlay
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+def decode_rates(data: dict) -> Mapping:
+    """
+    Returns the rates of a stored item in either storage format.
+
+    Items in the packed format store most rates in `RatesPacked`. Their
+    `Rates` map holds currencies outside CURRENCY_CODES and single-currency
+    updates, which take precedence over the packed values.
+
+    Args:
+        data (dict): The stored item.
+    """
+    if data.get("RatesPacked") is None:
+        return data.get("Rates")
+
+    return PackedRates(
+        data["RatesPacked"],
+        data.get("BaseCurrency") or "USD",
+        overlay=data.get("Rates") or {},
+    )
 
 
 @dataclass
@@ -9,6 +142,9 @@ class ExchangeRateEntity:
     date: str = field(default_factory=lambda: datetime.now().date().isoformat())
     base_currency: str = "USD"
     rates: Dict[str, float] = field(default_factory=dict)
+    # When the provider publishes its next update (Unix seconds) and which provider it was
+    next_update_unix: Optional[int] = None
+    source: Optional[str] = None
 
     @classmethod
     def new(
@@ -29,15 +165,29 @@ class ExchangeRateEntity:
         """
         Creates an ExchangeRateEntity instance from a dictionary.
 
+        Both the map and the packed storage formats are accepted.
+
         Args:
             data (dict): The dictionary containing the exchange rate data.
         """
+        next_update_unix = data.get("NextUpdateUnix")
+
         return cls(
             date=data.get("Date"),
             base_currency=data.get("BaseCurrency"),
-            rates=data.get("Rates"),
+            rates=decode_rates(data),
+            next_update_unix=int(next_update_unix) if next_update_unix is not None else None,
+            source=data.get("Source"),
         )
 
+    def _metadata(self) -> dict:
+        metadata = {}
+        if self.next_update_unix is not None:
+            metadata["NextUpdateUnix"] = int(self.next_update_unix)
+        if self.source:
+            metadata["Source"] = self.source
+        return metadata
+
     def to_dict(self) -> dict:
         """
         Converts the ExchangeRateEntity instance to a dictionary format suitable for DynamoDB.
@@ -49,4 +199,24 @@ class ExchangeRateEntity:
             "Date": self.date,
             "BaseCurrency": self.base_currency,
             "Rates": rates_decimal,
+            **self._metadata(),
+        }
+
+    def to_packed_dict(self) -> dict:
+        """
+        Converts the ExchangeRateEntity instance to the compact packed format.
+
+        Rates of the currencies in CURRENCY_CODES are stored as one float64
+        Binary attribute; any other rates are kept in the `Rates` map, which
+        is always present so single-currency updates can target it.
+        """
+        packed, extra_rates = pack_rates(self.rates, self.base_currency)
+
+        return {
+            "Date": self.date,
+            "BaseCurrency": self.base_currency,
+            "Encoding": PACKED_ENCODING,
+            "RatesPacked": packed,
+            "Rates": {k: Decimal(str(v)) for k, v in extra_rates.items()},
+            **self._metadata(),
         }
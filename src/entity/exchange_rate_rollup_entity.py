@@ -0,0 +1,175 @@
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Dict, Optional
+
+# Rollup items share the table with the daily entries. Their keys start with
+# a letter, so they sort after every "YYYY-MM-DD" date and never fall inside
+# a range query over daily entries.
+ROLLUP_PREFIXES = {"month": "M#", "year": "Y#"}
+ROLLUP_PERIOD_LENGTHS = {"month": 7, "year": 4}
+
+
+def rollup_key(granularity: str, period: str) -> str:
+    """
+    Returns the table key of a rollup (e.g. "M#2024-01" or "Y#2024").
+    """
+    if granularity not in ROLLUP_PREFIXES:
+        raise Exception(f"Unknown rollup granularity: {granularity}")
+    return f"{ROLLUP_PREFIXES[granularity]}{period}"
+
+
+def is_rollup_key(key: str) -> bool:
+    return key[:2] in ROLLUP_PREFIXES.values()
+
+
+def rollup_periods(date: str) -> list:
+    """
+    Returns the (granularity, period) pairs of the rollups a date belongs to.
+    """
+    return [(granularity, date[:length]) for granularity, length in ROLLUP_PERIOD_LENGTHS.items()]
+
+
+@dataclass
+class CurrencyStats:
+    count: int = 0
+    sum: float = 0.0
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+    @property
+    def average(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+
+@dataclass
+class ExchangeRateRollupEntity:
+    granularity: str
+    period: str
+    base_currency: str = "USD"
+    stats: Dict[str, CurrencyStats] = field(default_factory=dict)
+    # Incremented on every write; rollups are replaced with a condition on it
+    version: int = 0
+
+    @property
+    def key(self) -> str:
+        return rollup_key(self.granularity, self.period)
+
+    @classmethod
+    def from_rates(
+        cls, granularity: str, period: str, rates_by_date: dict, base_currency: str = "USD"
+    ) -> "ExchangeRateRollupEntity":
+        """
+        Computes a rollup from the rates of every date in its period.
+
+        Args:
+            granularity (str): "month" or "year".
+            period (str): The month (YYYY-MM) or year (YYYY).
+            rates_by_date (dict): The rates keyed as "CUR/USD", by date.
+            base_currency (str): The base currency of the rates.
+        """
+        rollup = cls(granularity, period, base_currency)
+        for rates in rates_by_date.values():
+            for pair, rate in (rates or {}).items():
+                rollup.stats.setdefault(pair, CurrencyStats()).add(float(rate))
+        return rollup
+
+    def apply(self, old_rates: Optional[dict], new_rates: Optional[dict]) -> bool:
+        """
+        Replaces one date's contribution: its previous rates are taken out
+        and its new rates are added.
+
+        Sums and counts are always exact, but a minimum or maximum cannot be
+        taken back out. If a replaced rate was one of them, the rollup must be
+        recomputed from the period's entries.
+
+        Args:
+            old_rates (dict): The rates the date had before, or None.
+            new_rates (dict): The rates the date has now, or None.
+
+        Returns:
+            bool: False if the rollup must be recomputed.
+        """
+        old_rates = old_rates or {}
+        new_rates = new_rates or {}
+
+        for pair in set(old_rates) | set(new_rates):
+            old = float(old_rates[pair]) if old_rates.get(pair) is not None else None
+            new = float(new_rates[pair]) if new_rates.get(pair) is not None else None
+            if old == new:
+                continue
+
+            stats = self.stats.setdefault(pair, CurrencyStats())
+            if old is not None:
+                if stats.count == 0 or old <= stats.min or old >= stats.max:
+                    return False
+                stats.count -= 1
+                stats.sum -= old
+            if new is not None:
+                stats.add(new)
+            if stats.count == 0:
+                del self.stats[pair]
+
+        return True
+
+    def summary(self, pair: str) -> Optional[dict]:
+        stats = self.stats.get(pair)
+        if stats is None:
+            return None
+        return {
+            "Period": self.period,
+            "Count": stats.count,
+            "Average": stats.average,
+            "Min": stats.min,
+            "Max": stats.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ExchangeRateRollupEntity":
+        """
+        Creates an ExchangeRateRollupEntity instance from a stored item.
+
+        Args:
+            data (dict): The stored rollup item.
+        """
+        return cls(
+            granularity=data.get("Granularity"),
+            period=data.get("Period"),
+            base_currency=data.get("BaseCurrency"),
+            stats={
+                pair: CurrencyStats(
+                    count=int(stats["Count"]),
+                    sum=float(stats["Sum"]),
+                    min=float(stats["Min"]),
+                    max=float(stats["Max"]),
+                )
+                for pair, stats in (data.get("Stats") or {}).items()
+            },
+            version=int(data.get("Version") or 0),
+        )
+
+    def to_dict(self) -> dict:
+        """
+        Converts the ExchangeRateRollupEntity instance to a dictionary format suitable for DynamoDB.
+        """
+        return {
+            "Date": self.key,
+            "BaseCurrency": self.base_currency,
+            "Granularity": self.granularity,
+            "Period": self.period,
+            "Stats": {
+                pair: {
+                    "Count": stats.count,
+                    "Sum": Decimal(str(stats.sum)),
+                    "Min": Decimal(str(stats.min)),
+                    "Max": Decimal(str(stats.max)),
+                }
+                for pair, stats in self.stats.items()
+            },
+            "Version": self.version,
+        }
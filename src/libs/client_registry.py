@@ -0,0 +1,120 @@
+import threading
+
+from src.libs.metrics import instrument_dynamodb_client, metrics_enabled
+
+# Clients are cached at module level so warm Lambda invocations reuse
+# their connection pools instead of reconnecting on every call. boto3 and
+# requests are imported on first use to keep them out of the cold-start
+# import path of handlers that never reach them.
+_lock = threading.Lock()
+_http_sessions = {}
+_dynamodb_resources = {}
+_dynamodb_tables = {}
+_lambda_clients = {}
+
+
+def get_http_session(name: str, pool_maxsize: int = 10) -> "requests.Session":
+    """
+    Returns a pooled keep-alive HTTP session, creating it on first use.
+
+    Args:
+        name (str): The name of the API the session is used for (e.g. "notion").
+        pool_maxsize (int): The maximum number of connections kept per host.
+
+    Returns:
+        requests.Session: The cached session for the given name.
+    """
+    session = _http_sessions.get(name)
+    if session is not None:
+        return session
+
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    with _lock:
+        if name not in _http_sessions:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _http_sessions[name] = session
+
+        return _http_sessions[name]
+
+
+def get_dynamodb_resource(region_name: str = "us-east-1"):
+    """
+    Returns the cached DynamoDB resource for a region, creating it on first use.
+
+    Args:
+        region_name (str): The AWS region of the resource.
+    """
+    resource = _dynamodb_resources.get(region_name)
+    if resource is not None:
+        return resource
+
+    import boto3
+
+    with _lock:
+        if region_name not in _dynamodb_resources:
+            resource = boto3.resource("dynamodb", region_name=region_name)
+            if metrics_enabled():
+                instrument_dynamodb_client(resource.meta.client)
+            _dynamodb_resources[region_name] = resource
+
+        return _dynamodb_resources[region_name]
+
+
+def get_dynamodb_table(table_name: str, region_name: str = "us-east-1"):
+    """
+    Returns the cached DynamoDB table for a region and table name.
+
+    Args:
+        table_name (str): The name of the table.
+        region_name (str): The AWS region of the table.
+    """
+    key = (region_name, table_name)
+    table = _dynamodb_tables.get(key)
+    if table is not None:
+        return table
+
+    resource = get_dynamodb_resource(region_name)
+    with _lock:
+        if key not in _dynamodb_tables:
+            _dynamodb_tables[key] = resource.Table(table_name)
+
+        return _dynamodb_tables[key]
+
+
+def get_lambda_client(region_name: str = "us-east-1"):
+    """
+    Returns the cached Lambda client for a region, creating it on first use.
+
+    Args:
+        region_name (str): The AWS region of the client.
+    """
+    client = _lambda_clients.get(region_name)
+    if client is not None:
+        return client
+
+    import boto3
+
+    with _lock:
+        if region_name not in _lambda_clients:
+            _lambda_clients[region_name] = boto3.client("lambda", region_name=region_name)
+
+        return _lambda_clients[region_name]
+
+
+def clear_clients() -> None:
+    """
+    Drops every cached client, closing the HTTP sessions.
+    """
+    with _lock:
+        for session in _http_sessions.values():
+            session.close()
+
+        _http_sessions.clear()
+        _dynamodb_resources.clear()
+        _dynamodb_tables.clear()
+        _lambda_clients.clear()
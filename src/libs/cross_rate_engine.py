@@ -0,0 +1,214 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+from src.libs.currency_converter import ConversionResult, is_usd
+
+# numpy is imported on first use to keep it out of handler cold starts
+
+
+@dataclass(frozen=True)
+class CrossRateMatrix:
+    date: str
+    currencies: Tuple[str, ...]
+    positions: Dict[str, int]
+    # rates[i, j] is the number of units of currencies[j] worth one unit of currencies[i]
+    rates: "np.ndarray"
+
+    def rate(self, from_currency: str, to_currency: str) -> Optional[float]:
+        source = self.positions.get(from_currency)
+        target = self.positions.get(to_currency)
+        if source is None or target is None:
+            return None
+
+        rate = float(self.rates[source, target])
+        return None if rate != rate else rate
+
+
+class CrossRateEngine:
+    def __init__(self, rate_index, max_cached_dates: int = 32) -> None:
+        """
+        Converts amounts between any two currencies from the stored snapshots.
+
+        Each snapshot holds the rates of every currency against one base, so
+        the rate between two currencies A and B on a date is rate(B) / rate(A).
+        The engine computes the full N×N matrix of a snapshot with a single
+        vectorized outer division and caches it per date, so any number of
+        target currencies can be filled without further storage reads.
+
+        Args:
+            rate_index (ExchangeRateIndex): The loaded rates. A date without a
+                snapshot falls back to the nearest previous one within the
+                index's maximum staleness.
+            max_cached_dates (int): How many date matrices are kept in memory.
+        """
+        self.rate_index = rate_index
+        self.base_currency = rate_index.base_currency
+        self.max_cached_dates = max_cached_dates
+        self._matrices = OrderedDict()
+        self._lock = threading.Lock()
+
+    def normalize(self, currency: str) -> str:
+        # Notion select names may decorate the code (e.g. "USD $")
+        if self.base_currency == "USD" and is_usd(currency):
+            return "USD"
+        return currency
+
+    def _build_matrix(self, snapshot_date: str, snapshot: dict) -> CrossRateMatrix:
+        import numpy as np
+
+        suffix = f"/{self.base_currency}"
+        currencies = [self.base_currency] + sorted(
+            pair[: -len(suffix)] for pair in snapshot if pair.endswith(suffix)
+        )
+        base_rates = np.fromiter(
+            [1.0] + [float(snapshot[f"{currency}{suffix}"]) for currency in currencies[1:]],
+            dtype=np.float64,
+            count=len(currencies),
+        )
+        base_rates[base_rates <= 0] = np.nan
+
+        return CrossRateMatrix(
+            date=snapshot_date,
+            currencies=tuple(currencies),
+            positions={currency: position for position, currency in enumerate(currencies)},
+            rates=base_rates[np.newaxis, :] / base_rates[:, np.newaxis],
+        )
+
+    def matrix(self, date: str) -> Optional[CrossRateMatrix]:
+        """
+        Returns the cross-rate matrix for a date, or None when no snapshot
+        is available within the maximum staleness.
+
+        Args:
+            date (str): The date in YYYY-MM-DD format.
+        """
+        snapshot_date, snapshot = self.rate_index.resolve_snapshot(date)
+        if snapshot is None:
+            return None
+
+        with self._lock:
+            cached = self._matrices.get(snapshot_date)
+            # A date re-added to the index holds a new snapshot object
+            if cached is not None and cached[0] is snapshot:
+                self._matrices.move_to_end(snapshot_date)
+                return cached[1]
+
+        matrix = self._build_matrix(snapshot_date, snapshot)
+
+        with self._lock:
+            self._matrices[snapshot_date] = (snapshot, matrix)
+            self._matrices.move_to_end(snapshot_date)
+            while len(self._matrices) > self.max_cached_dates:
+                self._matrices.popitem(last=False)
+
+        return matrix
+
+    def rate(self, from_currency: str, to_currency: str, date: str) -> Optional[float]:
+        """
+        Returns how many units of to_currency one unit of from_currency is
+        worth on a date, or None when either rate is unknown.
+        """
+        from_currency = self.normalize(from_currency)
+        to_currency = self.normalize(to_currency)
+        if from_currency == to_currency:
+            return 1.0
+
+        matrix = self.matrix(date)
+        if matrix is None:
+            return None
+
+        return matrix.rate(from_currency, to_currency)
+
+    def convert(self, amount: float, from_currency: str, to_currency: str, date: str) -> float:
+        """
+        Converts an amount from one currency to another.
+
+        Args:
+            amount (float): The amount in from_currency.
+            from_currency (str): The currency code of the amount.
+            to_currency (str): The currency code to convert to.
+            date (str): The date in YYYY-MM-DD format.
+
+        Returns:
+            float: The amount in to_currency.
+        """
+        rate = self.rate(from_currency, to_currency, date)
+        if rate is None:
+            raise ValueError(
+                f"No exchange rate found for {from_currency} to {to_currency} on {date}"
+            )
+
+        return amount * rate
+
+    def convert_batch(
+        self,
+        amounts: Sequence[float],
+        from_currencies: Sequence[str],
+        to_currencies: Union[str, Sequence[str]],
+        dates: Sequence[str],
+    ) -> ConversionResult:
+        """
+        Converts columns of amounts between currencies.
+
+        Rows are grouped by (from, to, date) so each rate is looked up once,
+        then every amount is multiplied by its group's rate in one array
+        operation.
+
+        Args:
+            amounts (sequence): The amounts.
+            from_currencies (sequence): The currency code of each amount.
+            to_currencies (str | sequence): The target currency, or one per amount.
+            dates (sequence): The date of each amount in YYYY-MM-DD format.
+
+        Returns:
+            ConversionResult: The converted values aligned with the input order
+                (NaN where unresolved) and a mask of the rows that could be converted.
+        """
+        import numpy as np
+
+        amounts_array = np.asarray(amounts, dtype=np.float64)
+        if isinstance(to_currencies, str):
+            to_currencies = [to_currencies] * len(amounts_array)
+
+        groups = {}
+        group_ids = np.fromiter(
+            (
+                groups.setdefault(key, len(groups))
+                for key in zip(from_currencies, to_currencies, dates)
+            ),
+            dtype=np.intp,
+            count=len(amounts_array),
+        )
+
+        group_rates = np.full(len(groups), np.nan)
+        for (from_currency, to_currency, date), group_id in groups.items():
+            if not from_currency or not to_currency or not date:
+                continue
+
+            rate = self.rate(from_currency, to_currency, date)
+            if rate is not None:
+                group_rates[group_id] = rate
+
+        values = amounts_array * group_rates[group_ids]
+
+        return ConversionResult(values=values, resolved=~np.isnan(values))
+
+    def convert_columns(
+        self,
+        amounts: Sequence[float],
+        from_currencies: Sequence[str],
+        dates: Sequence[str],
+        targets: Sequence[str],
+    ) -> Dict[str, ConversionResult]:
+        """
+        Converts the same amounts into several target currencies.
+
+        Returns:
+            dict: A ConversionResult per target currency.
+        """
+        return {
+            target: self.convert_batch(amounts, from_currencies, target, dates)
+            for target in targets
+        }
@@ -0,0 +1,72 @@
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence
+
+# numpy is imported on first conversion to keep it out of handler cold starts
+
+
+@dataclass
+class ConversionResult:
+    values: "np.ndarray"
+    resolved: "np.ndarray"
+
+    @property
+    def unresolved(self) -> "np.ndarray":
+        return ~self.resolved
+
+
+def is_usd(currency: str) -> bool:
+    # Notion select names may decorate the code (e.g. "USD $")
+    return "USD" in currency
+
+
+def convert_to_usd(
+    amounts: Sequence[float],
+    currencies: Sequence[str],
+    dates: Sequence[str],
+    rate_resolver: Callable[[str, str], Optional[float]],
+) -> ConversionResult:
+    """
+    Converts columns of amounts to USD.
+
+    Rows are grouped by (currency, date) so each group's rate is resolved
+    once, then all amounts are divided by their group's rate in a single
+    array operation. To recompute a whole ledger against the repository,
+    pass `repository.build_rate_index().get_rate` as the resolver.
+
+    Args:
+        amounts (sequence): The amounts in their local currency.
+        currencies (sequence): The currency code of each amount.
+        dates (sequence): The date of each amount in YYYY-MM-DD format.
+        rate_resolver (callable): Returns the rate of a currency on a date
+            (units per USD), or None when unknown.
+
+    Returns:
+        ConversionResult: The USD values aligned with the input order (NaN where
+            unresolved) and a mask of the rows that could be converted.
+    """
+    import numpy as np
+
+    amounts_array = np.asarray(amounts, dtype=np.float64)
+
+    groups = {}
+    group_ids = np.fromiter(
+        (groups.setdefault(key, len(groups)) for key in zip(currencies, dates)),
+        dtype=np.intp,
+        count=len(amounts_array),
+    )
+
+    group_rates = np.full(len(groups), np.nan)
+    for (currency, date), group_id in groups.items():
+        if not currency or not date:
+            continue
+
+        if is_usd(currency):
+            group_rates[group_id] = 1.0
+        else:
+            rate = rate_resolver(currency, date)
+            if rate:
+                group_rates[group_id] = float(rate)
+
+    values = amounts_array / group_rates[group_ids]
+
+    return ConversionResult(values=values, resolved=~np.isnan(values))
@@ -0,0 +1,194 @@
+import json
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import List, Optional
+
+from src.entity.exchange_rate_entity import ExchangeRateEntity
+from src.libs.client_registry import get_http_session
+from src.libs.exchange_rate_provider import get_selected_currencies, map_exchange_api_response
+
+
+def date_range(start_date: str, end_date: str) -> List[str]:
+    """
+    Returns every date between two dates, both included, in YYYY-MM-DD format.
+    """
+    start = date.fromisoformat(start_date)
+    end = date.fromisoformat(end_date)
+
+    return [(start + timedelta(days=day)).isoformat() for day in range((end - start).days + 1)]
+
+
+class HistoricalRateSource(ABC):
+    """
+    A source of past exchange rates, keyed by date.
+    """
+
+    base_currency = "USD"
+
+    @abstractmethod
+    def fetch_rates(self, rate_date: str) -> Optional[dict]:
+        """
+        Fetches the rates for a date.
+
+        Args:
+            rate_date (str): The date in YYYY-MM-DD format.
+
+        Returns:
+            dict: The rates keyed as "CUR/USD", or None when the date is unavailable.
+        """
+
+
+class FileHistoricalRateSource(HistoricalRateSource):
+    def __init__(self, path: str, selected_currencies: list = None) -> None:
+        """
+        Reads historical rates from a local file.
+
+        The file is either a JSON object mapping dates to `{currency: rate}`
+        dictionaries, or JSON lines of `{"date": ..., "rates": {...}}`.
+
+        Args:
+            path (str): The path of the file.
+            selected_currencies (list): The currencies to keep (defaults to EXCHANGE_RATE_CURRENCIES).
+        """
+        self.path = path
+        if selected_currencies is None:
+            selected_currencies = get_selected_currencies()
+        self.selected_currencies = selected_currencies
+        self._rates = None
+
+    def _load(self) -> dict:
+        with open(self.path) as file:
+            if self.path.endswith(".jsonl"):
+                rows = (json.loads(line) for line in file if line.strip())
+                return {row["date"]: row["rates"] for row in rows}
+
+            return json.load(file)
+
+    def fetch_rates(self, rate_date: str) -> Optional[dict]:
+        if self._rates is None:
+            self._rates = self._load()
+
+        rates = self._rates.get(rate_date)
+        if rates is None:
+            return None
+
+        return map_exchange_api_response(rates, self.base_currency, self.selected_currencies)
+
+
+class CurrencyApiHistoricalRateSource(HistoricalRateSource):
+    def __init__(self, selected_currencies: list = None, timeout: float = 10) -> None:
+        """
+        Reads historical rates from the free fawazahmed0 currency API, which
+        publishes one snapshot per day.
+
+        Args:
+            selected_currencies (list): The currencies to keep (defaults to EXCHANGE_RATE_CURRENCIES).
+            timeout (float): The request timeout in seconds.
+        """
+        if selected_currencies is None:
+            selected_currencies = get_selected_currencies()
+        self.selected_currencies = selected_currencies
+        self.timeout = timeout
+        self.base_url = "https://cdn.jsdelivr.net/npm/@fawazahmed0/currency-api@{date}/v1/currencies/usd.json"
+
+    def fetch_rates(self, rate_date: str) -> Optional[dict]:
+        from requests import RequestException
+
+        session = get_http_session("exchange_rate")
+        try:
+            response = session.get(self.base_url.format(date=rate_date), timeout=self.timeout)
+            if response.status_code != 200:
+                return None
+            usd_rates = response.json().get("usd", {})
+        except (RequestException, ValueError) as e:
+            # A failed date is reported as missing instead of aborting the backfill
+            print(f"Failed to fetch the exchange rates of {rate_date}: {e}")
+            return None
+
+        rates = {currency.upper(): rate for currency, rate in usd_rates.items()}
+
+        return map_exchange_api_response(rates, self.base_currency, self.selected_currencies)
+
+
+@dataclass
+class BackfillResult:
+    written: int = 0
+    skipped_dates: List[str] = field(default_factory=list)
+    missing_dates: List[str] = field(default_factory=list)
+
+
+class ExchangeRateBackfill:
+    def __init__(
+        self,
+        repository,
+        source: HistoricalRateSource,
+        max_workers: int = 1,
+        skip_existing: bool = True,
+    ) -> None:
+        """
+        Loads historical exchange rates into the repository.
+
+        Args:
+            repository (ExchangeRateRepository): The repository to write to.
+            source (HistoricalRateSource): Where the historical rates come from.
+            max_workers (int): The number of concurrent source fetches and write chunks.
+            skip_existing (bool): Whether dates already stored are left untouched.
+        """
+        self.repository = repository
+        self.source = source
+        self.max_workers = max_workers
+        self.skip_existing = skip_existing
+
+    def _fetch_rates(self, rate_date: str) -> Optional[dict]:
+        try:
+            return self.source.fetch_rates(rate_date)
+        except Exception as e:
+            print(f"Failed to fetch the exchange rates of {rate_date}: {e}")
+            return None
+
+    def run(self, start_date: str, end_date: str) -> BackfillResult:
+        """
+        Backfills every date between start_date and end_date, both included.
+
+        Dates the source cannot fetch, including on network errors, are
+        reported as missing; the other dates are still written.
+
+        Args:
+            start_date (str): The first date in YYYY-MM-DD format.
+            end_date (str): The last date in YYYY-MM-DD format.
+
+        Returns:
+            BackfillResult: The number of entries written and the skipped or missing dates.
+        """
+        result = BackfillResult()
+        dates = date_range(start_date, end_date)
+
+        if self.skip_existing:
+            existing = self.repository.get_exchange_rates_by_dates(dates)
+            result.skipped_dates = [rate_date for rate_date in dates if rate_date in existing]
+            dates = [rate_date for rate_date in dates if rate_date not in existing]
+
+        if self.max_workers > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                fetched = list(executor.map(self._fetch_rates, dates))
+        else:
+            fetched = [self._fetch_rates(rate_date) for rate_date in dates]
+
+        entities = []
+        for rate_date, rates in zip(dates, fetched):
+            if rates:
+                entities.append(
+                    ExchangeRateEntity(
+                        date=rate_date, base_currency=self.source.base_currency, rates=rates
+                    )
+                )
+            else:
+                result.missing_dates.append(rate_date)
+
+        result.written = self.repository.post_exchange_rates(
+            entities, max_workers=self.max_workers
+        )
+
+        return result
@@ -1,30 +1,322 @@
-import requests
+import os
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Optional
+
+from src.libs.client_registry import get_http_session
+from src.libs.metrics import get_metrics, timed
+
+SELECTED_CURRENCIES = ["COP", "EUR", "MXN"]
+
+
+def get_selected_currencies():
+    """
+    Returns the currencies to store, from EXCHANGE_RATE_CURRENCIES.
+
+    The variable is a comma-separated list of codes, or "ALL" to keep every
+    currency the provider returns (None). When unset, packed storage keeps
+    every currency and map storage keeps SELECTED_CURRENCIES.
+    """
+    configured = os.getenv("EXCHANGE_RATE_CURRENCIES")
+    if configured is None:
+        if os.getenv("EXCHANGE_RATE_STORAGE_FORMAT") == "packed":
+            return None
+        return list(SELECTED_CURRENCIES)
+
+    if configured.strip().upper() == "ALL":
+        return None
+    return [currency.strip().upper() for currency in configured.split(",") if currency.strip()]
 
 
 def map_exchange_api_response(
-    rates: dict, base_currency: str, selected_currencies: list
+    rates: dict, base_currency: str, selected_currencies: list = None
 ) -> dict:
+    if selected_currencies is None:
+        selected_currencies = rates
+
     return {
         f"{currency}/{base_currency}": rates[currency]
         for currency in selected_currencies
-        if currency in rates
+        if currency in rates and currency != base_currency
     }
 
 
+@dataclass
+class RateSnapshot:
+    # Units of each currency per unit of the base currency, keyed by currency code
+    rates: dict
+    source: str
+    # When the provider publishes its next update (Unix seconds), if it says so
+    next_update_unix: Optional[int] = None
+
+    def is_fresh(self, now: float = None) -> bool:
+        if self.next_update_unix is None:
+            return False
+        return (now if now is not None else time.time()) < self.next_update_unix
+
+
+class RateProvider(ABC):
+    """
+    A source of the latest exchange rates.
+    """
+
+    name = None
+    default_url = None
+    url_variable = None
+    # The currency codes the provider publishes, or None when it covers them all
+    supported_currencies = None
+
+    def __init__(self, api_url: str = None) -> None:
+        if api_url is None and self.url_variable:
+            api_url = os.getenv(self.url_variable)
+        self.api_url = (api_url or self.default_url).rstrip("/")
+
+    @abstractmethod
+    def url(self, base_currency: str) -> str:
+        """
+        Returns the URL of the latest rates for a base currency.
+        """
+
+    @abstractmethod
+    def parse(self, payload: dict, base_currency: str) -> Optional[RateSnapshot]:
+        """
+        Reads the rates out of a response body, or returns None when the body
+        is not a successful answer.
+        """
+
+
+class OpenErApiProvider(RateProvider):
+    name = "open_er_api"
+    default_url = "https://open.er-api.com/v6/latest"
+    url_variable = "EXCHANGE_RATE_API_URL"
+
+    def url(self, base_currency: str) -> str:
+        return f"{self.api_url}/{base_currency}"
+
+    def parse(self, payload: dict, base_currency: str) -> Optional[RateSnapshot]:
+        if payload.get("result") != "success":
+            return None
+        return RateSnapshot(
+            rates=payload.get("rates") or {},
+            source=self.name,
+            next_update_unix=payload.get("time_next_update_unix"),
+        )
+
+
+class CurrencyApiProvider(RateProvider):
+    name = "currency_api"
+    default_url = "https://cdn.jsdelivr.net/npm/@fawazahmed0/currency-api@latest/v1/currencies"
+    url_variable = "CURRENCY_API_URL"
+
+    def url(self, base_currency: str) -> str:
+        return f"{self.api_url}/{base_currency.lower()}.json"
+
+    def parse(self, payload: dict, base_currency: str) -> Optional[RateSnapshot]:
+        rates = payload.get(base_currency.lower())
+        if not isinstance(rates, dict):
+            return None
+        return RateSnapshot(
+            rates={currency.upper(): rate for currency, rate in rates.items()},
+            source=self.name,
+        )
+
+
+class FrankfurterProvider(RateProvider):
+    name = "frankfurter"
+    default_url = "https://api.frankfurter.app/latest"
+    url_variable = "FRANKFURTER_API_URL"
+    # The ECB reference rates; COP, among others, is not published
+    supported_currencies = frozenset(
+        {
+            "AUD", "BGN", "BRL", "CAD", "CHF", "CNY", "CZK", "DKK", "EUR", "GBP", "HKD",
+            "HUF", "IDR", "ILS", "INR", "ISK", "JPY", "KRW", "MXN", "MYR", "NOK", "NZD",
+            "PHP", "PLN", "RON", "SEK", "SGD", "THB", "TRY", "USD", "ZAR",
+        }
+    )
+
+    def url(self, base_currency: str) -> str:
+        return f"{self.api_url}?from={base_currency}"
+
+    def parse(self, payload: dict, base_currency: str) -> Optional[RateSnapshot]:
+        if payload.get("base") != base_currency:
+            return None
+        return RateSnapshot(rates=payload.get("rates") or {}, source=self.name)
+
+
+RATE_PROVIDERS = {
+    provider.name: provider
+    for provider in (OpenErApiProvider, CurrencyApiProvider, FrankfurterProvider)
+}
+
+
+def get_rate_providers() -> list:
+    """
+    Returns the providers listed in EXCHANGE_RATE_PROVIDERS, in order of
+    preference (defaults to open_er_api then currency_api).
+    """
+    names = os.getenv("EXCHANGE_RATE_PROVIDERS", "open_er_api,currency_api")
+    providers = []
+    for name in names.split(","):
+        name = name.strip()
+        if not name:
+            continue
+        if name not in RATE_PROVIDERS:
+            raise Exception(f"Unknown exchange rate provider: {name}")
+        providers.append(RATE_PROVIDERS[name]())
+
+    return providers
+
+
 class ExchangeRate:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        providers: list = None,
+        connect_timeout: float = None,
+        read_timeout: float = None,
+        hedge_delay: float = None,
+        deadline: float = None,
+    ) -> None:
+        """
+        Fetches the latest exchange rates from a list of providers.
+
+        Requests are hedged: the first provider is asked right away, and the
+        next one is also asked if no valid answer arrived within `hedge_delay`
+        seconds or as soon as a request fails. The first valid answer wins,
+        and the whole fetch gives up after `deadline` seconds.
+
+        Args:
+            providers (list): The RateProvider instances in order of preference
+                (defaults to EXCHANGE_RATE_PROVIDERS).
+            connect_timeout (float): Seconds to establish a connection
+                (EXCHANGE_RATE_CONNECT_TIMEOUT, default 3.05).
+            read_timeout (float): Seconds to wait for response data
+                (EXCHANGE_RATE_READ_TIMEOUT, default 5).
+            hedge_delay (float): Seconds before the next provider is asked too
+                (EXCHANGE_RATE_HEDGE_DELAY, default 1).
+            deadline (float): Seconds the whole fetch may take
+                (EXCHANGE_RATE_FETCH_DEADLINE, default 10).
+        """
         self.base_currency = "USD"
-        self.selected_currencies = ["COP", "EUR", "MXN"]
-        self.base_url = f"https://open.er-api.com/v6/latest/{self.base_currency}"
+        self.selected_currencies = get_selected_currencies()
+        self.providers = providers if providers is not None else get_rate_providers()
+        self.connect_timeout = connect_timeout or float(os.getenv("EXCHANGE_RATE_CONNECT_TIMEOUT", "3.05"))
+        self.read_timeout = read_timeout or float(os.getenv("EXCHANGE_RATE_READ_TIMEOUT", "5"))
+        self.hedge_delay = hedge_delay if hedge_delay is not None else float(
+            os.getenv("EXCHANGE_RATE_HEDGE_DELAY", "1")
+        )
+        self.deadline = deadline or float(os.getenv("EXCHANGE_RATE_FETCH_DEADLINE", "10"))
+        # Reused by warm invocations until the provider's next update
+        self.last_snapshot = None
 
-    def fetch_data(self):
-        response = requests.get(self.base_url)
+    @cached_property
+    def session(self):
+        return get_http_session("exchange_rate")
+
+    def _is_valid(self, provider: RateProvider, snapshot: Optional[RateSnapshot]) -> bool:
+        if snapshot is None or not snapshot.rates:
+            return False
+
+        # Currencies the provider never publishes cannot be required from it
+        currencies = self.selected_currencies or snapshot.rates
+        if provider.supported_currencies is not None:
+            currencies = [
+                currency for currency in currencies if currency in provider.supported_currencies
+            ]
+        return all(
+            isinstance(snapshot.rates.get(currency), (int, float)) and snapshot.rates[currency] > 0
+            for currency in currencies
+            if currency != self.base_currency
+        )
+
+    def _fetch_from(self, provider: RateProvider) -> RateSnapshot:
+        start = time.perf_counter()
+        response = self.session.get(
+            provider.url(self.base_currency),
+            timeout=(self.connect_timeout, self.read_timeout),
+        )
+        get_metrics().record_http(
+            f"rates.{provider.name}", response.status_code, time.perf_counter() - start
+        )
+
+        if response.status_code != 200:
+            raise Exception(f"{provider.name} returned status {response.status_code}")
 
-        if response.status_code == 200:
-            data = response.json()
+        snapshot = provider.parse(response.json(), self.base_currency)
+        if not self._is_valid(provider, snapshot):
+            raise Exception(f"{provider.name} returned no usable rates")
 
-            return map_exchange_api_response(
-                data["rates"], self.base_currency, self.selected_currencies
-            )
-        else:
-            raise Exception("Fialed to fetch rates")
+        return snapshot
+
+    @timed("rates.fetch_snapshot")
+    def fetch_snapshot(self) -> RateSnapshot:
+        """
+        Returns the latest rates, without any request while the previously
+        fetched snapshot is within its provider's validity window.
+
+        Returns:
+            RateSnapshot: The first valid answer among the providers.
+        """
+        if self.last_snapshot is not None and self.last_snapshot.is_fresh():
+            get_metrics().increment("rates.fetch_skipped")
+            return self.last_snapshot
+
+        if not self.providers:
+            raise Exception("No exchange rate providers configured")
+
+        errors = []
+        pending = {}
+        next_provider = 0
+        deadline = time.monotonic() + self.deadline
+        next_launch_at = 0.0
+
+        executor = ThreadPoolExecutor(max_workers=len(self.providers))
+        try:
+            while pending or next_provider < len(self.providers):
+                now = time.monotonic()
+                if now >= deadline:
+                    errors.append(f"no answer within {self.deadline} s")
+                    break
+
+                # Ask the next provider when nothing is in flight or the hedge delay passed
+                if next_provider < len(self.providers) and (not pending or now >= next_launch_at):
+                    provider = self.providers[next_provider]
+                    pending[executor.submit(self._fetch_from, provider)] = provider
+                    next_provider += 1
+                    next_launch_at = now + self.hedge_delay
+                    continue
+
+                wait_until = deadline
+                if next_provider < len(self.providers):
+                    wait_until = min(deadline, next_launch_at)
+                done, _ = wait(pending, timeout=max(wait_until - now, 0), return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    provider = pending.pop(future)
+                    try:
+                        snapshot = future.result()
+                    except Exception as e:
+                        errors.append(str(e) if provider.name in str(e) else f"{provider.name}: {e}")
+                        # Fail over right away, even while other requests are in flight
+                        next_launch_at = now
+                        continue
+
+                    get_metrics().increment(f"rates.{provider.name}.wins")
+                    self.last_snapshot = snapshot
+                    return snapshot
+        finally:
+            # Slower hedged requests are abandoned; their timeouts bound them
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        raise Exception(f"Failed to fetch rates: {'; '.join(errors)}")
+
+    def select_rates(self, rates: dict) -> dict:
+        """
+        Keeps the configured currencies, keyed as "CUR/USD".
+        """
+        return map_exchange_api_response(rates, self.base_currency, self.selected_currencies)
+
+    def fetch_data(self):
+        return self.select_rates(self.fetch_snapshot().rates)
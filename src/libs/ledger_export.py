@@ -0,0 +1,366 @@
+import json
+import os
+from dataclasses import dataclass, field
+from typing import List
+
+import numpy as np
+
+from src.libs.metrics import timed
+from src.libs.notion_manager_provider import build_incremental_query
+from src.libs.notion_schema import NotionProperties
+from src.repository.exchange_rate_index import ExchangeRateIndex
+
+MANIFEST_NAME = "_manifest.json"
+# Hive's partition value for rows without a date
+UNDATED_MONTH = "__HIVE_DEFAULT_PARTITION__"
+USD_AMOUNT_COLUMN = "usd_amount"
+# Changed rows held in memory before their months are written out
+MAX_BUFFERED_ROWS = 5000
+
+
+class NpzPartitionFormat:
+    """
+    Stores a partition as uncompressed numpy arrays, one per column.
+
+    Needs nothing beyond numpy, so it works wherever the project runs.
+    """
+
+    name = "npz"
+    extension = ".npz"
+
+    def write(self, path: str, columns: dict) -> None:
+        with open(path, "wb") as file:
+            np.savez(file, **columns)
+
+    def read(self, path: str) -> dict:
+        with np.load(path, allow_pickle=False) as data:
+            return {name: data[name] for name in data.files}
+
+
+class ParquetPartitionFormat:
+    """
+    Stores a partition as a Parquet file, readable by pandas, DuckDB or Spark.
+
+    pyarrow is imported on first use; it is not needed by the Lambda functions.
+    """
+
+    name = "parquet"
+    extension = ".parquet"
+
+    @staticmethod
+    def _pyarrow():
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise Exception("The parquet export format requires pyarrow (pip install pyarrow)")
+        return pyarrow, pyarrow.parquet
+
+    def write(self, path: str, columns: dict) -> None:
+        pyarrow, parquet = self._pyarrow()
+        parquet.write_table(pyarrow.table(columns), path)
+
+    def read(self, path: str) -> dict:
+        _, parquet = self._pyarrow()
+        table = parquet.read_table(path)
+        return {
+            name: _column_array(table.column(name).to_pylist(), _is_number(table.column(name).type))
+            for name in table.column_names
+        }
+
+
+PARTITION_FORMATS = {
+    partition_format.name: partition_format
+    for partition_format in (NpzPartitionFormat(), ParquetPartitionFormat())
+}
+
+
+def get_partition_format(name: str = None):
+    """
+    Returns the partition format by name (LEDGER_EXPORT_FORMAT, default "npz").
+    """
+    name = name or os.getenv("LEDGER_EXPORT_FORMAT", "npz")
+    if name not in PARTITION_FORMATS:
+        raise Exception(f"Unknown ledger export format: {name}")
+    return PARTITION_FORMATS[name]
+
+
+def _is_number(arrow_type) -> bool:
+    return str(arrow_type) in ("double", "float", "int64")
+
+
+def _column_array(values: list, numeric: bool) -> np.ndarray:
+    if numeric:
+        return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+    return np.array(["" if value is None else str(value) for value in values], dtype=str)
+
+
+def _empty_column(numeric: bool, length: int) -> np.ndarray:
+    return np.full(length, np.nan) if numeric else np.full(length, "", dtype=str)
+
+
+def _write_atomically(path: str, write) -> None:
+    temporary_path = f"{path}.tmp"
+    write(temporary_path)
+    os.replace(temporary_path, path)
+
+
+@dataclass
+class LedgerExportReport:
+    name: str
+    pages: int = 0
+    # The month partitions rewritten by this run
+    months: List[str] = field(default_factory=list)
+    last_edited_time: str = None
+    # Pages dropped because a full export no longer returned them
+    removed: int = 0
+
+
+class LedgerExporter:
+    def __init__(
+        self,
+        notion_manager,
+        output_dir: str,
+        partition_format: str = None,
+        max_buffered_rows: int = MAX_BUFFERED_ROWS,
+    ) -> None:
+        """
+        Exports converted ledgers to local columnar files, partitioned by month.
+
+        Each ledger lives in `<output_dir>/<ledger>/month=YYYY-MM/part<ext>`,
+        with a manifest holding the export checkpoint and each page's month.
+        Re-runs only query pages edited since the checkpoint and rewrite the
+        months those pages are in or moved out of.
+
+        Changed rows are buffered per month and written out whenever more than
+        `max_buffered_rows` are held, so memory stays bounded however many
+        pages changed; a month may then be rewritten more than once per run.
+
+        Args:
+            notion_manager (NotionManager): The manager used to query pages and rates.
+            output_dir (str): The directory receiving the ledgers.
+            partition_format (str): "npz" or "parquet" (see LEDGER_EXPORT_FORMAT).
+            max_buffered_rows (int): The changed rows held before writing them out.
+        """
+        self.notion_manager = notion_manager
+        self.output_dir = output_dir
+        self.partition_format = get_partition_format(partition_format)
+        self.max_buffered_rows = max_buffered_rows
+
+    def _read_manifest(self, ledger_dir: str) -> dict:
+        path = os.path.join(ledger_dir, MANIFEST_NAME)
+        if not os.path.exists(path):
+            return {"format": self.partition_format.name, "last_edited_time": None, "months": {}}
+
+        with open(path, "r", encoding="utf-8") as file:
+            manifest = json.load(file)
+        if manifest.get("format") != self.partition_format.name:
+            raise Exception(
+                f"{ledger_dir} was exported as {manifest.get('format')}, not {self.partition_format.name}"
+            )
+        return manifest
+
+    def _write_manifest(self, ledger_dir: str, manifest: dict) -> None:
+        def write(path):
+            with open(path, "w", encoding="utf-8") as file:
+                json.dump(manifest, file)
+
+        _write_atomically(os.path.join(ledger_dir, MANIFEST_NAME), write)
+
+    def _write_partition(
+        self, ledger_dir: str, month: str, rows: dict, removed_ids: set, numeric_columns: dict
+    ) -> None:
+        # Rows of changed pages replace their earlier version; pages that moved
+        # to another month are dropped from this one
+        partition_dir = os.path.join(ledger_dir, f"month={month}")
+        path = os.path.join(partition_dir, f"part{self.partition_format.extension}")
+        existing = self.partition_format.read(path) if os.path.exists(path) else {}
+
+        if existing:
+            keep = ~np.isin(existing["id"], list(set(rows) | removed_ids))
+            kept_rows = int(keep.sum())
+        else:
+            keep, kept_rows = None, 0
+
+        columns = {}
+        for name, numeric in numeric_columns.items():
+            old = existing[name][keep] if name in existing else _empty_column(numeric, kept_rows)
+            new = _column_array([row.get(name) for row in rows.values()], numeric)
+            columns[name] = np.concatenate([old, new])
+
+        if len(columns["id"]) == 0:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+
+        os.makedirs(partition_dir, exist_ok=True)
+        _write_atomically(path, lambda temporary_path: self.partition_format.write(temporary_path, columns))
+
+    def _flush(
+        self, ledger_dir: str, rows_by_month: dict, removed_by_month: dict, numeric_columns: dict, report
+    ) -> None:
+        for month in sorted(set(rows_by_month) | set(removed_by_month)):
+            self._write_partition(
+                ledger_dir,
+                month,
+                rows_by_month.get(month, {}),
+                removed_by_month.get(month, set()),
+                numeric_columns,
+            )
+            if month not in report.months:
+                report.months.append(month)
+
+        rows_by_month.clear()
+        removed_by_month.clear()
+
+    @timed("ledger_export.export")
+    def export(self, job, filter_body: dict = None, full: bool = False) -> LedgerExportReport:
+        """
+        Exports the pages of one ledger edited since its last export.
+
+        Notion does not return archived or deleted pages, so an incremental run
+        cannot see them and leaves their rows in place. A full export queries
+        every page and drops the exported pages it no longer returns.
+
+        Args:
+            job (SyncJob): The ledger; every property it reads becomes a column.
+            filter_body (dict): Optional filter for the pages to export (all by default).
+                A full export drops the pages this filter excludes.
+            full (bool): Whether to ignore the checkpoint and drop removed pages.
+
+        Returns:
+            LedgerExportReport: The pages read and removed, and the months rewritten.
+        """
+        ledger_dir = os.path.join(self.output_dir, job.name)
+        os.makedirs(ledger_dir, exist_ok=True)
+        manifest = self._read_manifest(ledger_dir)
+        report = LedgerExportReport(name=job.name, last_edited_time=manifest["last_edited_time"])
+
+        properties = {
+            **job.properties,
+            "id": NotionProperties.ID,
+            "last_edited_time": NotionProperties.LAST_EDITED_TIME,
+        }
+        numeric_columns = {
+            name: property_type == NotionProperties.NUMBER
+            for name, property_type in properties.items()
+        }
+        numeric_columns[USD_AMOUNT_COLUMN] = True
+        query = build_incremental_query(
+            filter_body or {}, None if full else manifest["last_edited_time"]
+        )
+        rate_index = ExchangeRateIndex(
+            max_staleness_days=self.notion_manager.max_rate_staleness_days
+        )
+
+        page_months = manifest["months"]
+        rows_by_month = {}
+        removed_by_month = {}
+        buffered_rows = 0
+        seen_page_ids = set()
+        for pages in self.notion_manager.iter_data(job.database_id, properties, query):
+            report.pages += len(pages)
+            self.notion_manager.prefetch_exchange_rates(pages, rate_index)
+            convertible_pages, conversion = self.notion_manager.convert_pages(pages, rate_index)
+            usd_amounts = {
+                page["id"]: value if resolved else None
+                for page, value, resolved in zip(
+                    convertible_pages, conversion.values.tolist(), conversion.resolved.tolist()
+                )
+            }
+
+            for page in pages:
+                page_id = page["id"]
+                seen_page_ids.add(page_id)
+                month = page.get("Date")[:7] if page.get("Date") else UNDATED_MONTH
+                previous_month = page_months.get(page_id)
+                if previous_month is not None and previous_month != month:
+                    removed_by_month.setdefault(previous_month, set()).add(page_id)
+                page_months[page_id] = month
+
+                row = {name: page.get(name) for name in properties}
+                row[USD_AMOUNT_COLUMN] = usd_amounts.get(page_id)
+                rows_by_month.setdefault(month, {})[page_id] = row
+                buffered_rows += 1
+                report.last_edited_time = page.get("last_edited_time") or report.last_edited_time
+
+            if buffered_rows >= self.max_buffered_rows:
+                self._flush(ledger_dir, rows_by_month, removed_by_month, numeric_columns, report)
+                buffered_rows = 0
+
+        if full:
+            for page_id in set(page_months) - seen_page_ids:
+                removed_by_month.setdefault(page_months.pop(page_id), set()).add(page_id)
+                report.removed += 1
+
+        self._flush(ledger_dir, rows_by_month, removed_by_month, numeric_columns, report)
+        report.months.sort()
+
+        # Written last, so an interrupted run re-exports the same pages
+        manifest["last_edited_time"] = report.last_edited_time
+        self._write_manifest(ledger_dir, manifest)
+
+        return report
+
+
+def read_ledger(output_dir: str, ledger: str, months: list = None) -> dict:
+    """
+    Loads an exported ledger into numpy columns, with its partitions' "month".
+
+    Args:
+        output_dir (str): The export directory.
+        ledger (str): The ledger (job) name.
+        months (list): Optional months to load (YYYY-MM); all by default.
+
+    Returns:
+        dict: One array per column.
+    """
+    ledger_dir = os.path.join(output_dir, ledger)
+    with open(os.path.join(ledger_dir, MANIFEST_NAME), "r", encoding="utf-8") as file:
+        partition_format = get_partition_format(json.load(file)["format"])
+
+    partitions = []
+    for entry in sorted(os.listdir(ledger_dir)):
+        month = entry.partition("=")[2]
+        if not entry.startswith("month=") or (months is not None and month not in months):
+            continue
+        columns = partition_format.read(
+            os.path.join(ledger_dir, entry, f"part{partition_format.extension}")
+        )
+        columns["month"] = np.full(len(columns["id"]), month)
+        partitions.append(columns)
+
+    if not partitions:
+        return {}
+
+    names = set.intersection(*(set(columns) for columns in partitions))
+    return {name: np.concatenate([columns[name] for columns in partitions]) for name in sorted(names)}
+
+
+def aggregate(columns: dict, by: str, value: str = USD_AMOUNT_COLUMN) -> dict:
+    """
+    Sums a numeric column per group, e.g. monthly or per-category totals.
+
+    Rows without a value (unconverted amounts) are left out of the sums.
+
+    Args:
+        columns (dict): The columns returned by read_ledger.
+        by (str): The column to group by (e.g. "month" or "Category").
+        value (str): The numeric column to sum.
+
+    Returns:
+        dict: The {"total", "count"} of each group.
+    """
+    if not columns:
+        return {}
+
+    values = columns[value]
+    present = ~np.isnan(values)
+    groups, positions = np.unique(columns[by][present], return_inverse=True)
+    totals = np.bincount(positions, weights=values[present], minlength=len(groups))
+    counts = np.bincount(positions, minlength=len(groups))
+
+    return {
+        str(group): {"total": float(total), "count": int(count)}
+        for group, total, count in zip(groups, totals, counts)
+    }
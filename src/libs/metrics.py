@@ -0,0 +1,350 @@
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# Most values a histogram keeps before folding them into log-scale buckets.
+# It is also the per-metric limit of values in a CloudWatch EMF record.
+HISTOGRAM_MAX_VALUES = 100
+# Bucket resolution once folded: 10 buckets per power of ten (~26% wide)
+HISTOGRAM_BUCKETS_PER_DECADE = 10
+EMF_MAX_METRICS = 100
+
+DYNAMODB_CAPACITY_OPERATIONS = {
+    "GetItem",
+    "PutItem",
+    "UpdateItem",
+    "DeleteItem",
+    "BatchGetItem",
+    "BatchWriteItem",
+    "Query",
+    "Scan",
+    "TransactGetItems",
+    "TransactWriteItems",
+}
+
+
+def metrics_enabled() -> bool:
+    """
+    Returns whether METRICS_MODE asks for metrics ("emf"); anything else is a no-op.
+    """
+    return os.getenv("METRICS_MODE", "off").lower() == "emf"
+
+
+class Histogram:
+    def __init__(self, unit: str) -> None:
+        self.unit = unit
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.values = []
+        self.buckets = None
+
+    @staticmethod
+    def _bucket(value: float) -> float:
+        if value <= 0:
+            return 0.0
+        exponent = round(math.log10(value) * HISTOGRAM_BUCKETS_PER_DECADE)
+        return round(10 ** (exponent / HISTOGRAM_BUCKETS_PER_DECADE), 6)
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+        if self.buckets is None:
+            self.values.append(value)
+            if len(self.values) <= HISTOGRAM_MAX_VALUES:
+                return
+
+            self.buckets = {}
+            pending, self.values = self.values, []
+        else:
+            pending = [value]
+
+        for pending_value in pending:
+            bucket = self._bucket(pending_value)
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def emf_values(self):
+        """
+        Returns the raw values, or once more than HISTOGRAM_MAX_VALUES were
+        recorded, the EMF Values/Counts form: one representative value per
+        bucket with the number of values it holds, plus the exact statistics.
+        """
+        if self.buckets is None:
+            return [round(value, 3) for value in self.values]
+
+        buckets = sorted(self.buckets.items())
+        # More buckets than EMF accepts (values spanning over ten decades):
+        # adjacent buckets are merged into the lower one
+        while len(buckets) > HISTOGRAM_MAX_VALUES:
+            buckets = [
+                (buckets[start][0], sum(count for _, count in buckets[start : start + 2]))
+                for start in range(0, len(buckets), 2)
+            ]
+
+        return {
+            "Values": [bucket for bucket, _ in buckets],
+            "Counts": [count for _, count in buckets],
+            "Max": round(self.max, 3),
+            "Min": round(self.min, 3),
+            "Count": self.count,
+            "Sum": round(self.sum, 3),
+        }
+
+    def summary(self) -> dict:
+        summary = {
+            "count": self.count,
+            "sum": round(self.sum, 3),
+            "min": round(self.min, 3),
+            "max": round(self.max, 3),
+        }
+        if self.buckets is not None:
+            summary["buckets"] = {str(bucket): count for bucket, count in sorted(self.buckets.items())}
+        return summary
+
+
+class NullMetrics:
+    """
+    The no-op recorder used when metrics are disabled. Instrumented code
+    checks `enabled` first, so nothing is measured or allocated.
+    """
+
+    enabled = False
+
+    def increment(self, name: str, value: float = 1, unit: str = "Count") -> None:
+        pass
+
+    def observe(self, name: str, value: float, unit: str = "Milliseconds") -> None:
+        pass
+
+    @contextmanager
+    def timer(self, name: str):
+        yield
+
+    def record_http(self, name: str, status_code, seconds: float) -> None:
+        pass
+
+    def record_consumed_capacity(self, operation: str, consumed_capacity) -> None:
+        pass
+
+
+NULL_METRICS = NullMetrics()
+
+
+class MetricsRecorder(NullMetrics):
+    enabled = True
+
+    def __init__(self, namespace: str, dimensions: dict = None) -> None:
+        """
+        Collects the counters and histograms of one invocation and renders
+        them as a single CloudWatch Embedded Metric Format record.
+
+        Args:
+            namespace (str): The CloudWatch namespace of the metrics.
+            dimensions (dict): The dimensions shared by every metric (e.g. the function name).
+        """
+        self.namespace = namespace
+        self.dimensions = dimensions or {}
+        self.counters = {}
+        self.histograms = {}
+        self.units = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: float = 1, unit: str = "Count") -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+            self.units[name] = unit
+
+    def observe(self, name: str, value: float, unit: str = "Milliseconds") -> None:
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram(unit)
+                self.units[name] = unit
+            histogram.add(value)
+
+    @contextmanager
+    def timer(self, name: str):
+        """
+        Times the enclosed block into the `<name>.duration` histogram and
+        counts calls and errors.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.increment(f"{name}.errors")
+            raise
+        finally:
+            self.observe(f"{name}.duration", (time.perf_counter() - start) * 1000)
+            self.increment(f"{name}.calls")
+
+    def record_http(self, name: str, status_code, seconds: float) -> None:
+        """
+        Records the latency and status code of one HTTP request. Requests that
+        failed without a response are counted as status "error".
+        """
+        self.observe(f"{name}.latency", seconds * 1000)
+        self.increment(f"{name}.status_{status_code or 'error'}")
+
+    def record_consumed_capacity(self, operation: str, consumed_capacity) -> None:
+        """
+        Adds the ConsumedCapacity of a DynamoDB response (one entry, or a list
+        for batch operations) to the `dynamodb.<operation>.capacity_units` counter.
+        """
+        if not consumed_capacity:
+            return
+        if isinstance(consumed_capacity, dict):
+            consumed_capacity = [consumed_capacity]
+
+        units = sum(float(entry.get("CapacityUnits") or 0) for entry in consumed_capacity)
+        self.increment(f"dynamodb.{operation}.capacity_units", units, unit="None")
+
+    def to_emf(self, timestamp: float = None) -> dict:
+        """
+        Renders the collected metrics as a CloudWatch EMF record.
+        """
+        with self._lock:
+            values = dict(self.counters)
+            values.update({name: histogram.emf_values() for name, histogram in self.histograms.items()})
+            summaries = {name: histogram.summary() for name, histogram in self.histograms.items()}
+            units = dict(self.units)
+        names = sorted(values)
+
+        record = {
+            "_aws": {
+                "Timestamp": int((timestamp or time.time()) * 1000),
+                # EMF allows at most 100 metrics per directive
+                "CloudWatchMetrics": [
+                    {
+                        "Namespace": self.namespace,
+                        "Dimensions": [sorted(self.dimensions)],
+                        "Metrics": [{"Name": name, "Unit": units[name]} for name in names[start : start + EMF_MAX_METRICS]],
+                    }
+                    for start in range(0, len(names), EMF_MAX_METRICS)
+                ],
+            },
+            **self.dimensions,
+            **values,
+        }
+        if summaries:
+            record["Histograms"] = summaries
+
+        return record
+
+
+_current = NULL_METRICS
+
+
+def get_metrics():
+    """
+    Returns the recorder of the running invocation, or the no-op recorder.
+    """
+    return _current
+
+
+@contextmanager
+def metrics_scope(function_name: str, namespace: str = None):
+    """
+    Collects metrics for the enclosed block and prints them as one EMF record.
+
+    Lambda runs one invocation at a time per container, so the recorder is
+    process-wide and also reaches worker threads. When METRICS_MODE is not
+    "emf" the block runs with the no-op recorder.
+
+    Args:
+        function_name (str): The value of the "Function" dimension.
+        namespace (str): The CloudWatch namespace (defaults to METRICS_NAMESPACE).
+    """
+    global _current
+
+    if not metrics_enabled():
+        yield NULL_METRICS
+        return
+
+    recorder = MetricsRecorder(
+        namespace or os.getenv("METRICS_NAMESPACE", "ExpenseTracker"),
+        {"Function": function_name},
+    )
+    _current = recorder
+    try:
+        with recorder.timer("invocation"):
+            yield recorder
+    finally:
+        _current = NULL_METRICS
+        print(json.dumps(recorder.to_emf()))
+
+
+def emit_metrics(function_name: str):
+    """
+    Decorates a handler so each invocation emits one EMF metrics record.
+    """
+
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(event, context):
+            with metrics_scope(function_name):
+                return handler(event, context)
+
+        return wrapper
+
+    return decorator
+
+
+def timed(name: str):
+    """
+    Decorates a function so its calls, errors and duration are recorded
+    under `name`. Costs one attribute check when metrics are disabled.
+    """
+
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            metrics = _current
+            if not metrics.enabled:
+                return function(*args, **kwargs)
+            with metrics.timer(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _request_consumed_capacity(params, model, **kwargs) -> None:
+    if _current.enabled and model.name in DYNAMODB_CAPACITY_OPERATIONS:
+        params.setdefault("ReturnConsumedCapacity", "TOTAL")
+
+
+def _start_request_timer(model, context, **kwargs) -> None:
+    if _current.enabled:
+        context["metrics_started_at"] = time.perf_counter()
+
+
+def _record_response(http_response, parsed, model, context, **kwargs) -> None:
+    started_at = context.get("metrics_started_at")
+    metrics = _current
+    if started_at is None or not metrics.enabled:
+        return
+
+    name = f"dynamodb.{model.name}"
+    metrics.record_http(name, getattr(http_response, "status_code", None), time.perf_counter() - started_at)
+    metrics.record_consumed_capacity(model.name, (parsed or {}).get("ConsumedCapacity"))
+
+
+def instrument_dynamodb_client(client) -> None:
+    """
+    Makes every call of a DynamoDB client ask for ReturnConsumedCapacity and
+    record its latency, status and consumed capacity while metrics are collected.
+    """
+    events = client.meta.events
+    events.register("before-parameter-build.dynamodb", _request_consumed_capacity)
+    events.register("before-call.dynamodb", _start_request_timer)
+    events.register("after-call.dynamodb", _record_response)
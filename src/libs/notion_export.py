@@ -0,0 +1,273 @@
+import csv
+import json
+import os
+import re
+from datetime import datetime
+from typing import Iterator, List
+
+from src.libs.notion_page_writer import PageUpdateResult
+from src.libs.notion_schema import NotionProperties, compile_property_extractor
+
+READ_CHUNK_SIZE = 1 << 16
+
+# Start of the page array in a saved database query response
+_RESULTS_ARRAY = re.compile(r'"results"\s*:\s*\[')
+_CSV_DATE_FORMATS = ("%Y-%m-%d", "%B %d, %Y", "%b %d, %Y", "%Y/%m/%d")
+_CSV_DATE_PREFIX = re.compile(r"^\s*([A-Za-z]+ \d{1,2}, \d{4}|\d{4}[-/]\d{2}[-/]\d{2})")
+# A number as Notion exports it: an optional sign and currency symbol or code,
+# then digits with optional "," thousands groups and a "." decimal part
+_CSV_NUMBER = re.compile(
+    r"^(?P<sign>-?)(?P<prefix>[^\d\s.,%-]*)\s?(?P<inner_sign>-?)"
+    r"(?P<number>\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?|\.\d+)"
+    r"\s?(?P<suffix>[^\d\s.,%-]*)$"
+)
+
+
+def iter_json_array(file, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[dict]:
+    """
+    Streams the pages of a JSON export without loading the whole file.
+
+    The file is either a list of pages or a saved query response with a
+    "results" list. Only the page being decoded is held in memory.
+
+    Args:
+        file: A text file object.
+        chunk_size (int): The number of characters read at a time.
+
+    Yields:
+        dict: Each page object.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = None
+    end_of_file = False
+
+    # Locate the opening bracket of the page array
+    while position is None:
+        chunk = file.read(chunk_size)
+        end_of_file = not chunk
+        buffer += chunk
+
+        stripped = buffer.lstrip()
+        if stripped.startswith("["):
+            position = len(buffer) - len(stripped) + 1
+        elif stripped.startswith("{"):
+            match = _RESULTS_ARRAY.search(buffer)
+            if match:
+                position = match.end()
+        elif stripped:
+            raise ValueError("Expected a JSON list of pages or a query response")
+
+        if position is None and end_of_file:
+            return
+
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+
+        if position < len(buffer) and buffer[position] == "]":
+            return
+
+        if position < len(buffer):
+            try:
+                page, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if end_of_file:
+                    raise
+            else:
+                yield page
+                position = end
+                continue
+        elif end_of_file:
+            raise ValueError("Unterminated page array")
+
+        # The next page is incomplete: read more of the file
+        chunk = file.read(chunk_size)
+        end_of_file = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def iter_jsonl(file) -> Iterator[dict]:
+    """
+    Streams the pages of a JSON lines export, one page per line.
+    """
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def parse_csv_number(value: str):
+    """
+    Returns the number in a Notion CSV number cell, or None for empty cells.
+
+    Notion formats numbers on export (e.g. "$1,234.50", "-€10.00"). Cells that
+    do not read unambiguously as such a number, like "1.234,56", "1,23" or
+    "12%", are rejected rather than guessed.
+    """
+    value = (value or "").strip()
+    if not value:
+        return None
+
+    match = _CSV_NUMBER.match(value)
+    if not match or (match.group("sign") and match.group("inner_sign")):
+        raise Exception(f"Unrecognised number in CSV export: {value!r}")
+
+    number = float(match.group("number").replace(",", ""))
+    return -number if match.group("sign") or match.group("inner_sign") else number
+
+
+def parse_csv_date(value: str):
+    """
+    Returns the start date of a Notion CSV date cell in YYYY-MM-DD format.
+
+    Cells look like "November 10, 2024", optionally with a time or an end
+    date ("November 10, 2024 → November 12, 2024").
+    """
+    match = _CSV_DATE_PREFIX.match(value or "")
+    if not match:
+        return None
+
+    for date_format in _CSV_DATE_FORMATS:
+        try:
+            return datetime.strptime(match.group(1), date_format).date().isoformat()
+        except ValueError:
+            continue
+
+    return None
+
+
+_CSV_PARSERS = {
+    NotionProperties.ID: lambda value: value or None,
+    NotionProperties.NUMBER: parse_csv_number,
+    NotionProperties.SELECT: lambda value: value or None,
+    NotionProperties.DATE: parse_csv_date,
+    NotionProperties.LAST_EDITED_TIME: lambda value: value or None,
+}
+
+
+def iter_csv_records(file, properties: dict, errors: list = None) -> Iterator[dict]:
+    """
+    Streams the rows of a Notion CSV export as property dictionaries.
+
+    Columns are matched by property name. Notion CSV exports carry no page
+    IDs, so those rows can only be written to a file unless the export has a
+    column for the ID property.
+
+    Args:
+        file: A text file object.
+        properties (dict): The properties to retrieve, with their types.
+        errors (list): When given, rows with a cell that cannot be parsed are
+            skipped and a failed PageUpdateResult is appended here for each;
+            otherwise the first such row raises.
+    """
+    parsers = [(name, _CSV_PARSERS[property_type]) for name, property_type in properties.items()]
+    id_columns = [name for name, property_type in properties.items() if property_type == NotionProperties.ID]
+    reader = csv.DictReader(file)
+
+    for row in reader:
+        try:
+            yield {name: parse(row.get(name)) for name, parse in parsers}
+        except Exception as e:
+            if errors is None:
+                raise
+            page_id = next((row.get(name) for name in id_columns if row.get(name)), None)
+            location = f"{getattr(file, 'name', 'csv')} line {reader.line_num}"
+            errors.append(PageUpdateResult(page_id or location, False, error=f"{location}: {e}"))
+
+
+def _export_files(path: str) -> List[str]:
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(path, name)
+            for name in os.listdir(path)
+            if name.endswith((".json", ".jsonl", ".csv"))
+        )
+    return [path]
+
+
+def iter_export_records(
+    path: str, properties: dict, batch_size: int = 1000, errors: list = None
+) -> Iterator[list]:
+    """
+    Streams a Notion export in batches of property dictionaries.
+
+    Args:
+        path (str): A .json, .jsonl or .csv export, or a directory of them
+            (read in name order, e.g. one saved query response per file).
+        properties (dict): The properties to retrieve, with their types.
+        batch_size (int): The number of records per batch.
+        errors (list): Optional list collecting the CSV rows that could not be
+            parsed (see iter_csv_records).
+
+    Yields:
+        list: The mapped records of each batch.
+    """
+    extract = compile_property_extractor(properties)
+
+    for file_path in _export_files(path):
+        with open(file_path, newline="" if file_path.endswith(".csv") else None, encoding="utf-8") as file:
+            if file_path.endswith(".csv"):
+                records = iter_csv_records(file, properties, errors)
+            elif file_path.endswith(".jsonl"):
+                records = map(extract, iter_jsonl(file))
+            else:
+                records = map(extract, iter_json_array(file))
+
+            batch = []
+            for record in records:
+                batch.append(record)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+
+class NotionPageSink:
+    def __init__(self, page_writer) -> None:
+        """
+        Writes updates back to Notion.
+
+        Args:
+            page_writer (NotionPageWriter): The rate-limited writer to use.
+        """
+        self.page_writer = page_writer
+
+    def write(self, updates: list) -> List[PageUpdateResult]:
+        results = [
+            PageUpdateResult(None, False, error="Row has no page id")
+            for page_id, _ in updates
+            if not page_id
+        ]
+        results.extend(
+            self.page_writer.update_pages([update for update in updates if update[0]])
+        )
+        return results
+
+    def close(self) -> None:
+        pass
+
+
+class FileSink:
+    def __init__(self, path: str) -> None:
+        """
+        Writes updates to a JSON lines file instead of Notion, one
+        `{"id": ..., "properties": {...}}` object per page, in the shape of
+        the page update request body.
+
+        Args:
+            path (str): The output file, replaced if it exists.
+        """
+        self.path = path
+        self._file = open(path, "w", encoding="utf-8")
+
+    def write(self, updates: list) -> List[PageUpdateResult]:
+        self._file.writelines(
+            json.dumps({"id": page_id, "properties": properties}) + "\n"
+            for page_id, properties in updates
+        )
+        return [PageUpdateResult(page_id, True) for page_id, _ in updates]
+
+    def close(self) -> None:
+        self._file.close()
@@ -1,20 +1,32 @@
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from datetime import date as date_type
+from datetime import datetime, timedelta
 import json
 import os
-import requests
-from enum import Enum
+import threading
+import time
+from functools import cached_property, lru_cache
 
+from src.libs.client_registry import get_http_session
+from src.libs.cross_rate_engine import CrossRateEngine
+from src.libs.currency_converter import convert_to_usd, is_usd
 from src.libs.exchange_rate_provider import ExchangeRate
+from src.libs.metrics import get_metrics, timed
+from src.libs.notion_export import NotionPageSink, iter_export_records
+from src.libs.notion_page_writer import NotionPageWriter, PageUpdateResult
+from src.libs.notion_schema import (
+    PAGE_FIELD_TYPES,
+    NotionProperties,
+    compile_property_extractor,
+)
+from src.libs.time_budget import TimeBudget
+from src.repository.exchange_rate_cache import build_exchange_rate_repository
+from src.repository.exchange_rate_index import ExchangeRateIndex
 from src.repository.exchange_rate_repository import ExchangeRateRepository
 
 
-class NotionProperties(Enum):
-    ID = "id"
-    NUMBER = "number"
-    SELECT = "select"
-    DATE = "date"
-
-
 def map_properties_from_notion_response(response: dict, properties: dict) -> list:
     """
     Extracts specified properties from Notion response with support for multiple types.
@@ -26,28 +38,156 @@ def map_properties_from_notion_response(response: dict, properties: dict) -> lis
     Returns:
         list: A list of dictionaries with the specified properties and their values.
     """
-    results = []
-    for page in response.get("results", []):
-        entry = {}
-        for property_name, property_type in properties.items():
-            # Access the specified property within properties based on type
-            property_data = page["properties"].get(property_name, {})
+    if not properties:
+        return []
+
+    extract = compile_property_extractor(properties)
+
+    return [extract(page) for page in response.get("results", [])]
+
+
+def build_incremental_query(filter_body: dict, last_edited_time: str = None) -> dict:
+    """
+    Restricts a database query to pages edited since a checkpoint.
+
+    Notion rounds `last_edited_time` to the minute, so the checkpoint itself is
+    included (`on_or_after`) to avoid missing pages edited in the same minute.
+    Results are sorted by `last_edited_time` so the checkpoint can advance
+    batch by batch.
+
+    Args:
+        filter_body (dict): The original query body.
+        last_edited_time (str): The checkpoint as an ISO 8601 timestamp, if any.
+
+    Returns:
+        dict: The query body to send.
+    """
+    query_body = dict(filter_body or {})
+
+    if last_edited_time:
+        timestamp_filter = {
+            "timestamp": "last_edited_time",
+            "last_edited_time": {"on_or_after": last_edited_time},
+        }
+        if query_body.get("filter"):
+            query_body["filter"] = {"and": [query_body["filter"], timestamp_filter]}
+        else:
+            query_body["filter"] = timestamp_filter
+
+    query_body["sorts"] = [{"timestamp": "last_edited_time", "direction": "ascending"}]
+
+    return query_body
+
+
+def normalize_notion_id(notion_id: str) -> str:
+    """
+    Returns a Notion ID without dashes, as IDs are accepted in both forms.
+    """
+    return (notion_id or "").replace("-", "").lower()
+
+
+def with_written_fields(properties: dict, update_field: str, target_fields: dict = None) -> dict:
+    """
+    Adds the number fields a conversion writes to the properties to read,
+    so their stored values can be compared with the computed ones.
+    """
+    return {
+        **properties,
+        **{
+            field_name: NotionProperties.NUMBER
+            for field_name in (update_field, *(target_fields or {}))
+        },
+    }
+
+
+def drifted_fields(page, update_properties: dict, tolerance: float) -> list:
+    """
+    Compares the stored values of a page with the values computed for it.
+
+    Args:
+        page: The mapped entry, including the written fields.
+        update_properties (dict): The computed properties, as built for a write.
+        tolerance (float): The largest absolute difference still considered equal.
+
+    Returns:
+        list: A (field, stored, expected) tuple per field that drifted. Empty
+            stored values always count as drifted.
+    """
+    drifted = []
+    for field_name, value in update_properties.items():
+        stored = page.get(field_name)
+        expected = value["number"]
+        if stored is None or abs(stored - expected) > tolerance:
+            drifted.append((field_name, stored, expected))
+
+    return drifted
+
+
+def fills_only_empty(filter_body: dict, update_field: str) -> bool:
+    """
+    Returns whether a job's filter only selects pages whose update field is
+    empty, e.g. the ledgers' "Amount is empty" filter, either on its own or
+    as one condition of an "and" filter.
+    """
+    query_filter = (filter_body or {}).get("filter") or {}
+    conditions = query_filter.get("and") or [query_filter]
+
+    return any(
+        condition.get("property") == update_field
+        and (condition.get("number") or {}).get("is_empty") is True
+        for condition in conditions
+    )
+
+
+def resume_key(database_id: str) -> str:
+    """
+    Returns the sync state key of a database's resume token.
+    """
+    return f"resume#{database_id}"
+
+
+@dataclass
+class ExportUpdateReport:
+    pages: int = 0
+    written: int = 0
+    failed: int = 0
+    # The first failures, capped so memory stays constant on large exports
+    failures: list = field(default_factory=list)
+
+
+EXPORT_MAX_REPORTED_FAILURES = 1000
+
+
+@dataclass
+class ReconciliationReport:
+    pages: int = 0
+    # Pages with an amount, currency and date whose amounts were recomputed
+    checked: int = 0
+    drifted: int = 0
+    written: int = 0
+    failed: int = 0
+    # The first differences and failures, capped like ExportUpdateReport.failures
+    diffs: list = field(default_factory=list)
+    failures: list = field(default_factory=list)
+
+
+RECONCILE_MAX_REPORTED_DIFFS = 1000
+
+# Stored amounts closer than this to the computed ones are not rewritten
+UNCHANGED_TOLERANCE = 1e-9
+
+NOTION_MAX_PAGE_SIZE = 100
 
-            if property_type == NotionProperties.ID:
-                entry[property_name] = page["id"]
-            elif property_type == NotionProperties.NUMBER:
-                entry[property_name] = property_data.get("number")
-            elif property_type == NotionProperties.SELECT:
-                # Extract the name from select
-                entry[property_name] = property_data.get("select", {}).get("name")
-            elif property_type == NotionProperties.DATE:
-                entry[property_name] = property_data.get("date", {}).get("start")
+# Property IDs of each database by (API URL, database ID), kept across warm invocations
+_database_property_ids = {}
 
-        # Only append entries with at least one property value
-        if entry:
-            results.append(entry)
 
-    return results
+@dataclass
+class QueryStats:
+    queries: int = 0
+    # Bytes read off the wire (compressed) and after decompression
+    bytes_received: int = 0
+    bytes_decoded: int = 0
 
 
 class NotionManager:
@@ -58,18 +198,126 @@ class NotionManager:
             "Content-Type": "application/json",
             "Notion-Version": "2022-06-28",
         }
-        self.page_url = "https://api.notion.com/v1/pages"
-        self.exchange_rate = ExchangeRate()
-        self.exchange_rate_repository = ExchangeRateRepository(
+        # Overridable to point the manager at a local stand-in (e.g. in benchmarks)
+        self.api_url = os.getenv("NOTION_API_URL", "https://api.notion.com/v1").rstrip("/")
+        self.page_url = f"{self.api_url}/pages"
+        self.query_stats = QueryStats()
+        self._query_stats_lock = threading.Lock()
+        # Days a conversion may fall back to when its date has no stored rate
+        self.max_rate_staleness_days = int(
+            os.getenv("EXCHANGE_RATE_MAX_STALENESS_DAYS", "3")
+        )
+
+    # Clients are created on first use so that importing and constructing the
+    # manager stays cheap during a Lambda cold start.
+    @cached_property
+    def session(self):
+        return get_http_session("notion", pool_maxsize=8)
+
+    @cached_property
+    def page_writer(self) -> NotionPageWriter:
+        return NotionPageWriter(self.headers, self.page_url, session=self.session)
+
+    @cached_property
+    def exchange_rate(self) -> ExchangeRate:
+        return ExchangeRate()
+
+    @cached_property
+    def exchange_rate_repository(self) -> ExchangeRateRepository:
+        # Reads go through the process-wide rate cache (see EXCHANGE_RATE_CACHE)
+        return build_exchange_rate_repository(
             os.getenv("EXCHANGE_RATE_TABLE_NAME", "ExchangeRate")
         )
 
+    @timed("rates.prefetch")
+    def prefetch_exchange_rates(
+        self,
+        pages: list,
+        rate_index: ExchangeRateIndex = None,
+        include_usd_pages: bool = False,
+    ) -> ExchangeRateIndex:
+        """
+        Loads the exchange rates for every distinct date in the given pages.
+
+        Exact dates are fetched with one batch read. If some dates have no
+        stored entry and stale fallbacks are allowed, the days each of them may
+        fall back to are fetched with a second batch read, so nearest-previous
+        lookups can be answered from memory. Both reads go through the
+        repository's rate cache, so warm invocations skip DynamoDB for dates
+        they already read.
+
+        Args:
+            pages (list): The mapped Notion entries to convert.
+            rate_index (ExchangeRateIndex): An existing index to extend. Dates
+                already loaded in it are not fetched again.
+            include_usd_pages (bool): Whether dates of USD pages are loaded too,
+                for conversions into currencies other than USD.
+
+        Returns:
+            ExchangeRateIndex: The index holding the rates for the pages.
+        """
+        if rate_index is None:
+            rate_index = ExchangeRateIndex(max_staleness_days=self.max_rate_staleness_days)
+
+        # Serialised so runs sharing the index fetch each date only once
+        with rate_index.fetch_lock:
+            if rate_index.fully_loaded:
+                return rate_index
+
+            dates = {
+                page.get("Date")
+                for page in pages
+                if page.get("Date")
+                and page.get("Currencies")
+                and (include_usd_pages or not is_usd(page.get("Currencies")))
+                and page.get("Date") not in rate_index.loaded_dates
+            }
+            if not dates:
+                return rate_index
+
+            items = self.exchange_rate_repository.get_exchange_rates_by_dates(dates)
+            rate_index.add_items(items.values())
+
+            missing_dates = dates - set(items)
+            rate_index.mark_missing(missing_dates)
+
+            if missing_dates and rate_index.max_staleness_days > 0:
+                fallback_dates = {
+                    (date_type.fromisoformat(missing_date) - timedelta(days=days)).isoformat()
+                    for missing_date in missing_dates
+                    for days in range(1, rate_index.max_staleness_days + 1)
+                } - rate_index.loaded_dates
+                if fallback_dates:
+                    items = self.exchange_rate_repository.get_exchange_rates_by_dates(fallback_dates)
+                    rate_index.add_items(items.values())
+                    rate_index.mark_missing(fallback_dates - set(items))
+
+            return rate_index
+
+    @timed("rates.calculate_usd_equivalent")
     def calculate_usd_equivalent(
-        self, amount: float, currency: str, date: str
+        self, amount: float, currency: str, date: str, rate_index: ExchangeRateIndex = None
     ) -> float:
-        rate = self.exchange_rate_repository.get_exchange_rate_by_currency(
-            date, currency
-        )
+        """
+        Converts an amount to USD using the rate stored for the given date.
+
+        Args:
+            amount (float): The amount in the local currency.
+            currency (str): The local currency code.
+            date (str): The date in YYYY-MM-DD format.
+            rate_index (ExchangeRateIndex): Optional prefetched rates. When given,
+                the repository is not queried and the rate of the nearest
+                previous date is used within the index's maximum staleness.
+
+        Returns:
+            float: The USD equivalent of the amount.
+        """
+        if rate_index is not None:
+            rate = rate_index.get_rate(currency, date)
+        else:
+            rate = self.exchange_rate_repository.get_exchange_rate_by_currency(
+                date, currency
+            )
 
         if rate is None:
             raise ValueError(f"No exchange rate found for currency: {currency}")
@@ -78,6 +326,271 @@ class NotionManager:
 
         return amount / currency_rate
 
+    @timed("rates.convert_pages")
+    def convert_pages(self, pages: list, rate_index: ExchangeRateIndex):
+        """
+        Converts the local amounts of a batch of pages to USD in bulk.
+
+        Args:
+            pages (list): The mapped Notion entries.
+            rate_index (ExchangeRateIndex): The prefetched rates.
+
+        Returns:
+            tuple: The pages that have an amount, currency and date, and the
+                ConversionResult aligned with them.
+        """
+        convertible_pages = [
+            page
+            for page in pages
+            if page.get("Local Amount") is not None
+            and page.get("Currencies")
+            and page.get("Date")
+        ]
+
+        conversion = convert_to_usd(
+            [page.get("Local Amount") for page in convertible_pages],
+            [page.get("Currencies") for page in convertible_pages],
+            [page.get("Date") for page in convertible_pages],
+            rate_index.get_rate,
+        )
+
+        return convertible_pages, conversion
+
+    def build_updates(
+        self,
+        pages: list,
+        rate_index: ExchangeRateIndex,
+        update_field: str,
+        target_fields: dict = None,
+        cross_rates: CrossRateEngine = None,
+    ):
+        """
+        Converts a batch of pages and builds the properties to write.
+
+        Args:
+            pages (list): The mapped Notion entries, with their rates prefetched.
+            rate_index (ExchangeRateIndex): The prefetched rates.
+            update_field (str): The field that receives the USD equivalent.
+            target_fields (dict): Optional extra fields mapped to their currency.
+            cross_rates (CrossRateEngine): The engine converting target_fields.
+
+        Returns:
+            tuple: The (page_id, properties) updates to write, and a failed
+                PageUpdateResult for each page that could not be converted.
+        """
+        convertible_pages, conversion = self.convert_pages(pages, rate_index)
+        target_columns = {}
+        if target_fields:
+            if cross_rates is None:
+                cross_rates = CrossRateEngine(rate_index)
+            converted = cross_rates.convert_columns(
+                [page.get("Local Amount") for page in convertible_pages],
+                [page.get("Currencies") for page in convertible_pages],
+                [page.get("Date") for page in convertible_pages],
+                set(target_fields.values()),
+            )
+            target_columns = {
+                field_name: converted[currency]
+                for field_name, currency in target_fields.items()
+            }
+        updates = []
+        failures = []
+
+        for position, (page, usd_equivalent, resolved) in enumerate(
+            zip(
+                convertible_pages,
+                conversion.values.tolist(),
+                conversion.resolved.tolist(),
+            )
+        ):
+            if not resolved:
+                error = f"No exchange rate found for currency: {page.get('Currencies')}"
+                failures.append(PageUpdateResult(page.get("id"), False, error=error))
+                continue
+
+            update_properties = {update_field: {"number": usd_equivalent}}
+            unresolved_targets = []
+            for field_name, column in target_columns.items():
+                if column.resolved[position]:
+                    update_properties[field_name] = {"number": float(column.values[position])}
+                else:
+                    unresolved_targets.append(target_fields[field_name])
+
+            if unresolved_targets:
+                error = (
+                    f"No exchange rate found for {page.get('Currencies')} to "
+                    f"{', '.join(unresolved_targets)}"
+                )
+                failures.append(PageUpdateResult(page.get("id"), False, error=error))
+                continue
+
+            updates.append((page.get("id"), update_properties))
+
+        return updates, failures
+
+    def _get_property_ids(self, database_id: str, refresh: bool = False):
+        key = (self.api_url, database_id)
+        if not refresh and key in _database_property_ids:
+            return _database_property_ids[key]
+
+        start = time.perf_counter()
+        response = self.session.get(f"{self.api_url}/databases/{database_id}", headers=self.headers)
+        get_metrics().record_http(
+            "notion.retrieve_database", response.status_code, time.perf_counter() - start
+        )
+        if response.status_code != 200:
+            return None
+
+        property_ids = {
+            name: schema.get("id") for name, schema in (response.json().get("properties") or {}).items()
+        }
+        _database_property_ids[key] = property_ids
+        return property_ids
+
+    def filter_properties(self, database_id: str, properties: dict):
+        """
+        Returns the IDs of the requested properties, for Notion's
+        `filter_properties` query parameter, so query results only carry the
+        columns that are read.
+
+        The database schema is retrieved once per process. The page ID and
+        last edited time are part of every page, not properties.
+
+        Args:
+            database_id (str): The ID of the Notion database.
+            properties (dict): The properties to retrieve, with their types.
+
+        Returns:
+            list: The property IDs, or None to request whole pages (nothing to
+                project or the schema could not be retrieved).
+        """
+        names = [
+            name for name, property_type in properties.items() if property_type not in PAGE_FIELD_TYPES
+        ]
+        if not names:
+            return None
+
+        property_ids = self._get_property_ids(database_id)
+        if property_ids is not None and any(name not in property_ids for name in names):
+            # The property may have been added or renamed since the schema was cached
+            property_ids = self._get_property_ids(database_id, refresh=True)
+        if property_ids is None:
+            return None
+
+        return [property_ids[name] for name in names if name in property_ids] or None
+
+    def _record_query_size(self, response) -> None:
+        bytes_decoded = len(response.content)
+        raw = getattr(response, "raw", None)
+        # urllib3 counts the bytes read off the wire, before decompression
+        bytes_received = raw.tell() if hasattr(raw, "tell") else bytes_decoded
+
+        with self._query_stats_lock:
+            self.query_stats.queries += 1
+            self.query_stats.bytes_received += bytes_received
+            self.query_stats.bytes_decoded += bytes_decoded
+
+        metrics = get_metrics()
+        metrics.observe("notion.query_database.bytes_received", bytes_received, unit="Bytes")
+        metrics.observe("notion.query_database.bytes_decoded", bytes_decoded, unit="Bytes")
+
+    def _query_database(self, database_id: str, query_body: dict, filter_properties: list = None) -> dict:
+        url = f"{self.api_url}/databases/{database_id}/query"
+        if filter_properties:
+            # Property IDs are already URL-encoded by the API
+            url += "?" + "&".join(f"filter_properties={property_id}" for property_id in filter_properties)
+
+        start = time.perf_counter()
+        response = self.session.post(url, headers=self.headers, json=query_body)
+        get_metrics().record_http(
+            "notion.query_database", response.status_code, time.perf_counter() - start
+        )
+
+        if response.status_code == 200:
+            self._record_query_size(response)
+            return response.json()
+        else:
+            raise Exception(f"Failed to fetch data from database {database_id}")
+
+    def iter_query_results(
+        self,
+        database_id: str,
+        properties: dict,
+        filter_body: dict,
+        start_cursor: str = None,
+        page_size: int = NOTION_MAX_PAGE_SIZE,
+        time_budget: TimeBudget = None,
+    ):
+        """
+        Streams data from a Notion database, following the query cursor.
+
+        The next result page is requested in the background while the caller
+        processes the current batch, so at most two result pages are held in
+        memory at any time. Results are projected to the requested properties
+        (see `filter_properties`), which keeps the largest page size cheap.
+
+        Args:
+            database_id (str): The ID of the Notion database to query.
+            properties (dict): The properties to retrieve, with their types.
+            filter_body (dict): The filter body for the query.
+            start_cursor (str): Optional cursor to continue an earlier query from.
+            page_size (int): The number of results per query (Notion allows up to 100).
+            time_budget (TimeBudget): Optional deadline. Once it no longer allows
+                a query, the next page is not requested and iteration ends
+                with its cursor.
+
+        Yields:
+            tuple: The mapped entries of each result page, and the cursor of
+                the following page (None after the last one).
+        """
+        query_body = {**(filter_body or {}), "page_size": page_size}
+        if start_cursor:
+            query_body["start_cursor"] = start_cursor
+        filter_properties = self.filter_properties(database_id, properties)
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(self._query_database, database_id, query_body, filter_properties)
+
+            while future is not None:
+                data = future.result()
+
+                next_cursor = data.get("next_cursor") if data.get("has_more") else None
+                future = None
+                if next_cursor and (time_budget is None or time_budget.allows()):
+                    future = executor.submit(
+                        self._query_database,
+                        database_id,
+                        {**query_body, "start_cursor": next_cursor},
+                        filter_properties,
+                    )
+
+                yield map_properties_from_notion_response(data, properties), next_cursor
+
+    def iter_data(
+        self,
+        database_id: str,
+        properties: dict,
+        filter_body: dict,
+        page_size: int = NOTION_MAX_PAGE_SIZE,
+    ):
+        """
+        Streams data from a Notion database, one list of entries per result page.
+
+        Args:
+            database_id (str): The ID of the Notion database to query.
+            properties (dict): The properties to retrieve, with their types.
+            filter_body (dict): The filter body for the query.
+            page_size (int): The number of results per query (Notion allows up to 100).
+
+        Yields:
+            list: The mapped entries of each result page.
+        """
+        for records, _ in self.iter_query_results(
+            database_id, properties, filter_body, page_size=page_size
+        ):
+            yield records
+
+    @timed("notion.get_data")
     def get_data(self, database_id: str, properties: dict, filter_body: dict) -> list:
         """
         Fetches data from a specified Notion database with a filter.
@@ -90,14 +603,11 @@ class NotionManager:
         Returns:
             list: A list of dictionaries with the specified properties.
         """
-        url = f"https://api.notion.com/v1/databases/{database_id}/query"
-        response = requests.post(url, headers=self.headers, json=filter_body)
+        results = []
+        for batch in self.iter_data(database_id, properties, filter_body):
+            results.extend(batch)
 
-        if response.status_code == 200:
-            data = response.json()
-            return map_properties_from_notion_response(data, properties)
-        else:
-            raise Exception(f"Failed to fetch data from database {database_id}")
+        return results
 
     def update_page(self, entry_id: str, properties: dict):
         """
@@ -107,44 +617,529 @@ class NotionManager:
             entry_id (str): The ID of the Notion page to update.
             properties (dict): The properties and their values to update.
         """
-        url = f"{self.page_url}/{entry_id}"
-        update_body = {"properties": properties}
+        result = self.page_writer.update_page(entry_id, properties)
+        if not result.success:
+            raise Exception(f"Failed to update page {entry_id}: {result.error}")
 
-        response = requests.patch(url, headers=self.headers, json=update_body)
-        if response.status_code != 200:
-            raise Exception(f"Failed to update page {entry_id}: {response.text}")
+    def retrieve_page(self, page_id: str) -> dict:
+        """
+        Retrieves a single page, sharing the page writer's rate limit.
+
+        Args:
+            page_id (str): The ID of the Notion page.
+
+        Returns:
+            dict: The page object as returned by the API.
+        """
+        self.page_writer.limiter.acquire()
+
+        start = time.perf_counter()
+        response = self.session.get(f"{self.page_url}/{page_id}", headers=self.headers)
+        get_metrics().record_http(
+            "notion.retrieve_page", response.status_code, time.perf_counter() - start
+        )
 
+        if response.status_code == 200:
+            return response.json()
+        else:
+            raise Exception(f"Failed to retrieve page {page_id}")
+
+    def retrieve_pages(self, page_ids: list) -> list:
+        """
+        Retrieves pages concurrently.
+
+        Returns:
+            list: A (page_id, page, error) tuple per ID, with the page None
+                and the error set when it could not be retrieved.
+        """
+
+        def retrieve(page_id):
+            try:
+                return page_id, self.retrieve_page(page_id), None
+            except Exception as e:
+                return page_id, None, str(e)
+
+        with ThreadPoolExecutor(max_workers=self.page_writer.max_workers) as executor:
+            return list(executor.map(retrieve, page_ids))
+
+    @timed("notion.update_pages_by_id")
+    def update_pages_by_id(
+        self, page_ids: list, jobs: list, rate_index: ExchangeRateIndex = None
+    ) -> dict:
+        """
+        Converts specific pages, e.g. the ones named by change notifications.
+
+        Pages are retrieved concurrently and matched to the sync job of their
+        parent database. The rates of the whole batch are prefetched at once,
+        and only pages whose amounts changed are written, so the edits made
+        here do not trigger further writes when they are notified back.
+
+        Pages are only converted when the job's sweep would pick them up: for
+        jobs filling empty amounts, pages whose amount is already filled (by
+        an earlier conversion or by hand) are left untouched.
+
+        Args:
+            page_ids (list): The IDs of the pages to convert.
+            jobs (list): The SyncJob definitions of the synced databases.
+            rate_index (ExchangeRateIndex): Optional rate cache shared with other runs.
+
+        Returns:
+            dict: A PageUpdateResult per requested page ID. Pages outside the
+                synced databases, archived or already filled pages and pages
+                without an amount, currency or date count as successful.
+        """
+        if rate_index is None:
+            rate_index = ExchangeRateIndex(max_staleness_days=self.max_rate_staleness_days)
+        jobs_by_database = {
+            normalize_notion_id(job.database_id): job for job in jobs if job.database_id
+        }
+        results = {}
+
+        pages_by_job = {}
+        requested_ids = {}
+        for page_id, page, error in self.retrieve_pages(page_ids):
+            if page is None:
+                results[page_id] = PageUpdateResult(page_id, False, error=error)
+                continue
+
+            parent = page.get("parent") or {}
+            job = jobs_by_database.get(normalize_notion_id(parent.get("database_id")))
+            if job is None or page.get("archived"):
+                continue
+
+            requested_ids[page.get("id")] = page_id
+            pages_by_job.setdefault(job.name, (job, []))[1].append(page)
+
+        batches = []
+        for job, pages in pages_by_job.values():
+            # The written fields are read as well, to skip pages already up to date
+            properties = with_written_fields(job.properties, job.update_field, job.target_fields)
+            records = map_properties_from_notion_response({"results": pages}, properties)
+            if fills_only_empty(job.filter_body, job.update_field):
+                filled = [record for record in records if record.get(job.update_field) is not None]
+                get_metrics().increment("notion.update_pages_by_id.filled", len(filled))
+                records = [record for record in records if record.get(job.update_field) is None]
+            batches.append((job, records))
+
+        self.prefetch_exchange_rates(
+            [record for _, records in batches for record in records],
+            rate_index,
+            include_usd_pages=any(job.target_fields for job, _ in batches),
+        )
+
+        updates = []
+        for job, records in batches:
+            job_updates, failures = self.build_updates(
+                records, rate_index, job.update_field, job.target_fields
+            )
+            for failure in failures:
+                failure.page_id = requested_ids[failure.page_id]
+                results[failure.page_id] = failure
+
+            current = {record["id"]: record for record in records}
+            for page_id, properties in job_updates:
+                if not drifted_fields(current[page_id], properties, UNCHANGED_TOLERANCE):
+                    get_metrics().increment("notion.update_pages_by_id.unchanged")
+                    continue
+                updates.append((page_id, properties))
+
+        for result in self.page_writer.update_pages(updates):
+            result.page_id = requested_ids[result.page_id]
+            results[result.page_id] = result
+
+        for page_id in page_ids:
+            results.setdefault(page_id, PageUpdateResult(page_id, True))
+
+        return results
+
+    @timed("notion.update_pages")
     def update_pages(
         self,
         database_id: str,
         properties_to_retrieve: dict,
         filter_body: dict,
         update_field: str,
-    ):
+        sync_state=None,
+        rate_index: ExchangeRateIndex = None,
+        target_fields: dict = None,
+        time_budget: TimeBudget = None,
+        resume_state=None,
+    ) -> list:
         """
-        Fetches data from a Notion database, calculates USD equivalent, and updates pages.
+        Streams data from a Notion database, calculates USD equivalent, and updates pages.
+
+        Pages are written concurrently; a page that cannot be converted or
+        written is reported as failed instead of aborting the run.
 
         Args:
             database_id (str): The ID of the Notion database.
             properties_to_retrieve (dict): The properties to retrieve, with their types.
             filter_body (dict): The filter body for querying.
             update_field (str): The name of the field to update with the calculated value.
+            sync_state: Optional sync state store. When given, only pages edited
+                since the database's checkpoint are queried, and the checkpoint
+                advances up to the first page that could not be converted or
+                written.
+            rate_index (ExchangeRateIndex): Optional rate cache shared with other
+                runs. A new one is created for this run when omitted.
+            target_fields (dict): Optional extra fields to fill, mapping each
+                field name to its currency code (e.g. {"Amount EUR": "EUR"}).
+                They are converted from the same stored snapshots, and a page
+                is only written when every field could be converted.
+            time_budget (TimeBudget): Optional invocation deadline. Pages are
+                then written a few at a time, and no write or query starts
+                once it might not finish before the deadline.
+            resume_state: Optional store for resume tokens. A run that stops
+                early saves the query cursor and the IDs of the pages it did
+                not write; the next run reads those pages again, writes them
+                first and continues the same query from the cursor.
+
+        Returns:
+            list: A PageUpdateResult for every page that was processed.
         """
-        pages = self.get_data(database_id, properties_to_retrieve, filter_body)
+        if rate_index is None:
+            rate_index = ExchangeRateIndex(max_staleness_days=self.max_rate_staleness_days)
+        cross_rates = CrossRateEngine(rate_index) if target_fields else None
+        results = []
 
-        for page in pages:
-            amount = page.get("Local Amount")
-            currency = page.get("Currencies")
-            page_date = page.get("Date")
+        if time_budget is not None and not time_budget.allows():
+            return results
 
-            if amount is not None and currency and page_date:
-                if currency and "USD" in currency:
-                    # If the currency is in USD, use the amount directly
-                    usd_equivalent = amount
-                else:
-                    usd_equivalent = self.calculate_usd_equivalent(
-                        amount, currency, page_date
+        resume = None
+        if resume_state is not None:
+            resume = resume_state.get_state(resume_key(database_id))
+
+        checkpoint_key = None
+        checkpoint_blocked = False
+        if sync_state is not None:
+            checkpoint_key = f"checkpoint#{database_id}"
+            checkpoint = sync_state.get_state(checkpoint_key) or {}
+            filter_body = build_incremental_query(
+                filter_body, checkpoint.get("last_edited_time")
+            )
+            properties_to_retrieve = {
+                **properties_to_retrieve,
+                "last_edited_time": NotionProperties.LAST_EDITED_TIME,
+            }
+
+        pending_pages = []
+        if resume is not None:
+            # The cursor only belongs to the query it was returned for
+            filter_body = resume["filter_body"]
+            # Pages left by the earlier run are read again, as they may have
+            # been edited since
+            for page_id, page, error in self.retrieve_pages(resume.get("pending_page_ids") or []):
+                if page is None:
+                    results.append(PageUpdateResult(page_id, False, error=error))
+                elif not page.get("archived"):
+                    pending_pages.append(page)
+            pending_pages = map_properties_from_notion_response(
+                {"results": pending_pages}, properties_to_retrieve
+            )
+
+        token = None
+        batches = self._iter_resumed_results(
+            database_id, properties_to_retrieve, filter_body, resume, pending_pages, time_budget
+        )
+        for pages, next_cursor in batches:
+            with time_budget.step() if time_budget is not None else nullcontext():
+                self.prefetch_exchange_rates(
+                    pages, rate_index, include_usd_pages=bool(target_fields)
+                )
+                updates, failures = self.build_updates(
+                    pages, rate_index, update_field, target_fields, cross_rates
+                )
+            results.extend(failures)
+
+            write_results, unwritten_ids = self._write_updates(updates, time_budget)
+            results.extend(write_results)
+
+            if checkpoint_key and not checkpoint_blocked:
+                # Pages arrive sorted by last_edited_time, so the checkpoint may
+                # only move up to the first page that could not be converted
+                # (e.g. no rate yet), whose write failed or that was left for
+                # the next run. Incremental runs would never see it again.
+                failed_ids = {
+                    result.page_id for result in failures + write_results if not result.success
+                }
+                high_water_mark = None
+                for page in pages:
+                    if page["id"] in failed_ids or page["id"] in unwritten_ids:
+                        checkpoint_blocked = True
+                        break
+                    high_water_mark = page.get("last_edited_time") or high_water_mark
+
+                if high_water_mark:
+                    sync_state.put_state(
+                        checkpoint_key, {"last_edited_time": high_water_mark}
                     )
 
-                update_properties = {update_field: {"number": usd_equivalent}}
-                self.update_page(page["id"], update_properties)
+            if unwritten_ids or (
+                next_cursor and time_budget is not None and not time_budget.allows()
+            ):
+                token = {
+                    "filter_body": filter_body,
+                    "cursor": next_cursor,
+                    "pending_page_ids": [
+                        page["id"] for page in pages if page["id"] in unwritten_ids
+                    ],
+                }
+                break
+        batches.close()
+
+        if token is not None:
+            get_metrics().increment("notion.update_pages.stopped_early")
+            if resume_state is not None:
+                resume_state.put_state(resume_key(database_id), token)
+        elif resume is not None:
+            resume_state.delete_state(resume_key(database_id))
+
+        return results
+
+    def _iter_resumed_results(
+        self,
+        database_id: str,
+        properties: dict,
+        filter_body: dict,
+        resume: dict = None,
+        pending_pages: list = None,
+        time_budget: TimeBudget = None,
+    ):
+        """
+        Yields the re-read pages left by an earlier run, then the rest of its query.
+
+        A cursor Notion no longer accepts restarts the query from the
+        beginning; pages already written no longer match the filter.
+        """
+        if resume is None:
+            yield from self.iter_query_results(
+                database_id, properties, filter_body, time_budget=time_budget
+            )
+            return
+
+        cursor = resume.get("cursor")
+        if pending_pages:
+            yield pending_pages, cursor
+        if not cursor or (time_budget is not None and not time_budget.allows()):
+            return
+
+        results = self.iter_query_results(
+            database_id, properties, filter_body, start_cursor=cursor, time_budget=time_budget
+        )
+        try:
+            first = next(results)
+        except StopIteration:
+            return
+        except Exception as e:
+            print(f"Could not resume database {database_id} from its cursor, starting over: {e}")
+            results = self.iter_query_results(
+                database_id, properties, filter_body, time_budget=time_budget
+            )
+            first = next(results, None)
+            if first is None:
+                return
+
+        yield first
+        yield from results
+
+    def _write_updates(self, updates: list, time_budget: TimeBudget = None):
+        """
+        Writes page updates, a few at a time when there is a time budget.
+
+        Returns:
+            tuple: The PageUpdateResults, and the IDs of the pages left
+                unwritten because the budget ran out.
+        """
+        if time_budget is None:
+            return self.page_writer.update_pages(updates), set()
+
+        results = []
+        chunk_size = max(self.page_writer.max_workers, 1)
+        for start in range(0, len(updates), chunk_size):
+            if not time_budget.allows():
+                return results, {page_id for page_id, _ in updates[start:]}
+            with time_budget.step():
+                results.extend(self.page_writer.update_pages(updates[start:start + chunk_size]))
+
+        return results, set()
+
+    @timed("notion.update_pages_from_export")
+    def update_pages_from_export(
+        self,
+        path: str,
+        properties_to_retrieve: dict,
+        update_field: str,
+        sink=None,
+        target_fields: dict = None,
+        skip_filled: bool = False,
+        batch_size: int = 1000,
+        rate_index: ExchangeRateIndex = None,
+    ) -> ExportUpdateReport:
+        """
+        Recomputes amounts from a Notion export instead of querying the API.
+
+        The export is streamed in batches, so memory stays constant however
+        many rows it holds. All stored rates are loaded with one scan up
+        front, since exports usually span years of dates.
+
+        Args:
+            path (str): A JSON, JSONL or CSV export, or a directory of them.
+            properties_to_retrieve (dict): The properties to retrieve, with their types.
+            update_field (str): The name of the field to update with the calculated value.
+            sink: Where updates go: NotionPageSink (the default, writes back to
+                Notion) or FileSink (writes a local JSON lines file).
+            target_fields (dict): Optional extra fields mapped to their currency.
+            skip_filled (bool): Whether rows whose update_field already has a value are skipped.
+            batch_size (int): The number of rows converted and written at a time.
+            rate_index (ExchangeRateIndex): Optional preloaded rates.
+
+        Returns:
+            ExportUpdateReport: The number of rows read, written and failed. CSV
+                rows with a cell that cannot be parsed count as failed.
+        """
+        if sink is None:
+            sink = NotionPageSink(self.page_writer)
+        if rate_index is None:
+            rate_index = self.exchange_rate_repository.build_rate_index(
+                max_staleness_days=self.max_rate_staleness_days
+            )
+        cross_rates = CrossRateEngine(rate_index) if target_fields else None
+        report = ExportUpdateReport()
+        # Rows with malformed cells are reported and skipped, not fatal
+        parse_errors = []
+
+        def record(results):
+            for result in results:
+                if result.success:
+                    report.written += 1
+                    continue
+
+                report.failed += 1
+                if len(report.failures) < EXPORT_MAX_REPORTED_FAILURES:
+                    report.failures.append({"page_id": result.page_id, "error": result.error})
+
+        def record_parse_errors():
+            report.pages += len(parse_errors)
+            record(parse_errors)
+            parse_errors.clear()
+
+        try:
+            for pages in iter_export_records(
+                path, properties_to_retrieve, batch_size, errors=parse_errors
+            ):
+                record_parse_errors()
+                report.pages += len(pages)
+                if skip_filled:
+                    pages = [page for page in pages if page.get(update_field) is None]
+
+                updates, failures = self.build_updates(
+                    pages, rate_index, update_field, target_fields, cross_rates
+                )
+                record(failures + sink.write(updates))
+            record_parse_errors()
+        finally:
+            sink.close()
+
+        return report
+
+    @timed("notion.reconcile_pages")
+    def reconcile_pages(
+        self,
+        database_id: str,
+        properties_to_retrieve: dict,
+        update_field: str,
+        filter_body: dict = None,
+        tolerance: float = 0.01,
+        target_fields: dict = None,
+        dry_run: bool = False,
+        report_path: str = None,
+        rate_index: ExchangeRateIndex = None,
+    ) -> ReconciliationReport:
+        """
+        Recomputes already filled amounts and rewrites only the pages that drifted,
+        e.g. after stored rates were corrected or backfilled.
+
+        All stored rates are loaded with one scan up front, like exports, and
+        every page is compared against them in memory, so an audit costs the
+        queries plus one write per drifted page.
+
+        Args:
+            database_id (str): The ID of the Notion database.
+            properties_to_retrieve (dict): The properties to retrieve, with their types.
+            update_field (str): The field holding the USD equivalent.
+            filter_body (dict): The filter body for querying. Defaults to every
+                page whose update_field is filled.
+            tolerance (float): The largest absolute difference left as is.
+            target_fields (dict): Optional extra fields mapped to their currency,
+                compared and rewritten together with update_field.
+            dry_run (bool): Whether differences are only reported, not written.
+            report_path (str): Optional JSON lines file receiving every difference.
+            rate_index (ExchangeRateIndex): Optional preloaded rates.
+
+        Returns:
+            ReconciliationReport: The counts, and the first differences and failures.
+        """
+        if rate_index is None:
+            rate_index = self.exchange_rate_repository.build_rate_index(
+                max_staleness_days=self.max_rate_staleness_days
+            )
+        if filter_body is None:
+            filter_body = {"filter": {"property": update_field, "number": {"is_not_empty": True}}}
+        properties = with_written_fields(properties_to_retrieve, update_field, target_fields)
+        cross_rates = CrossRateEngine(rate_index) if target_fields else None
+        report = ReconciliationReport()
+        diff_file = open(report_path, "w", encoding="utf-8") if report_path else None
+
+        try:
+            for pages in self.iter_data(database_id, properties, filter_body):
+                report.pages += len(pages)
+                updates, failures = self.build_updates(
+                    pages, rate_index, update_field, target_fields, cross_rates
+                )
+                report.checked += len(updates) + len(failures)
+
+                pages_by_id = {page["id"]: page for page in pages}
+                drifted = []
+                for page_id, update_properties in updates:
+                    diffs = drifted_fields(pages_by_id[page_id], update_properties, tolerance)
+                    if not diffs:
+                        continue
+
+                    drifted.append((page_id, update_properties))
+                    for field_name, stored, expected in diffs:
+                        diff = {
+                            "page_id": page_id,
+                            "field": field_name,
+                            "stored": stored,
+                            "expected": expected,
+                        }
+                        if diff_file is not None:
+                            diff_file.write(json.dumps(diff) + "\n")
+                        if len(report.diffs) < RECONCILE_MAX_REPORTED_DIFFS:
+                            report.diffs.append(diff)
+                report.drifted += len(drifted)
+
+                results = failures + ([] if dry_run else self.page_writer.update_pages(drifted))
+                for result in results:
+                    if result.success:
+                        report.written += 1
+                        continue
+
+                    report.failed += 1
+                    if len(report.failures) < EXPORT_MAX_REPORTED_FAILURES:
+                        report.failures.append({"page_id": result.page_id, "error": result.error})
+        finally:
+            if diff_file is not None:
+                diff_file.close()
+
+        get_metrics().increment("notion.reconcile_pages.drifted", report.drifted)
+        return report
+
+
+@lru_cache(maxsize=None)
+def get_notion_manager() -> NotionManager:
+    """
+    Returns a NotionManager shared across warm invocations, together with its
+    HTTP and DynamoDB clients.
+    """
+    return NotionManager()
@@ -0,0 +1,213 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+from src.libs.client_registry import get_http_session
+from src.libs.metrics import get_metrics, timed
+
+
+@dataclass
+class PageUpdateResult:
+    page_id: str
+    success: bool
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+
+
+class TokenBucket:
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ) -> None:
+        """
+        A thread-safe token bucket rate limiter.
+
+        Args:
+            rate (float): The number of tokens added per second.
+            capacity (float): The maximum number of tokens (burst size).
+            clock (callable): Monotonic clock returning seconds.
+            sleep (callable): Function used to wait for tokens.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = capacity
+        # Moves past the current time while the bucket is paused
+        self.updated_at = clock()
+        self.lock = threading.Lock()
+
+    def pause_until(self, until: float) -> None:
+        """
+        Stops handing out tokens until the given time, e.g. a 429's Retry-After.
+
+        Args:
+            until (float): The clock time at which requests may resume.
+        """
+        with self.lock:
+            if until <= max(self.clock(), self.updated_at):
+                return
+            # One request may go out when the pause ends, the rest at `rate`
+            self.tokens = min(self.tokens, 1)
+            self.updated_at = until
+
+    def acquire(self) -> None:
+        """
+        Blocks until a token is available and consumes it.
+
+        Tokens are reserved under the lock, so concurrent callers queue up
+        behind each other instead of polling. No tokens are added while the
+        bucket is paused.
+        """
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(
+                self.capacity, self.tokens + max(0, now - self.updated_at) * self.rate
+            )
+            self.updated_at = max(now, self.updated_at)
+            self.tokens -= 1
+            wait = self.updated_at - now
+            if self.tokens < 0:
+                wait += -self.tokens / self.rate
+
+        if wait > 0:
+            self.sleep(wait)
+
+
+class NotionPageWriter:
+    def __init__(
+        self,
+        headers: dict,
+        page_url: str = "https://api.notion.com/v1/pages",
+        max_workers: int = 4,
+        rate_per_second: float = 3.0,
+        burst: float = 3.0,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 30.0,
+        session=None,
+        sleep=time.sleep,
+        clock=time.monotonic,
+    ) -> None:
+        """
+        Writes Notion page updates concurrently within Notion's rate limit.
+
+        A 429 pauses the shared rate limiter for its Retry-After, so every
+        worker holds off, not only the one that was throttled.
+
+        Args:
+            headers (dict): The Notion API headers.
+            page_url (str): The Notion pages endpoint.
+            max_workers (int): The number of concurrent PATCH requests.
+            rate_per_second (float): The average request rate allowed by Notion.
+            burst (float): The number of requests that may be sent back to back.
+            max_retries (int): The retries per page on 429, 5xx and network errors.
+            backoff_base (float): The base delay in seconds for 5xx backoff.
+            backoff_cap (float): The maximum delay in seconds for 5xx backoff.
+            session: The HTTP session used for requests (defaults to the shared Notion session).
+            sleep (callable): Function used to wait between retries.
+            clock (callable): Monotonic clock returning seconds, used by the rate limiter.
+        """
+        self.headers = headers
+        self.page_url = page_url
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._session = session
+        self.sleep = sleep
+        self.limiter = TokenBucket(rate_per_second, burst, clock=clock, sleep=sleep)
+
+    @property
+    def session(self):
+        # Resolved on first request so constructing a writer stays cheap
+        if self._session is None:
+            self._session = get_http_session("notion")
+        return self._session
+
+    def _retry_delay(self, response, attempt: int) -> float:
+        if response is not None and response.status_code == 429:
+            retry_after = response.headers.get("Retry-After")
+            try:
+                return float(retry_after)
+            except (TypeError, ValueError):
+                pass
+
+        # Full jitter exponential backoff
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2**attempt))
+
+    @timed("notion.update_page")
+    def update_page(self, page_id: str, properties: dict) -> PageUpdateResult:
+        """
+        Updates a single page, retrying on rate limiting and transient errors.
+
+        Args:
+            page_id (str): The ID of the Notion page to update.
+            properties (dict): The properties and their values to update.
+
+        Returns:
+            PageUpdateResult: The outcome of the update.
+        """
+        from requests import RequestException
+
+        url = f"{self.page_url}/{page_id}"
+        update_body = {"properties": properties}
+
+        metrics = get_metrics()
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                metrics.increment("notion.update_page.retries")
+            self.limiter.acquire()
+
+            start = time.perf_counter()
+            try:
+                response = self.session.patch(url, headers=self.headers, json=update_body)
+            except RequestException as e:
+                response = None
+                error = str(e)
+                metrics.record_http("notion.pages", None, time.perf_counter() - start)
+            else:
+                metrics.record_http(
+                    "notion.pages", response.status_code, time.perf_counter() - start
+                )
+                if response.status_code == 200:
+                    return PageUpdateResult(page_id, True, response.status_code)
+
+                error = response.text
+                if response.status_code != 429 and response.status_code < 500:
+                    return PageUpdateResult(page_id, False, response.status_code, error)
+
+            if attempt < self.max_retries:
+                delay = self._retry_delay(response, attempt)
+                if response is not None and response.status_code == 429:
+                    # The next acquire() waits out the pause
+                    self.limiter.pause_until(self.limiter.clock() + delay)
+                else:
+                    self.sleep(delay)
+
+        status_code = response.status_code if response is not None else None
+        return PageUpdateResult(page_id, False, status_code, error)
+
+    def update_pages(
+        self, updates: Iterable[Tuple[str, dict]]
+    ) -> List[PageUpdateResult]:
+        """
+        Updates several pages concurrently.
+
+        Args:
+            updates (iterable): Pairs of page ID and properties to update.
+
+        Returns:
+            list: One PageUpdateResult per update, in input order.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(
+                executor.map(lambda update: self.update_page(*update), updates)
+            )
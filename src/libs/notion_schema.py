@@ -0,0 +1,76 @@
+from enum import Enum
+from functools import lru_cache
+from types import MappingProxyType
+
+
+class NotionProperties(Enum):
+    ID = "id"
+    NUMBER = "number"
+    SELECT = "select"
+    DATE = "date"
+    LAST_EDITED_TIME = "last_edited_time"
+
+
+# Types read from the page object itself rather than from its properties
+PAGE_FIELD_TYPES = frozenset({NotionProperties.ID, NotionProperties.LAST_EDITED_TIME})
+
+_EMPTY = MappingProxyType({})
+
+
+def _page_field(field_name: str):
+    return lambda page, properties: page.get(field_name)
+
+
+def _property_value(value_key: str, nested_key: str = None):
+    # Explicit nulls (e.g. "select": null) fall back to _EMPTY
+    def reader_for(property_name: str):
+        if nested_key is None:
+            return lambda page, properties: (properties.get(property_name) or _EMPTY).get(value_key)
+        return lambda page, properties: (
+            (properties.get(property_name) or _EMPTY).get(value_key) or _EMPTY
+        ).get(nested_key)
+
+    return reader_for
+
+
+# Builds the reader of each property type from the property name. Readers take
+# the page and its properties.
+_PROPERTY_READERS = {
+    NotionProperties.ID: lambda property_name: _page_field("id"),
+    NotionProperties.NUMBER: _property_value("number"),
+    NotionProperties.SELECT: _property_value("select", "name"),
+    NotionProperties.DATE: _property_value("date", "start"),
+    NotionProperties.LAST_EDITED_TIME: lambda property_name: _page_field("last_edited_time"),
+}
+
+
+@lru_cache(maxsize=64)
+def _compile(schema: tuple):
+    readers = tuple(
+        (property_name, _PROPERTY_READERS[property_type](property_name))
+        for property_name, property_type in schema
+    )
+
+    def extract(page: dict) -> dict:
+        properties = page.get("properties") or _EMPTY
+        return {property_name: read(page, properties) for property_name, read in readers}
+
+    return extract
+
+
+def compile_property_extractor(properties: dict):
+    """
+    Compiles a property schema into a function that extracts one page.
+
+    Each property's reader is resolved once per schema instead of once per
+    page and property. Compiled extractors are cached per schema.
+
+    Args:
+        properties (dict): A dictionary where keys are property names and values
+            are the NotionProperties enum type.
+
+    Returns:
+        callable: A function taking a Notion page and returning a dictionary of
+            the property values.
+    """
+    return _compile(tuple(properties.items()))
@@ -0,0 +1,175 @@
+import json
+from collections import deque
+from itertools import count
+from typing import List
+
+from src.libs.metrics import get_metrics
+from src.repository.exchange_rate_index import ExchangeRateIndex
+
+
+def parse_page_change(body) -> str:
+    """
+    Returns the page ID named by a page change message.
+
+    Accepts {"page_id": ...} bodies and Notion webhook events
+    ({"entity": {"id": ..., "type": "page"}, ...}).
+
+    Args:
+        body (str): The message body.
+
+    Returns:
+        str: The ID of the changed page.
+    """
+    try:
+        message = json.loads(body)
+    except (TypeError, ValueError):
+        message = None
+
+    if isinstance(message, dict):
+        if message.get("page_id"):
+            return message["page_id"]
+        entity = message.get("entity") or {}
+        if entity.get("type", "page") == "page" and entity.get("id"):
+            return entity["id"]
+
+    raise Exception(f"No page ID in message: {body!r}")
+
+
+class PageChangeConsumer:
+    def __init__(self, notion_manager, jobs: list) -> None:
+        """
+        Converts the pages named by a batch of queue messages.
+
+        Args:
+            notion_manager (NotionManager): The manager used to read and write pages.
+            jobs (list): The SyncJob definitions of the synced databases.
+        """
+        self.notion_manager = notion_manager
+        self.jobs = jobs
+
+    def handle(self, event: dict) -> dict:
+        """
+        Processes an SQS batch event and reports the messages to retry.
+
+        Each page is converted once however many messages name it. Malformed
+        messages are dropped, since retrying them cannot succeed.
+
+        Args:
+            event (dict): The SQS event with its "Records".
+
+        Returns:
+            dict: The partial batch response, {"batchItemFailures": [...]}.
+        """
+        page_ids_by_message = {}
+        for record in (event or {}).get("Records") or []:
+            try:
+                page_ids_by_message[record["messageId"]] = parse_page_change(record.get("body"))
+            except Exception as e:
+                print(f"Dropping page change message {record.get('messageId')}: {e}")
+
+        metrics = get_metrics()
+        metrics.increment("page_changes.messages", len(page_ids_by_message))
+
+        page_ids = list(dict.fromkeys(page_ids_by_message.values()))
+        results = {}
+        if page_ids:
+            rate_index = ExchangeRateIndex(
+                max_staleness_days=self.notion_manager.max_rate_staleness_days
+            )
+            try:
+                results = self.notion_manager.update_pages_by_id(page_ids, self.jobs, rate_index)
+            except Exception as e:
+                # Nothing is known about the batch, so every message is retried
+                print(f"Failed to convert changed pages: {e}")
+                results = None
+
+        failures = []
+        for message_id, page_id in page_ids_by_message.items():
+            result = results.get(page_id) if results is not None else None
+            if results is None or (result is not None and not result.success):
+                if result is not None:
+                    print(f"Failed to convert page {page_id}: {result.error}")
+                failures.append({"itemIdentifier": message_id})
+
+        metrics.increment("page_changes.failures", len(failures))
+        return {"batchItemFailures": failures}
+
+
+class InMemoryQueue:
+    def __init__(self, max_receives: int = 3) -> None:
+        """
+        A local stand-in for an SQS queue with partial batch responses.
+
+        Messages reported as failed are delivered again, and move to
+        `dead_letters` after `max_receives` deliveries.
+
+        Args:
+            max_receives (int): The deliveries before a message is dead-lettered.
+        """
+        self.max_receives = max_receives
+        self.messages = deque()
+        self.in_flight = {}
+        self.dead_letters = []
+        self._ids = count(1)
+
+    def send(self, body) -> str:
+        """
+        Enqueues a message and returns its ID. Non-string bodies are sent as JSON.
+        """
+        message_id = f"message-{next(self._ids)}"
+        if not isinstance(body, str):
+            body = json.dumps(body)
+        self.messages.append({"messageId": message_id, "body": body, "receives": 0})
+        return message_id
+
+    def receive(self, max_messages: int = 10) -> dict:
+        """
+        Takes up to `max_messages` messages and returns them as an SQS event.
+        """
+        records = []
+        while self.messages and len(records) < max_messages:
+            message = self.messages.popleft()
+            message["receives"] += 1
+            self.in_flight[message["messageId"]] = message
+            records.append(
+                {
+                    "messageId": message["messageId"],
+                    "body": message["body"],
+                    "attributes": {"ApproximateReceiveCount": str(message["receives"])},
+                    "eventSource": "aws:sqs",
+                }
+            )
+
+        return {"Records": records}
+
+    def complete(self, event: dict, response: dict) -> None:
+        """
+        Deletes the delivered messages except those the handler reported as failed.
+        """
+        failed = {
+            failure["itemIdentifier"] for failure in (response or {}).get("batchItemFailures", [])
+        }
+        for record in event["Records"]:
+            message = self.in_flight.pop(record["messageId"])
+            if record["messageId"] not in failed:
+                continue
+            if message["receives"] >= self.max_receives:
+                self.dead_letters.append(message)
+            else:
+                self.messages.append(message)
+
+    def drain(self, handler, batch_size: int = 10) -> List[dict]:
+        """
+        Feeds batches to `handler(event, context)` until the queue is empty.
+
+        Returns:
+            list: The handler's response for each batch.
+        """
+        responses = []
+        while self.messages:
+            event = self.receive(batch_size)
+            response = handler(event, None)
+            self.complete(event, response)
+            responses.append(response)
+
+        return responses
@@ -0,0 +1,158 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from src.libs.notion_manager_provider import resume_key
+from src.libs.time_budget import TimeBudget, invoke_continuation
+from src.repository.exchange_rate_index import ExchangeRateIndex
+
+
+@dataclass
+class SyncJob:
+    name: str
+    database_id: str
+    properties: dict
+    filter_body: dict
+    update_field: str = "Amount"
+    # Extra fields filled with the amount in other currencies, e.g. {"Amount EUR": "EUR"}
+    target_fields: dict = field(default_factory=dict)
+
+
+@dataclass
+class SyncJobReport:
+    name: str
+    database_id: str
+    seconds: float = 0.0
+    pages: int = 0
+    updated: int = 0
+    failed: int = 0
+    error: Optional[str] = None
+    failures: List[dict] = field(default_factory=list)
+    # The job stopped before the deadline and left a resume token
+    incomplete: bool = False
+
+
+class SyncRunner:
+    def __init__(
+        self,
+        notion_manager,
+        jobs: List[SyncJob],
+        max_workers: int = None,
+        sync_state=None,
+        time_budget: TimeBudget = None,
+        resume_state=None,
+    ) -> None:
+        """
+        Runs several database sync jobs in parallel in one invocation.
+
+        All jobs share the manager (and so its HTTP session, DynamoDB clients
+        and Notion rate limiter) and a single exchange rate index, so each
+        date's rates are loaded once no matter how many ledgers need them.
+
+        Args:
+            notion_manager (NotionManager): The manager used by every job.
+            jobs (list): The SyncJob definitions to run.
+            max_workers (int): The number of jobs run at once (defaults to all).
+            sync_state: Optional sync state store for incremental runs.
+            time_budget (TimeBudget): Optional invocation deadline shared by all jobs.
+            resume_state: Optional store for the resume tokens of unfinished jobs.
+        """
+        self.notion_manager = notion_manager
+        self.jobs = jobs
+        self.max_workers = max_workers or max(len(jobs), 1)
+        self.sync_state = sync_state
+        self.time_budget = time_budget
+        self.resume_state = resume_state
+
+    def _run_job(self, job: SyncJob, rate_index: ExchangeRateIndex) -> SyncJobReport:
+        report = SyncJobReport(name=job.name, database_id=job.database_id)
+        start = time.perf_counter()
+
+        try:
+            results = self.notion_manager.update_pages(
+                database_id=job.database_id,
+                properties_to_retrieve=job.properties,
+                filter_body=job.filter_body,
+                update_field=job.update_field,
+                sync_state=self.sync_state,
+                rate_index=rate_index,
+                target_fields=job.target_fields,
+                time_budget=self.time_budget,
+                resume_state=self.resume_state,
+            )
+        except Exception as e:
+            report.error = str(e)
+        else:
+            report.pages = len(results)
+            report.failures = [
+                {"page_id": result.page_id, "error": result.error}
+                for result in results
+                if not result.success
+            ]
+            report.failed = len(report.failures)
+            report.updated = report.pages - report.failed
+            if self.time_budget is not None and self.time_budget.exhausted:
+                report.incomplete = self.resume_state is None or (
+                    self.resume_state.get_state(resume_key(job.database_id)) is not None
+                )
+
+        report.seconds = time.perf_counter() - start
+        return report
+
+    def run(self) -> List[SyncJobReport]:
+        """
+        Runs every job and returns one report per job, in job order.
+        """
+        rate_index = ExchangeRateIndex(
+            max_staleness_days=self.notion_manager.max_rate_staleness_days
+        )
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(lambda job: self._run_job(job, rate_index), self.jobs))
+
+
+def build_sync_response(reports: List[SyncJobReport]) -> dict:
+    """
+    Logs failed pages and builds the handler response with per-job timings and counts.
+    """
+    for report in reports:
+        if report.error:
+            print(f"Sync job {report.name} failed: {report.error}")
+        for failure in report.failures:
+            print(f"Failed to update page {failure['page_id']}: {failure['error']}")
+
+    body = [
+        {
+            "name": report.name,
+            "database_id": report.database_id,
+            "seconds": round(report.seconds, 3),
+            "pages": report.pages,
+            "updated": report.updated,
+            "failed": report.failed,
+            "error": report.error,
+            "incomplete": report.incomplete,
+        }
+        for report in reports
+    ]
+
+    return {
+        "statusCode": 500 if any(report.error for report in reports) else 200,
+        "body": json.dumps(body),
+    }
+
+
+def continue_if_incomplete(reports: List[SyncJobReport], event: dict, context) -> bool:
+    """
+    Re-invokes the handler to continue jobs that stopped before the deadline.
+
+    Returns:
+        bool: True if a continuation was started (see `invoke_continuation`).
+    """
+    incomplete = [report.name for report in reports if report.incomplete]
+    if not incomplete:
+        return False
+
+    print(f"Sync jobs stopped before the deadline: {', '.join(incomplete)}")
+    return invoke_continuation(event, context)
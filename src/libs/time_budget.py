@@ -0,0 +1,117 @@
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from src.libs.client_registry import get_lambda_client
+from src.libs.metrics import get_metrics
+
+
+class TimeBudget:
+    def __init__(self, context=None, reserve_seconds: float = None) -> None:
+        """
+        Tracks how much time an invocation has left for new work.
+
+        The remaining time is read from the Lambda context on every check.
+        `reserve_seconds` (SYNC_TIME_RESERVE_SECONDS, default 5) are kept
+        back for saving progress and returning. Without a context, the
+        budget never runs out.
+
+        Args:
+            context: The Lambda context, or None.
+            reserve_seconds (float): The seconds kept back before the deadline.
+        """
+        self.context = context
+        if reserve_seconds is None:
+            reserve_seconds = float(os.getenv("SYNC_TIME_RESERVE_SECONDS", "5"))
+        self.reserve_seconds = reserve_seconds
+        # The longest unit of work seen so far, used to predict the next one
+        self.slowest_step = 0.0
+        self.exhausted = False
+        self._lock = threading.Lock()
+
+    def remaining(self) -> float:
+        """
+        Returns the seconds left before the reserve, or infinity without a deadline.
+        """
+        get_remaining = getattr(self.context, "get_remaining_time_in_millis", None)
+        if get_remaining is None:
+            return math.inf
+        return get_remaining() / 1000 - self.reserve_seconds
+
+    def allows(self, seconds: float = None) -> bool:
+        """
+        Checks whether a unit of work fits in the remaining time.
+
+        Once a check fails the budget stays exhausted, so parallel jobs
+        sharing it all stop taking new work.
+
+        Args:
+            seconds (float): The expected duration; defaults to the slowest step seen.
+
+        Returns:
+            bool: True if the work may start.
+        """
+        if seconds is None:
+            seconds = self.slowest_step
+        if self.exhausted or self.remaining() <= seconds:
+            self.exhausted = True
+            return False
+        return True
+
+    @contextmanager
+    def step(self):
+        """
+        Times a unit of work, so later checks expect work to take as long.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.slowest_step = max(self.slowest_step, elapsed)
+
+
+def invoke_continuation(event: dict, context) -> bool:
+    """
+    Re-invokes the running function asynchronously to continue unfinished work.
+
+    Only enabled with SYNC_SELF_INVOKE=true. Each continuation carries its
+    depth in the event, and the chain stops after SYNC_MAX_CONTINUATIONS
+    (default 20) invocations so a page that never completes cannot loop.
+
+    Args:
+        event (dict): The event of the running invocation.
+        context: The Lambda context.
+
+    Returns:
+        bool: True if a continuation was started.
+    """
+    if os.getenv("SYNC_SELF_INVOKE", "false").lower() != "true":
+        return False
+
+    function_arn = getattr(context, "invoked_function_arn", None)
+    if not function_arn:
+        return False
+
+    event = event if isinstance(event, dict) else {}
+    depth = int(event.get("continuation", 0)) + 1
+    if depth > int(os.getenv("SYNC_MAX_CONTINUATIONS", "20")):
+        print(f"Not continuing after {depth - 1} continuations")
+        return False
+
+    try:
+        get_lambda_client(function_arn.split(":")[3]).invoke(
+            FunctionName=function_arn,
+            InvocationType="Event",
+            Payload=json.dumps({**event, "continuation": depth}).encode(),
+        )
+    except Exception as e:
+        print(f"Error invoking continuation: {e}")
+        return False
+
+    get_metrics().increment("sync.continuations")
+    return True
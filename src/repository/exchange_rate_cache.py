@@ -0,0 +1,381 @@
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from datetime import date as date_type
+from datetime import datetime
+
+from src.entity.exchange_rate_entity import (
+    CURRENCY_CODES,
+    PACKED_ENCODING,
+    PackedRates,
+    pack_rates,
+)
+from src.libs.metrics import get_metrics
+from src.repository.exchange_rate_repository import ExchangeRateRepository
+
+# Marks a date whose lookup found no stored entry
+MISSING = object()
+
+# Slot header of the disk tier: state and expiry (Unix seconds, 0 = never)
+_SLOT_HEADER = struct.Struct("<dd")
+_SLOT_EMPTY = 0.0
+_SLOT_PRESENT = 1.0
+_SLOT_MISSING = 2.0
+# Day of the first slot; earlier dates are only cached in memory
+_DISK_ORIGIN = date_type(2000, 1, 1).toordinal()
+
+
+def get_cache_mode() -> str:
+    """
+    Returns EXCHANGE_RATE_CACHE: "off", "memory" or "disk" (memory and disk, the default).
+    """
+    return os.getenv("EXCHANGE_RATE_CACHE", "disk").lower()
+
+
+class DiskRateTier:
+    def __init__(self, path: str) -> None:
+        """
+        A memory-mapped file holding one fixed-size slot per day.
+
+        Each slot is a state/expiry header followed by the rates in the packed
+        float64 layout of CURRENCY_CODES, so reading a date is a slice of the
+        mapping and writing one is a single pwrite. The file is sparse: days
+        that were never cached take no disk space. It is opened on first use.
+
+        Args:
+            path (str): The cache file. Its name should change with the slot
+                layout (packed encoding and number of currency codes).
+        """
+        self.path = path
+        self.values_size = len(CURRENCY_CODES) * 8
+        self.slot_size = _SLOT_HEADER.size + self.values_size
+        self._fd = None
+        self._mmap = None
+
+    def _open(self) -> None:
+        if self._fd is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+
+    def _offset(self, date: str):
+        try:
+            day = date_type.fromisoformat(date).toordinal() - _DISK_ORIGIN
+        except (TypeError, ValueError):
+            return None
+        return day * self.slot_size if day >= 0 else None
+
+    def _mapping(self, end: int):
+        # Remaps when the file grew past the current mapping
+        if self._mmap is not None and len(self._mmap) >= end:
+            return self._mmap
+
+        size = os.fstat(self._fd).st_size
+        if size < end:
+            return None
+        if self._mmap is not None:
+            self._mmap.close()
+        self._mmap = mmap.mmap(self._fd, size, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def get(self, date: str, now: float):
+        """
+        Returns the cached item of a date, MISSING, or None when not cached or expired.
+        """
+        offset = self._offset(date)
+        if offset is None:
+            return None
+
+        self._open()
+        mapping = self._mapping(offset + self.slot_size)
+        if mapping is None:
+            return None
+
+        state, expires_at = _SLOT_HEADER.unpack_from(mapping, offset)
+        if state == _SLOT_EMPTY or (expires_at and expires_at <= now):
+            return None
+        if state == _SLOT_MISSING:
+            return MISSING
+
+        start = offset + _SLOT_HEADER.size
+        return {
+            "Date": date,
+            "BaseCurrency": "USD",
+            "Rates": PackedRates(mapping[start : start + self.values_size]),
+        }
+
+    def put(self, date: str, item, expires_at: float) -> bool:
+        """
+        Stores an item (or MISSING) for a date.
+
+        Returns:
+            bool: False if the item cannot be held in a slot (a date before the
+                disk origin, another base currency or currencies outside
+                CURRENCY_CODES), in which case the slot is cleared.
+        """
+        offset = self._offset(date)
+        if offset is None:
+            return False
+
+        if item is MISSING:
+            state, packed = _SLOT_MISSING, bytes(self.values_size)
+        else:
+            packed, extra_rates = pack_rates(item.get("Rates") or {}, "USD")
+            if extra_rates or (item.get("BaseCurrency") or "USD") != "USD":
+                self.invalidate(date)
+                return False
+            state = _SLOT_PRESENT
+
+        self._open()
+        # The state is written last so an interrupted write leaves an empty slot
+        os.pwrite(self._fd, _SLOT_HEADER.pack(_SLOT_EMPTY, expires_at) + packed, offset)
+        os.pwrite(self._fd, struct.pack("<d", state), offset)
+        return True
+
+    def invalidate(self, date: str) -> None:
+        offset = self._offset(date)
+        if offset is None:
+            return
+
+        self._open()
+        if os.fstat(self._fd).st_size >= offset + self.slot_size:
+            os.pwrite(self._fd, struct.pack("<d", _SLOT_EMPTY), offset)
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class ExchangeRateCache:
+    def __init__(
+        self,
+        table_name: str,
+        max_entries: int = None,
+        directory: str = None,
+        today_ttl: float = None,
+        missing_ttl: float = None,
+        disk: bool = None,
+    ) -> None:
+        """
+        A two-tier cache of exchange rate items: an LRU dictionary in memory
+        and a memory-mapped file under /tmp. Both outlive an invocation, the
+        file also outlives the process within the same execution environment.
+
+        Past dates never change once stored, so they are kept until written
+        through the repository. Today's (and future) entries may still be
+        refreshed and dates without an entry may be backfilled, so those
+        expire after a TTL.
+
+        Args:
+            table_name (str): The table whose items are cached.
+            max_entries (int): Most dates kept in memory (EXCHANGE_RATE_CACHE_MAX_ENTRIES, default 4096).
+            directory (str): Where the disk tier lives (EXCHANGE_RATE_CACHE_DIR, default /tmp/exchange_rate_cache).
+            today_ttl (float): Seconds today's entries are kept (EXCHANGE_RATE_CACHE_TODAY_TTL, default 300).
+            missing_ttl (float): Seconds a missing past date is remembered (EXCHANGE_RATE_CACHE_MISSING_TTL, default 3600).
+            disk (bool): Whether the disk tier is used (defaults to EXCHANGE_RATE_CACHE being "disk").
+        """
+        self.table_name = table_name
+        self.max_entries = max_entries or int(os.getenv("EXCHANGE_RATE_CACHE_MAX_ENTRIES", "4096"))
+        self.today_ttl = today_ttl if today_ttl is not None else float(
+            os.getenv("EXCHANGE_RATE_CACHE_TODAY_TTL", "300")
+        )
+        self.missing_ttl = missing_ttl if missing_ttl is not None else float(
+            os.getenv("EXCHANGE_RATE_CACHE_MISSING_TTL", "3600")
+        )
+
+        if disk is None:
+            disk = get_cache_mode() == "disk"
+        self.disk = None
+        if disk:
+            directory = directory or os.getenv("EXCHANGE_RATE_CACHE_DIR", "/tmp/exchange_rate_cache")
+            self.disk = DiskRateTier(
+                os.path.join(directory, f"{table_name}.{PACKED_ENCODING}.{len(CURRENCY_CODES)}.bin")
+            )
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expires_at(self, date: str, item, now: float) -> float:
+        today = datetime.now().date().isoformat()
+        if date >= today:
+            return now + self.today_ttl
+        if item is MISSING:
+            return now + self.missing_ttl
+        return 0.0
+
+    def get(self, date: str, now: float = None):
+        """
+        Returns the cached item of a date, MISSING if the date is known to
+        have no entry, or None on a cache miss.
+        """
+        now = now if now is not None else time.time()
+
+        with self._lock:
+            entry = self._entries.get(date)
+            if entry is not None:
+                item, expires_at = entry
+                if not expires_at or expires_at > now:
+                    self._entries.move_to_end(date)
+                    get_metrics().increment("rates.cache.memory_hits")
+                    return item
+                del self._entries[date]
+
+            if self.disk is not None:
+                item = self.disk.get(date, now)
+                if item is not None:
+                    get_metrics().increment("rates.cache.disk_hits")
+                    self._remember(date, item, self._expires_at(date, item, now))
+                    return item
+
+        get_metrics().increment("rates.cache.misses")
+        return None
+
+    def _remember(self, date: str, item, expires_at: float) -> None:
+        self._entries[date] = (item, expires_at)
+        self._entries.move_to_end(date)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def put(self, date: str, item, now: float = None) -> None:
+        """
+        Caches the item read for a date, or MISSING if it has no entry.
+        """
+        now = now if now is not None else time.time()
+        expires_at = self._expires_at(date, item, now)
+
+        with self._lock:
+            self._remember(date, item, expires_at)
+            if self.disk is not None:
+                self.disk.put(date, item, expires_at)
+
+    def invalidate(self, date: str) -> None:
+        with self._lock:
+            self._entries.pop(date, None)
+            if self.disk is not None:
+                self.disk.invalidate(date)
+
+    def clear(self) -> None:
+        """
+        Drops the memory tier and deletes the disk tier's file.
+        """
+        with self._lock:
+            self._entries.clear()
+            if self.disk is not None:
+                self.disk.close()
+                if os.path.exists(self.disk.path):
+                    os.remove(self.disk.path)
+
+
+# Kept at module level so warm invocations reuse them
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_exchange_rate_cache(table_name: str) -> ExchangeRateCache:
+    """
+    Returns the process-wide cache of a table, creating it on first use.
+    """
+    with _caches_lock:
+        cache = _caches.get(table_name)
+        if cache is None:
+            cache = _caches[table_name] = ExchangeRateCache(table_name)
+        return cache
+
+
+def clear_exchange_rate_caches() -> None:
+    with _caches_lock:
+        for cache in _caches.values():
+            cache.clear()
+        _caches.clear()
+
+
+class CachedExchangeRateRepository(ExchangeRateRepository):
+    """
+    An ExchangeRateRepository that reads dates through an ExchangeRateCache.
+
+    Reads by date are answered from the cache and only the remaining dates
+    reach DynamoDB. Every write through this repository invalidates the dates
+    it touched. Items served by the disk tier hold Date, BaseCurrency and
+    Rates only; use get_next_update_unix for the provider metadata.
+    """
+
+    def __init__(self, table_name: str, *args, cache: ExchangeRateCache = None, **kwargs) -> None:
+        super().__init__(table_name, *args, **kwargs)
+        self.cache = cache or get_exchange_rate_cache(table_name)
+
+    def get_exchange_rate_by_date(self, date: str):
+        item = self.cache.get(date)
+        if item is not None:
+            return None if item is MISSING else item
+
+        item = super().get_exchange_rate_by_date(date)
+        self.cache.put(date, MISSING if item is None else item)
+        return item
+
+    def get_exchange_rates_by_dates(self, dates) -> dict:
+        items = {}
+        uncached_dates = []
+        for date in dict.fromkeys(dates):
+            item = self.cache.get(date)
+            if item is None:
+                uncached_dates.append(date)
+            elif item is not MISSING:
+                items[date] = item
+
+        if uncached_dates:
+            fetched = super().get_exchange_rates_by_dates(uncached_dates)
+            for date in uncached_dates:
+                self.cache.put(date, fetched.get(date, MISSING))
+            items.update(fetched)
+
+        return items
+
+    def get_projected_rates(self, date: str, currencies: list) -> dict:
+        item = self.get_exchange_rate_by_date(date)
+        if item is None:
+            return None
+
+        rates = item.get("Rates") or {}
+        pairs = [self._pair(currency) for currency in currencies]
+        return {pair: rates[pair] for pair in pairs if pair in rates}
+
+    def post_exchange_rate(self, exchange_rate) -> bool:
+        try:
+            return super().post_exchange_rate(exchange_rate)
+        finally:
+            self.cache.invalidate(exchange_rate.date)
+
+    def post_exchange_rates(self, exchange_rates: list, max_workers: int = 1) -> int:
+        try:
+            return super().post_exchange_rates(exchange_rates, max_workers)
+        finally:
+            for exchange_rate in exchange_rates:
+                self.cache.invalidate(exchange_rate.date)
+
+    def upsert_exchange_rate(self, date: str, currency: str, rate: float, condition=None) -> bool:
+        try:
+            return super().upsert_exchange_rate(date, currency, rate, condition)
+        finally:
+            self.cache.invalidate(date)
+
+    def remove_exchange_rate(self, date: str, currency: str, condition=None) -> bool:
+        # Also covers delete_exchange_rate, which removes through this method
+        try:
+            return super().remove_exchange_rate(date, currency, condition)
+        finally:
+            self.cache.invalidate(date)
+
+
+def build_exchange_rate_repository(table_name: str, **kwargs) -> ExchangeRateRepository:
+    """
+    Returns a cached repository unless EXCHANGE_RATE_CACHE is "off".
+    """
+    if get_cache_mode() == "off":
+        return ExchangeRateRepository(table_name, **kwargs)
+    return CachedExchangeRateRepository(table_name, **kwargs)
@@ -0,0 +1,168 @@
+import threading
+from bisect import bisect_right, insort
+from datetime import date as date_type
+from typing import Optional, Tuple
+
+
+class ExchangeRateIndex:
+    def __init__(self, base_currency: str = "USD", max_staleness_days: int = 0) -> None:
+        """
+        In-memory exchange rates held as sorted date arrays per currency.
+
+        Answers exact lookups and "nearest previous available date" lookups
+        with bisect, so resolving a rate never needs a DynamoDB read once the
+        relevant dates are loaded.
+
+        Args:
+            base_currency (str): The currency the rates are quoted against.
+            max_staleness_days (int): How many days back a lookup may fall back
+                to when the exact date has no rate. 0 means exact dates only.
+        """
+        self.base_currency = base_currency
+        self.max_staleness_days = max_staleness_days
+        self.loaded_dates = set()
+        self.fully_loaded = False
+        self._snapshots = {}
+        self._snapshot_dates = []
+        self._dates = {}
+        self._values = {}
+        self._lock = threading.Lock()
+        # Held by loaders so concurrent users of a shared index don't fetch the same dates
+        self.fetch_lock = threading.Lock()
+
+    @classmethod
+    def from_items(cls, items, **kwargs) -> "ExchangeRateIndex":
+        """
+        Builds an index from exchange rate items as stored in DynamoDB.
+
+        Args:
+            items (iterable): Items with "Date" and "Rates" attributes.
+        """
+        index = cls(**kwargs)
+        index.add_items(items)
+        return index
+
+    def add_items(self, items) -> None:
+        """
+        Adds exchange rate items as stored in DynamoDB.
+
+        Args:
+            items (iterable): Items with "Date" and "Rates" attributes.
+        """
+        for item in items:
+            self.add(item["Date"], item.get("Rates") or {})
+
+    def add(self, date: str, rates: dict) -> None:
+        """
+        Adds or replaces the rates of a date.
+
+        Args:
+            date (str): The date in YYYY-MM-DD format.
+            rates (dict): The rates keyed as "CUR/USD".
+        """
+        with self._lock:
+            self.loaded_dates.add(date)
+            if date not in self._snapshots:
+                insort(self._snapshot_dates, date)
+            self._snapshots[date] = dict(rates)
+
+            for pair, rate in rates.items():
+                dates = self._dates.setdefault(pair, [])
+                values = self._values.setdefault(pair, [])
+                position = bisect_right(dates, date)
+
+                if position and dates[position - 1] == date:
+                    values[position - 1] = rate
+                else:
+                    dates.insert(position, date)
+                    values.insert(position, rate)
+
+    def mark_missing(self, dates) -> None:
+        """
+        Records dates that were looked up and have no stored entry.
+        """
+        with self._lock:
+            self.loaded_dates.update(dates)
+
+    def snapshot(self, date: str) -> Optional[dict]:
+        """
+        Returns every rate stored for an exact date, or None.
+        """
+        with self._lock:
+            return self._snapshots.get(date)
+
+    def _within_staleness(self, found_date: str, date: str, max_staleness_days: int = None) -> bool:
+        if found_date == date:
+            return True
+        if max_staleness_days is None:
+            max_staleness_days = self.max_staleness_days
+
+        staleness = (date_type.fromisoformat(date) - date_type.fromisoformat(found_date)).days
+        return staleness <= max_staleness_days
+
+    def resolve_snapshot(
+        self, date: str, max_staleness_days: int = None
+    ) -> Tuple[Optional[str], Optional[dict]]:
+        """
+        Finds the snapshot stored for a date or the nearest previous date.
+
+        Args:
+            date (str): The date in YYYY-MM-DD format.
+            max_staleness_days (int): Overrides the index's maximum staleness.
+
+        Returns:
+            tuple: The date the snapshot was stored for and its rates, or (None, None).
+        """
+        # Read under the lock: add() updates the dates and snapshots in two steps
+        with self._lock:
+            position = bisect_right(self._snapshot_dates, date) - 1
+            if position < 0:
+                return None, None
+
+            found_date = self._snapshot_dates[position]
+            snapshot = self._snapshots[found_date]
+
+        if not self._within_staleness(found_date, date, max_staleness_days):
+            return None, None
+
+        return found_date, snapshot
+
+    def resolve(
+        self, currency: str, date: str, max_staleness_days: int = None
+    ) -> Tuple[Optional[float], Optional[str]]:
+        """
+        Finds the rate of a currency on a date or the nearest previous date.
+
+        Args:
+            currency (str): The currency code.
+            date (str): The date in YYYY-MM-DD format.
+            max_staleness_days (int): Overrides the index's maximum staleness.
+
+        Returns:
+            tuple: The rate and the date it was stored for, or (None, None).
+        """
+        pair = f"{currency}/{self.base_currency}"
+        # Read under the lock: add() inserts into the dates and values lists in two steps
+        with self._lock:
+            dates = self._dates.get(pair)
+            if not dates:
+                return None, None
+
+            position = bisect_right(dates, date) - 1
+            if position < 0:
+                return None, None
+
+            found_date = dates[position]
+            rate = self._values[pair][position]
+
+        if not self._within_staleness(found_date, date, max_staleness_days):
+            return None, None
+
+        return rate, found_date
+
+    def get_rate(self, currency: str, date: str, max_staleness_days: int = None):
+        """
+        Returns the rate of a currency on a date, falling back to the nearest
+        previous date within the maximum staleness, or None.
+        """
+        return self.resolve(currency, date, max_staleness_days)[0]
@@ -1,12 +1,84 @@
-import boto3
-from src.entity.exchange_rate_entity import ExchangeRateEntity
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from functools import cached_property
+
+from src.entity.exchange_rate_entity import (
+    ExchangeRateEntity,
+    PackedRates,
+    decode_rates,
+    pack_rates,
+)
+from src.entity.exchange_rate_rollup_entity import (
+    ExchangeRateRollupEntity,
+    is_rollup_key,
+    rollup_key,
+    rollup_periods,
+)
+from src.libs.client_registry import get_dynamodb_resource, get_dynamodb_table
+from src.libs.metrics import timed
+from src.repository.exchange_rate_index import ExchangeRateIndex
+
+BATCH_GET_MAX_KEYS = 100
+BATCH_WRITE_MAX_ITEMS = 25
+# GSI with BaseCurrency as partition key and Date as sort key (projection ALL)
+SERIES_INDEX_NAME = "BaseCurrency-Date-index"
 
 
 class ExchangeRateRepository:
-    def __init__(self, table_name: str, region_name: str = "us-east-1") -> None:
-        self.dynamodb = boto3.resource("dynamodb", region_name=region_name)
-        self.table = self.dynamodb.Table(table_name)
+    def __init__(
+        self,
+        table_name: str,
+        region_name: str = "us-east-1",
+        max_batch_retries: int = 5,
+        storage_format: str = None,
+        series_index_name: str = None,
+        maintain_rollups: bool = None,
+    ) -> None:
+        self.table_name = table_name
+        self.region_name = region_name
+        self.max_batch_retries = max_batch_retries
+        # "map" stores Rates as a DynamoDB map, "packed" as a float64 Binary.
+        # Both formats are always readable.
+        self.storage_format = storage_format or os.getenv(
+            "EXCHANGE_RATE_STORAGE_FORMAT", "map"
+        )
+        # Range and rollup reads query this index (EXCHANGE_RATE_SERIES_INDEX)
+        self.series_index_name = series_index_name or os.getenv(
+            "EXCHANGE_RATE_SERIES_INDEX", SERIES_INDEX_NAME
+        )
+        # Whether writes keep the monthly and yearly rollups up to date
+        # (EXCHANGE_RATE_ROLLUPS, off by default since they need the series index)
+        if maintain_rollups is None:
+            maintain_rollups = os.getenv("EXCHANGE_RATE_ROLLUPS", "off").lower() == "on"
+        self.maintain_rollups = maintain_rollups
+        self._series_index_checked = False
+
+    @cached_property
+    def dynamodb(self):
+        # The boto3 resource is built on first use to keep construction cheap
+        return get_dynamodb_resource(self.region_name)
+
+    @cached_property
+    def table(self):
+        return get_dynamodb_table(self.table_name, self.region_name)
+
+    def _serialize(self, exchange_rate: ExchangeRateEntity) -> dict:
+        if self.storage_format == "packed":
+            return exchange_rate.to_packed_dict()
+        return exchange_rate.to_dict()
+
+    def _deserialize(self, item: dict):
+        # Exposes packed items with a regular "Rates" mapping, like map items
+        if item is None or item.get("RatesPacked") is None:
+            return item
+        return {**item, "Rates": decode_rates(item)}
+
+    def _backoff(self, attempt: int) -> None:
+        time.sleep(min(0.05 * (2**attempt), 2.0))
 
+    @timed("repository.get_exchange_rate_by_date")
     def get_exchange_rate_by_date(self, date: str):
         """
         Retrieves the exchange rate entry for a specific date.
@@ -19,8 +91,256 @@ class ExchangeRateRepository:
         """
         response = self.table.get_item(Key={"Date": date})
 
-        return response.get("Item")
+        return self._deserialize(response.get("Item"))
+
+    @timed("repository.get_exchange_rates_by_dates")
+    def get_exchange_rates_by_dates(self, dates) -> dict:
+        """
+        Retrieves the exchange rate entries for several dates using BatchGetItem.
+
+        Keys are requested in chunks of 100 (the BatchGetItem limit) and any
+        UnprocessedKeys are retried with exponential backoff.
+
+        Args:
+            dates (iterable): The dates in YYYY-MM-DD format to retrieve.
+
+        Returns:
+            dict: A dictionary mapping each found date to its exchange rate entry.
+                Dates without an entry are omitted.
+        """
+        unique_dates = list(dict.fromkeys(dates))
+        items = {}
+
+        for start in range(0, len(unique_dates), BATCH_GET_MAX_KEYS):
+            chunk = unique_dates[start : start + BATCH_GET_MAX_KEYS]
+            request_items = {
+                self.table_name: {"Keys": [{"Date": date} for date in chunk]}
+            }
+
+            attempt = 0
+            while request_items:
+                response = self.dynamodb.batch_get_item(RequestItems=request_items)
+
+                for item in response.get("Responses", {}).get(self.table_name, []):
+                    items[item["Date"]] = self._deserialize(item)
+
+                request_items = response.get("UnprocessedKeys") or {}
+                if request_items:
+                    attempt += 1
+                    if attempt > self.max_batch_retries:
+                        raise Exception(
+                            f"Failed to fetch exchange rates after {self.max_batch_retries} retries"
+                        )
+                    self._backoff(attempt)
+
+        return items
+
+    @timed("repository.scan_exchange_rates")
+    def scan_exchange_rates(self, start_date: str = None, end_date: str = None) -> list:
+        """
+        Retrieves every exchange rate entry, following the scan pagination.
+
+        Rollup items are skipped.
+
+        Args:
+            start_date (str): Optional first date to keep, in YYYY-MM-DD format.
+            end_date (str): Optional last date to keep, in YYYY-MM-DD format.
+
+        Returns:
+            list: The exchange rate entries.
+        """
+        from boto3.dynamodb.conditions import Attr
+
+        scan_kwargs = {}
+        if start_date and end_date:
+            scan_kwargs["FilterExpression"] = Attr("Date").between(start_date, end_date)
+        elif start_date:
+            scan_kwargs["FilterExpression"] = Attr("Date").gte(start_date)
+        elif end_date:
+            scan_kwargs["FilterExpression"] = Attr("Date").lte(end_date)
+
+        items = []
+        while True:
+            response = self.table.scan(**scan_kwargs)
+            items.extend(
+                self._deserialize(item)
+                for item in response.get("Items", [])
+                if not is_rollup_key(item["Date"])
+            )
+
+            if "LastEvaluatedKey" not in response:
+                return items
+            scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
 
+    @timed("repository.build_rate_index")
+    def build_rate_index(
+        self, start_date: str = None, end_date: str = None, max_staleness_days: int = 0
+    ) -> ExchangeRateIndex:
+        """
+        Loads the stored exchange rates into a sorted in-memory index.
+
+        Args:
+            start_date (str): Optional first date to load, in YYYY-MM-DD format.
+            end_date (str): Optional last date to load, in YYYY-MM-DD format.
+            max_staleness_days (int): How far back lookups may fall back.
+
+        Returns:
+            ExchangeRateIndex: The index of the loaded rates.
+        """
+        index = ExchangeRateIndex.from_items(
+            self.scan_exchange_rates(start_date, end_date),
+            max_staleness_days=max_staleness_days,
+        )
+        index.fully_loaded = start_date is None and end_date is None
+
+        return index
+
+    def _query_series(self, **query_kwargs) -> list:
+        # One Query on the series index, following its pagination
+        items = []
+        while True:
+            response = self.table.query(IndexName=self.series_index_name, **query_kwargs)
+            items.extend(response.get("Items", []))
+
+            if "LastEvaluatedKey" not in response:
+                return items
+            query_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    @timed("repository.get_rate_series")
+    def get_rate_series(
+        self, currency: str, start_date: str, end_date: str, base_currency: str = "USD"
+    ) -> list:
+        """
+        Retrieves the daily rates of a currency over a date range.
+
+        The range is read with a single Query on the series index
+        (BaseCurrency, Date), projected to the requested currency.
+
+        Args:
+            currency (str): The currency to retrieve.
+            start_date (str): The first date, in YYYY-MM-DD format.
+            end_date (str): The last date, in YYYY-MM-DD format.
+            base_currency (str): The base currency of the rates.
+
+        Returns:
+            list: (date, rate) tuples in date order. Dates without a rate for
+                the currency are omitted.
+        """
+        from boto3.dynamodb.conditions import Key
+
+        pair = f"{currency}/{base_currency}"
+        items = self._query_series(
+            KeyConditionExpression=Key("BaseCurrency").eq(base_currency)
+            & Key("Date").between(start_date, end_date),
+            ProjectionExpression="#date, BaseCurrency, RatesPacked, #rates.#pair",
+            ExpressionAttributeNames={"#date": "Date", "#rates": "Rates", "#pair": pair},
+        )
+
+        series = []
+        for item in items:
+            rate = (self._deserialize(item).get("Rates") or {}).get(pair)
+            if rate is not None:
+                series.append((item["Date"], rate))
+
+        return series
+
+    @timed("repository.get_rate_rollups")
+    def get_rate_rollups(
+        self,
+        currency: str,
+        granularity: str,
+        start_period: str,
+        end_period: str,
+        base_currency: str = "USD",
+    ) -> list:
+        """
+        Retrieves the monthly or yearly average, minimum and maximum of a currency.
+
+        The rollups are read with a single Query on the series index,
+        projected to the requested currency.
+
+        Args:
+            currency (str): The currency to retrieve.
+            granularity (str): "month" or "year".
+            start_period (str): The first period (YYYY-MM for months, YYYY for years).
+            end_period (str): The last period.
+            base_currency (str): The base currency of the rates.
+
+        Returns:
+            list: Dictionaries with Period, Count, Average, Min and Max, in
+                period order. Periods without a rate for the currency are omitted.
+        """
+        from boto3.dynamodb.conditions import Key
+
+        pair = f"{currency}/{base_currency}"
+        items = self._query_series(
+            KeyConditionExpression=Key("BaseCurrency").eq(base_currency)
+            & Key("Date").between(
+                rollup_key(granularity, start_period), rollup_key(granularity, end_period)
+            ),
+            ProjectionExpression="#date, BaseCurrency, Granularity, Period, #stats.#pair",
+            ExpressionAttributeNames={"#date": "Date", "#stats": "Stats", "#pair": pair},
+        )
+
+        summaries = [ExchangeRateRollupEntity.from_dict(item).summary(pair) for item in items]
+        return [summary for summary in summaries if summary is not None]
+
+    @timed("repository.get_next_update_unix")
+    def get_next_update_unix(self, date: str):
+        """
+        Retrieves when the provider of a date's entry publishes its next update.
+
+        Only the NextUpdateUnix attribute is read, so the check stays cheap
+        regardless of how many currencies the entry holds.
+
+        Args:
+            date (str): The date in YYYY-MM-DD format.
+
+        Returns:
+            int: The Unix time of the next update, or None if the date has no
+                entry or the entry does not record it.
+        """
+        response = self.table.get_item(Key={"Date": date}, ProjectionExpression="NextUpdateUnix")
+        next_update_unix = response.get("Item", {}).get("NextUpdateUnix")
+
+        return int(next_update_unix) if next_update_unix is not None else None
+
+    def _pair(self, currency: str) -> str:
+        return f"{currency}/USD"
+
+    @timed("repository.get_projected_rates")
+    def get_projected_rates(self, date: str, currencies: list) -> dict:
+        """
+        Retrieves only the requested currencies of a date's entry.
+
+        A ProjectionExpression limits the read to the requested keys of the
+        Rates map, so the payload does not grow with the number of stored
+        currencies.
+
+        Args:
+            date (str): The date in YYYY-MM-DD format.
+            currencies (list): The currencies to retrieve.
+
+        Returns:
+            dict: The stored rates keyed as "CUR/USD", or None if the date has no entry.
+        """
+        names = {"#rates": "Rates"}
+        paths = ["RatesPacked", "BaseCurrency"]
+        for position, currency in enumerate(currencies):
+            names[f"#p{position}"] = self._pair(currency)
+            paths.append(f"#rates.#p{position}")
+
+        response = self.table.get_item(
+            Key={"Date": date},
+            ProjectionExpression=", ".join(paths),
+            ExpressionAttributeNames=names,
+        )
+
+        if "Item" not in response:
+            return None
+        return self._deserialize(response["Item"]).get("Rates") or {}
+
+    @timed("repository.get_exchange_rate_by_currency")
     def get_exchange_rate_by_currency(self, date: str, currency: str):
         """
         Retrieves the exchange rate for a specific currency on a specific date.
@@ -32,12 +352,13 @@ class ExchangeRateRepository:
         Returns:
             float: The exchange rate for the specified currency or None if not found.
         """
-        rates = self.get_exchange_rate_by_date(date)
+        rates = self.get_projected_rates(date, [currency])
 
         if rates:
-            return rates.get("Rates", {}).get(f"{currency}/USD")
+            return rates.get(self._pair(currency))
         return None
 
+    @timed("repository.get_exchange_rate_by_currencies")
     def get_exchange_rate_by_currencies(self, date: str, currencies: list):
         """
         Retrieves exchange rates for multiple currencies on a specific date.
@@ -49,33 +370,398 @@ class ExchangeRateRepository:
         Returns:
             dict: A dictionary of exchange rates for the specified currencies.
         """
-        rates = self.get_exchange_rate_by_date(date)
+        rates = self.get_projected_rates(date, currencies)
 
-        if rates:
-            rates_dict = rates.get("Rates", {})
-            return {
-                currency: rates_dict.get(f"{currency}/USD") for currency in currencies
-            }
+        if rates is not None:
+            return {currency: rates.get(self._pair(currency)) for currency in currencies}
         return {}
 
+    @timed("repository.post_exchange_rate")
     def post_exchange_rate(self, exchange_rate: ExchangeRateEntity):
         """
         Adds a new exchange rate entry to DynamoDB using an ExchangeRateEntity instance.
 
+        The monthly and yearly rollups of the date are updated incrementally
+        with the entry it replaced.
+
         Args:
             exchange_rate (ExchangeRateEntity): The entity containing exchange rate data.
 
         Returns:
             bool: True if the operation was successful, False otherwise.
         """
+        self._check_series_index()
         try:
-            self.table.put_item(Item=exchange_rate.to_dict())
+            response = self.table.put_item(
+                Item=self._serialize(exchange_rate), ReturnValues="ALL_OLD"
+            )
+        except Exception as e:
+            print(f"Error posting exchange rate: {e}")
+            return False
 
+        # The replaced entry comes back with the write, so rollups can take it out
+        old_item = self._deserialize(response.get("Attributes"))
+        self._update_rollups(
+            {exchange_rate.date: ((old_item or {}).get("Rates"), exchange_rate.rates)},
+            exchange_rate.base_currency,
+        )
+        return True
+
+    def _period_rates(self, base_currency: str, period: str) -> dict:
+        from boto3.dynamodb.conditions import Key
+
+        items = self._query_series(
+            KeyConditionExpression=Key("BaseCurrency").eq(base_currency)
+            & Key("Date").begins_with(period),
+            ProjectionExpression="#date, BaseCurrency, Rates, RatesPacked",
+            ExpressionAttributeNames={"#date": "Date"},
+        )
+        return {item["Date"]: self._deserialize(item).get("Rates") for item in items}
+
+    def _put_rollup(self, rollup: ExchangeRateRollupEntity, expected_version) -> bool:
+        from boto3.dynamodb.conditions import Attr
+
+        conditional_check_failed = self.dynamodb.meta.client.exceptions.ConditionalCheckFailedException
+        if expected_version is None:
+            condition = Attr("Date").not_exists()
+        else:
+            condition = Attr("Version").eq(expected_version)
+
+        try:
+            self.table.put_item(Item=rollup.to_dict(), ConditionExpression=condition)
             return True
+        except conditional_check_failed:
+            return False
+
+    def _update_rollup(
+        self, granularity: str, period: str, base_currency: str, changes: dict, recompute: bool
+    ) -> None:
+        key = rollup_key(granularity, period)
+
+        for attempt in range(self.max_batch_retries + 1):
+            item = self.table.get_item(Key={"Date": key}, ConsistentRead=True).get("Item")
+            expected_version = int(item["Version"]) if item else None
+
+            rollup = None
+            if item is not None and not recompute:
+                rollup = ExchangeRateRollupEntity.from_dict(item)
+                if not all(rollup.apply(old_rates, new_rates) for old_rates, new_rates in changes.values()):
+                    rollup = None
+
+            if rollup is None:
+                rates_by_date = self._period_rates(base_currency, period)
+                # The index is eventually consistent, so the changed dates are
+                # taken from the write rather than from the query
+                for date, (_, new_rates) in changes.items():
+                    if new_rates:
+                        rates_by_date[date] = new_rates
+                    else:
+                        rates_by_date.pop(date, None)
+                rollup = ExchangeRateRollupEntity.from_rates(
+                    granularity, period, rates_by_date, base_currency
+                )
+
+            rollup.version = (expected_version or 0) + 1
+            if self._put_rollup(rollup, expected_version):
+                return
+            self._backoff(attempt + 1)
+
+        raise Exception(f"Failed to update the {key} rollup after {self.max_batch_retries} retries")
+
+    def _check_series_index(self) -> None:
+        """
+        Fails when rollups are maintained but the table lacks the series index.
+
+        Rollups are recomputed from Queries on the index, so writing without
+        it would silently leave them wrong. The table is described once per
+        repository.
+        """
+        if not self.maintain_rollups or self._series_index_checked:
+            return
+
+        table = self.dynamodb.meta.client.describe_table(TableName=self.table_name)["Table"]
+        index_names = {index["IndexName"] for index in table.get("GlobalSecondaryIndexes", [])}
+        if self.series_index_name not in index_names:
+            raise Exception(
+                f"EXCHANGE_RATE_ROLLUPS is on but table {self.table_name} has no "
+                f"{self.series_index_name} index"
+            )
+        self._series_index_checked = True
+
+    def _update_rollups(self, changes: dict, base_currency: str, recompute: bool = False) -> None:
+        """
+        Brings the monthly and yearly rollups of the changed dates up to date.
+
+        Each rollup is updated from the changes alone when possible, and
+        recomputed from its period's entries otherwise. Rollups are derived
+        data, so a failure is reported without failing the write.
+
+        Args:
+            changes (dict): (old rates, new rates) by changed date.
+            base_currency (str): The base currency of the rates.
+            recompute (bool): Whether to recompute instead of applying the changes.
+        """
+        if not self.maintain_rollups:
+            return
+
+        changes_by_period = {}
+        for date, change in changes.items():
+            for granularity, period in rollup_periods(date):
+                changes_by_period.setdefault((granularity, period), {})[date] = change
+
+        try:
+            for (granularity, period), period_changes in changes_by_period.items():
+                self._update_rollup(granularity, period, base_currency or "USD", period_changes, recompute)
         except Exception as e:
-            print(f"Error posting exchange rate: {e}")
+            print(f"Error updating exchange rate rollups: {e}")
+
+    def _refresh_rollups(self, date: str) -> None:
+        if not self.maintain_rollups:
+            return
+
+        item = self._deserialize(self.table.get_item(Key={"Date": date}, ConsistentRead=True).get("Item"))
+        item = item or {}
+        self._update_rollups(
+            {date: (None, item.get("Rates"))}, item.get("BaseCurrency"), recompute=True
+        )
+
+    @timed("repository.rebuild_rollups")
+    def rebuild_rollups(self, start_date: str, end_date: str, base_currency: str = "USD") -> int:
+        """
+        Recomputes the rollups of every month and year overlapping a date range,
+        e.g. after entries were written without maintaining them.
+
+        Args:
+            start_date (str): The first date, in YYYY-MM-DD format.
+            end_date (str): The last date, in YYYY-MM-DD format.
+            base_currency (str): The base currency of the rates.
+
+        Returns:
+            int: The number of rollups recomputed.
+        """
+        self._check_series_index()
+        periods = set()
+        for year in range(int(start_date[:4]), int(end_date[:4]) + 1):
+            periods.add(("year", str(year)))
+            for month in range(1, 13):
+                period = f"{year}-{month:02d}"
+                if start_date[:7] <= period <= end_date[:7]:
+                    periods.add(("month", period))
+
+        for granularity, period in sorted(periods):
+            self._update_rollup(granularity, period, base_currency, {}, recompute=True)
+
+        return len(periods)
+
+    def _write_batch(self, items: list) -> int:
+        request_items = {
+            self.table_name: [{"PutRequest": {"Item": item}} for item in items]
+        }
+
+        attempt = 0
+        while request_items:
+            response = self.dynamodb.batch_write_item(RequestItems=request_items)
+
+            request_items = response.get("UnprocessedItems") or {}
+            if request_items:
+                attempt += 1
+                if attempt > self.max_batch_retries:
+                    raise Exception(
+                        f"Failed to write exchange rates after {self.max_batch_retries} retries"
+                    )
+                self._backoff(attempt)
+
+        return len(items)
+
+    @timed("repository.post_exchange_rates")
+    def post_exchange_rates(self, exchange_rates: list, max_workers: int = 1) -> int:
+        """
+        Adds many exchange rate entries to DynamoDB using BatchWriteItem.
+
+        Entries are written in chunks of 25 (the BatchWriteItem limit) and any
+        UnprocessedItems are retried with exponential backoff.
+
+        Args:
+            exchange_rates (list): The ExchangeRateEntity instances to write.
+            max_workers (int): The number of chunks written concurrently.
+
+        Returns:
+            int: The number of entries written.
+        """
+        self._check_series_index()
+        # BatchWriteItem rejects duplicate keys within a request, so keep the last entry per date
+        items = list({entity.date: self._serialize(entity) for entity in exchange_rates}.values())
+        chunks = [
+            items[start : start + BATCH_WRITE_MAX_ITEMS]
+            for start in range(0, len(items), BATCH_WRITE_MAX_ITEMS)
+        ]
+
+        if max_workers <= 1:
+            written = sum(self._write_batch(chunk) for chunk in chunks)
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                written = sum(executor.map(self._write_batch, chunks))
+
+        # BatchWriteItem cannot return the replaced entries, so the affected
+        # rollups are recomputed once per period
+        changes_by_base = {}
+        for entity in exchange_rates:
+            changes_by_base.setdefault(entity.base_currency, {})[entity.date] = (None, entity.rates)
+        for base_currency, changes in changes_by_base.items():
+            self._update_rollups(changes, base_currency, recompute=True)
+
+        return written
+
+    @timed("repository.upsert_exchange_rate")
+    def upsert_exchange_rate(
+        self, date: str, currency: str, rate: float, condition=None
+    ) -> bool:
+        """
+        Sets a single currency rate on a date's entry with one UpdateExpression.
+
+        Other currencies stored for the date are left untouched, so concurrent
+        writers of different currencies do not overwrite each other. Only the
+        first write to a date without a Rates map needs a second request. The
+        date's monthly and yearly rollups are then recomputed.
+
+        Args:
+            date (str): The date in YYYY-MM-DD format.
+            currency (str): The currency to set.
+            rate (float): The rate of the currency (units per USD).
+            condition: Optional boto3 condition (e.g. `Attr("BaseCurrency").eq("USD")`)
+                that must hold for the write to happen.
+
+        Returns:
+            bool: True if the rate was written, False if the condition failed.
+        """
+        self._check_series_index()
+        written = self._set_rate(date, currency, rate, condition)
+        if written:
+            self._refresh_rollups(date)
+        return written
+
+    def _set_rate(self, date: str, currency: str, rate: float, condition=None) -> bool:
+        from boto3.dynamodb.conditions import Attr
+
+        conditional_check_failed = self.dynamodb.meta.client.exceptions.ConditionalCheckFailedException
+        names = {"#rates": "Rates", "#pair": self._pair(currency)}
+        values = {":rate": Decimal(str(rate)), ":base": "USD"}
+
+        update_condition = Attr("Rates").exists()
+        if condition is not None:
+            update_condition = update_condition & condition
+
+        try:
+            self.table.update_item(
+                Key={"Date": date},
+                UpdateExpression="SET #rates.#pair = :rate, BaseCurrency = if_not_exists(BaseCurrency, :base)",
+                ConditionExpression=update_condition,
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues=values,
+            )
+            return True
+        except conditional_check_failed:
+            pass
+
+        # The entry (or its Rates map) does not exist yet: create the map
+        create_condition = Attr("Rates").not_exists()
+        if condition is not None:
+            create_condition = create_condition & condition
+
+        try:
+            self.table.update_item(
+                Key={"Date": date},
+                UpdateExpression="SET #rates = :rates, BaseCurrency = if_not_exists(BaseCurrency, :base)",
+                ConditionExpression=create_condition,
+                ExpressionAttributeNames={"#rates": "Rates"},
+                ExpressionAttributeValues={
+                    ":rates": {self._pair(currency): values[":rate"]},
+                    ":base": "USD",
+                },
+            )
+            return True
+        except conditional_check_failed:
+            # Either the user condition failed or another writer created the
+            # map in between; in the latter case the nested update now applies.
+            if condition is None:
+                return self._set_rate(date, currency, rate)
             return False
 
+    @timed("repository.remove_exchange_rate")
+    def remove_exchange_rate(self, date: str, currency: str, condition=None) -> bool:
+        """
+        Removes a single currency rate from a date's entry with one UpdateExpression.
+
+        For packed items whose currency lives in RatesPacked, the array is
+        rewritten with a condition on its previous value instead. The date's
+        monthly and yearly rollups are then recomputed.
+
+        Args:
+            date (str): The date in YYYY-MM-DD format.
+            currency (str): The currency to remove.
+            condition: Optional boto3 condition that must also hold.
+
+        Returns:
+            bool: True if the rate existed and was removed, False otherwise.
+        """
+        self._check_series_index()
+        written = self._remove_rate(date, currency, condition)
+        if written:
+            self._refresh_rollups(date)
+        return written
+
+    def _remove_rate(self, date: str, currency: str, condition=None) -> bool:
+        from boto3.dynamodb.conditions import Attr
+
+        conditional_check_failed = self.dynamodb.meta.client.exceptions.ConditionalCheckFailedException
+
+        remove_condition = Attr(f"Rates.{self._pair(currency)}").exists()
+        names = {"#rates": "Rates", "#pair": self._pair(currency)}
+        if condition is not None:
+            remove_condition = remove_condition & condition
+
+        try:
+            self.table.update_item(
+                Key={"Date": date},
+                UpdateExpression="REMOVE #rates.#pair",
+                ConditionExpression=remove_condition,
+                ExpressionAttributeNames=names,
+            )
+            return True
+        except conditional_check_failed:
+            pass
+
+        # Packed items may hold the currency in RatesPacked instead of the map
+        item = self.table.get_item(Key={"Date": date}).get("Item")
+        if not item or item.get("RatesPacked") is None:
+            return False
+
+        packed_rates = PackedRates(item["RatesPacked"], item.get("BaseCurrency") or "USD")
+        if self._pair(currency) not in packed_rates:
+            return False
+
+        remaining_rates = {
+            pair: rate for pair, rate in packed_rates.items() if pair != self._pair(currency)
+        }
+        packed, _ = pack_rates(remaining_rates, item.get("BaseCurrency") or "USD")
+
+        # Only replace the array if nobody rewrote it since it was read
+        rewrite_condition = Attr("RatesPacked").eq(item["RatesPacked"])
+        if condition is not None:
+            rewrite_condition = rewrite_condition & condition
+
+        try:
+            self.table.update_item(
+                Key={"Date": date},
+                UpdateExpression="SET RatesPacked = :packed",
+                ConditionExpression=rewrite_condition,
+                ExpressionAttributeValues={":packed": packed},
+            )
+            return True
+        except conditional_check_failed:
+            return False
+
+    @timed("repository.delete_exchange_rate")
     def delete_exchange_rate(self, date: str, currency: str):
         """
         Deletes a specific currency exchange rate from a given date's entry.
@@ -87,22 +773,9 @@ class ExchangeRateRepository:
         Returns:
             bool: True if successful, False otherwise.
         """
-        rates = self.get_exchange_rate_by_date(date)
-
-        if rates:
-            rates_dict = rates.get("Rates", {})
-            if f"{currency}/USD" in rates_dict:
-                del rates_dict[f"{currency}/USD"]
-
-                # Update the item in DynamoDB with the modified rates dictionary
-                try:
-                    self.table.update_item(
-                        Key={"Date": date},
-                        UpdateExpression="SET Rates = :r",
-                        ExpressionAttributeValues={":r": rates_dict},
-                    )
-                    return True
-                except Exception as e:
-                    print(f"Error deleting currency from exchange rate: {e}")
-                    return False
-        return False
+        self._check_series_index()
+        try:
+            return self.remove_exchange_rate(date, currency)
+        except Exception as e:
+            print(f"Error deleting currency from exchange rate: {e}")
+            return False
@@ -0,0 +1,131 @@
+import json
+import os
+import threading
+from functools import cached_property
+
+from src.libs.client_registry import get_dynamodb_table
+from src.libs.metrics import timed
+
+
+class SyncStateRepository:
+    def __init__(self, table_name: str, region_name: str = "us-east-1") -> None:
+        """
+        Stores small sync state documents (checkpoints, resume tokens) in DynamoDB.
+
+        The table uses `StateKey` (String) as its partition key.
+
+        Args:
+            table_name (str): The name of the table.
+            region_name (str): The AWS region of the table.
+        """
+        self.table_name = table_name
+        self.region_name = region_name
+
+    @cached_property
+    def table(self):
+        return get_dynamodb_table(self.table_name, self.region_name)
+
+    @timed("sync_state.get_state")
+    def get_state(self, key: str):
+        """
+        Retrieves the state stored under a key.
+
+        Args:
+            key (str): The state key.
+
+        Returns:
+            dict: The stored state or None if not found.
+        """
+        response = self.table.get_item(Key={"StateKey": key})
+
+        item = response.get("Item")
+        return json.loads(item["State"]) if item else None
+
+    @timed("sync_state.put_state")
+    def put_state(self, key: str, state: dict) -> bool:
+        """
+        Stores the state under a key, replacing any previous value.
+
+        Args:
+            key (str): The state key.
+            state (dict): A JSON-serialisable state document.
+
+        Returns:
+            bool: True if the operation was successful, False otherwise.
+        """
+        try:
+            self.table.put_item(Item={"StateKey": key, "State": json.dumps(state)})
+            return True
+        except Exception as e:
+            print(f"Error storing sync state {key}: {e}")
+            return False
+
+    @timed("sync_state.delete_state")
+    def delete_state(self, key: str) -> bool:
+        """
+        Deletes the state stored under a key.
+        """
+        try:
+            self.table.delete_item(Key={"StateKey": key})
+            return True
+        except Exception as e:
+            print(f"Error deleting sync state {key}: {e}")
+            return False
+
+
+class FileSyncStateRepository:
+    def __init__(self, path: str) -> None:
+        """
+        Local stand-in for SyncStateRepository backed by a JSON file.
+
+        Args:
+            path (str): The path of the JSON file.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _read(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+
+        with open(self.path) as file:
+            return json.load(file)
+
+    def _write(self, states: dict) -> None:
+        # Write to a temporary file first so a crash never leaves a partial file
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(states, file)
+        os.replace(temporary_path, self.path)
+
+    def get_state(self, key: str):
+        with self._lock:
+            return self._read().get(key)
+
+    def put_state(self, key: str, state: dict) -> bool:
+        with self._lock:
+            states = self._read()
+            states[key] = state
+            self._write(states)
+
+            return True
+
+    def delete_state(self, key: str) -> bool:
+        with self._lock:
+            states = self._read()
+            if states.pop(key, None) is not None:
+                self._write(states)
+
+            return True
+
+
+def get_sync_state_repository():
+    """
+    Returns the DynamoDB sync state store when SYNC_STATE_TABLE_NAME is set,
+    otherwise a local file store at SYNC_STATE_PATH.
+    """
+    table_name = os.getenv("SYNC_STATE_TABLE_NAME")
+    if table_name:
+        return SyncStateRepository(table_name=table_name)
+
+    return FileSyncStateRepository(os.getenv("SYNC_STATE_PATH", "/tmp/sync_state.json"))
@@ -0,0 +1,23 @@
+import os
+
+from src.config.sync_jobs import get_incremental_sync_state, get_resume_state, load_sync_jobs
+from src.libs.metrics import emit_metrics
+from src.libs.notion_manager_provider import get_notion_manager
+from src.libs.sync_runner import SyncRunner, build_sync_response, continue_if_incomplete
+from src.libs.time_budget import TimeBudget
+
+
+@emit_metrics("sync_ledgers_handler")
+def sync_ledgers_handler(event, context):
+    runner = SyncRunner(
+        get_notion_manager(),
+        load_sync_jobs(),
+        max_workers=int(os.getenv("SYNC_MAX_WORKERS", "4")),
+        sync_state=get_incremental_sync_state(),
+        time_budget=TimeBudget(context),
+        resume_state=get_resume_state(),
+    )
+
+    reports = runner.run()
+    continue_if_incomplete(reports, event, context)
+    return build_sync_response(reports)
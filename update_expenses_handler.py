@@ -1,31 +1,20 @@
-import os
-
-from src.libs.notion_manager_provider import NotionManager, NotionProperties
+from src.config.sync_jobs import expenses_job, get_incremental_sync_state, get_resume_state
+from src.libs.metrics import emit_metrics
+from src.libs.notion_manager_provider import get_notion_manager
+from src.libs.sync_runner import SyncRunner, build_sync_response, continue_if_incomplete
+from src.libs.time_budget import TimeBudget
 
 
+@emit_metrics("update_expenses_handler")
 def update_expenses_handler(event, context):
-    notion_manager = NotionManager()
-
-    database_id = os.getenv("NOTION_DB_ID_EXPENSES")
-    properties_to_retrieve = {
-        "id": NotionProperties.ID,
-        "Local Amount": NotionProperties.NUMBER,
-        "Currencies": NotionProperties.SELECT,
-        "Date": NotionProperties.DATE,
-        "Amount": NotionProperties.NUMBER,
-    }
-    filter_body = {
-        "filter": {
-            "property": "Amount",
-            "number": {
-                "is_empty": True,
-            },
-        }
-    }
-
-    notion_manager.update_pages(
-        database_id=database_id,
-        properties_to_retrieve=properties_to_retrieve,
-        filter_body=filter_body,
-        update_field="Amount",
+    runner = SyncRunner(
+        get_notion_manager(),
+        [expenses_job()],
+        sync_state=get_incremental_sync_state(),
+        time_budget=TimeBudget(context),
+        resume_state=get_resume_state(),
     )
+
+    reports = runner.run()
+    continue_if_incomplete(reports, event, context)
+    return build_sync_response(reports)